@@ -0,0 +1,45 @@
+-- Daily rollups of `readings` for /readings/max/* and /readings/avg/max/*
+-- Filled incrementally by `flask --app app refresh-readings-daily` (cron), which
+-- processes only whole days newer than the watermark stored in rollup_state.
+
+USE silos;
+
+-- Per sensor and day
+CREATE TABLE IF NOT EXISTS readings_daily (
+    sensor_id INT NOT NULL,
+    day DATE NOT NULL,
+    min_c DECIMAL(6,2) NULL,
+    max_c DECIMAL(6,2) NULL,
+    sum_c DECIMAL(12,2) NULL,
+    count_c INT NOT NULL DEFAULT 0 COMMENT 'non-NULL samples',
+    last_c DECIMAL(6,2) NULL COMMENT 'value at last_at',
+    first_at DATETIME NOT NULL,
+    last_at DATETIME NOT NULL,
+    max_at DATETIME NULL COMMENT 'hour_start of the max sample (latest on ties)',
+    PRIMARY KEY (sensor_id, day),
+    INDEX ix_readings_daily_day (day),
+    FOREIGN KEY (sensor_id) REFERENCES sensors(id) ON DELETE CASCADE
+);
+
+-- Per silo, level and day: max over hours of the cross-cable level average
+CREATE TABLE IF NOT EXISTS readings_daily_levels (
+    silo_id INT NOT NULL,
+    day DATE NOT NULL,
+    level_index INT NOT NULL,
+    max_avg_c DECIMAL(6,2) NULL,
+    PRIMARY KEY (silo_id, day, level_index),
+    INDEX ix_readings_daily_levels_day (day),
+    FOREIGN KEY (silo_id) REFERENCES silos(id) ON DELETE CASCADE
+);
+
+-- Watermarks for incremental jobs
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name VARCHAR(64) PRIMARY KEY,
+    last_ts DATETIME(6) NULL,
+    last_id BIGINT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Checkpoint for the hourly raw -> readings rollup; seeded so its FOR UPDATE
+-- lock has a row to hold even on the first run
+INSERT IGNORE INTO rollup_state (name, last_id) VALUES ('readings_hourly', 0);
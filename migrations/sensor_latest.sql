@@ -0,0 +1,55 @@
+-- Latest raw reading per sensor (used by /readings/latest/* and /readings/avg/latest/*)
+-- One row per sensor, upserted by a trigger on every readings_raw insert so the
+-- latest views cost O(sensors) instead of scanning readings_raw history.
+
+USE silos;
+
+CREATE TABLE IF NOT EXISTS sensor_latest (
+    sensor_id INT PRIMARY KEY,
+    raw_id BIGINT NOT NULL COMMENT 'readings_raw.id mirrored here',
+    value_c DECIMAL(6,2) NULL,
+    polled_at DATETIME(6) NOT NULL,
+    poll_run_id BIGINT NULL,
+    INDEX idx_sensor_latest_polled (polled_at),
+    FOREIGN KEY (sensor_id) REFERENCES sensors(id) ON DELETE CASCADE
+);
+
+-- Keep sensor_latest in step with readings_raw.
+-- Newer polled_at wins; on equal polled_at the later insert (higher id) wins.
+-- polled_at must be assigned last: MySQL evaluates the SET list left to right.
+DROP TRIGGER IF EXISTS trg_readings_raw_sensor_latest;
+
+DELIMITER //
+CREATE TRIGGER trg_readings_raw_sensor_latest
+AFTER INSERT ON readings_raw
+FOR EACH ROW
+BEGIN
+    INSERT INTO sensor_latest (sensor_id, raw_id, value_c, polled_at, poll_run_id)
+    VALUES (NEW.sensor_id, NEW.id, NEW.value_c, NEW.polled_at, NEW.poll_run_id)
+    ON DUPLICATE KEY UPDATE
+        value_c     = IF(NEW.polled_at >= polled_at, NEW.value_c, value_c),
+        poll_run_id = IF(NEW.polled_at >= polled_at, NEW.poll_run_id, poll_run_id),
+        raw_id      = IF(NEW.polled_at >= polled_at, NEW.id, raw_id),
+        polled_at   = GREATEST(polled_at, NEW.polled_at);
+END//
+DELIMITER ;
+
+-- Backfill from existing history (same as `flask --app app sync-sensor-latest`)
+INSERT INTO sensor_latest (sensor_id, raw_id, value_c, polled_at, poll_run_id)
+SELECT r.sensor_id, r.id, r.value_c, r.polled_at, r.poll_run_id
+FROM readings_raw r
+JOIN (
+    SELECT MAX(r2.id) AS id
+    FROM readings_raw r2
+    JOIN (
+        SELECT sensor_id, MAX(polled_at) AS polled_at
+        FROM readings_raw
+        GROUP BY sensor_id
+    ) newest ON newest.sensor_id = r2.sensor_id AND newest.polled_at = r2.polled_at
+    GROUP BY r2.sensor_id
+) pick ON pick.id = r.id
+ON DUPLICATE KEY UPDATE
+    value_c     = IF(VALUES(polled_at) >= polled_at, VALUES(value_c), value_c),
+    poll_run_id = IF(VALUES(polled_at) >= polled_at, VALUES(poll_run_id), poll_run_id),
+    raw_id      = IF(VALUES(polled_at) >= polled_at, VALUES(raw_id), raw_id),
+    polled_at   = GREATEST(polled_at, VALUES(polled_at));
@@ -2,11 +2,11 @@
 # Flask API for Silo Temperature Monitoring
 # ==============================================
 from sqlalchemy import func
-from flask import Flask, request, Response
+from flask import Flask, request, Response, g, has_request_context, stream_with_context
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 from models import (
-    db, Silo, Cable, Sensor, Reading, Product, StatusColor,
+    db, SiloGroup, Silo, Cable, Sensor, Reading, Product, StatusColor,
     SiloProductAssignment, Alert
 )
 
@@ -21,14 +21,71 @@ try:
 except Exception:  # pragma: no cover
     ReadingRaw = None
 
-from sqlalchemy.orm import selectinload
-from sqlalchemy import and_
+# sensor_latest: one row per sensor, maintained on raw insert (migrations/sensor_latest.sql)
+try:
+    from models import SensorLatest  # expects: sensor_id, raw_id, value_c, polled_at, poll_run_id
+except Exception:  # pragma: no cover
+    SensorLatest = None
+
+# NumPy is optional: only the bulk level aggregations use it (see "Aggregation engine")
+try:
+    import numpy as np
+except Exception:  # pragma: no cover
+    np = None
+
+# Optional JSON backends for response bodies (see "JSON serializer")
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None
+try:
+    import msgspec
+except Exception:  # pragma: no cover
+    msgspec = None
+try:
+    import msgpack  # ?format=msgpack when msgspec is not installed
+except Exception:  # pragma: no cover
+    msgpack = None
+
+# Brotli is optional: without it responses are only gzip-compressed (see "Compression")
+try:
+    import brotli
+except Exception:  # pragma: no cover
+    try:
+        import brotlicffi as brotli
+    except Exception:
+        brotli = None
+
+# daily rollups + job watermarks (migrations/readings_daily.sql)
+try:
+    from models import ReadingDaily, ReadingDailyLevel, RollupState
+except Exception:  # pragma: no cover
+    ReadingDaily = ReadingDailyLevel = RollupState = None
+
+from sqlalchemy import inspect as sa_inspect
+
+from sqlalchemy.orm import selectinload, aliased
+from sqlalchemy import and_, or_, select, text, tuple_, type_coerce, literal, union_all, Float, DateTime
 from datetime import datetime
-from collections import OrderedDict, defaultdict
+from collections import OrderedDict, defaultdict, namedtuple
+from itertools import groupby
+from operator import attrgetter
 import os
 import json
+import base64
+from urllib.parse import urlencode
 import math
+import sys
+from decimal import Decimal
 import string  # <-- for hex normalization
+import threading
+import functools
+import gzip
+import shutil
+import hashlib
+import time
+import zlib
+import click
 
 DISCONNECT_SENTINELS = {-127.0}  # add more if you use others
 
@@ -36,7 +93,7 @@ DISCONNECT_SENTINELS = {-127.0}  # add more if you use others
 # App & Config
 # ------------------------------------------------
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["X-Next-Cursor", "Link", "ETag"])
 
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
     'DATABASE_URL',
@@ -62,13 +119,308 @@ def _is_disconnect_temp(temp) -> bool:
         pass
     return False
 
+def _env_flag(name: str, default: str = "1") -> bool:
+    return os.environ.get(name, default).lower() not in ("0", "false", "no")
+
+# -------- JSON serializer --------
+#   JSON_ENCODER=auto (default) -> orjson if installed, else msgspec, else stdlib json
+#   JSON_ENCODER=orjson|msgspec|json -> force one (stdlib json if it is not installed)
+#   All backends emit UTF-8; orjson/msgspec use compact separators and write NaN/inf as null.
+#   Values are rounded before they get here and every backend prints the shortest repr.
+JSON_ENCODER = (os.environ.get("JSON_ENCODER") or "auto").lower()
+
+def _json_default(obj):
+    """Float/int subclasses (e.g. numpy scalars) that stdlib json would have accepted."""
+    if isinstance(obj, float):
+        return float(obj)
+    if isinstance(obj, int):
+        return int(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _json_backend(name: str):
+    """(backend name, dumps(obj) -> bytes, array item separator)."""
+    if name in ("auto", "orjson") and orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        return "orjson", functools.partial(orjson.dumps, default=_json_default, option=option), b","
+    if name in ("auto", "msgspec") and msgspec is not None:
+        return "msgspec", msgspec.json.Encoder(enc_hook=_json_default).encode, b","
+    encode = json.JSONEncoder(ensure_ascii=False, sort_keys=False, default=_json_default).encode
+    return "json", lambda obj: encode(obj).encode("utf-8"), b", "
+
+JSON_BACKEND, dumps_json, _JSON_ITEM_SEP = _json_backend(JSON_ENCODER)
+
 def json_response(payload, status=200):
+    fmt = g.get('row_format') if status == 200 and isinstance(payload, list) else None
+    if fmt:
+        return row_format_response(payload, fmt)
     return Response(
-        json.dumps(payload, ensure_ascii=False, sort_keys=False),
+        dumps_json(payload),
         status=status,
         mimetype='application/json'
     )
 
+# -------- Streaming (history endpoints) --------
+#   ?stream=1|json -> JSON array written chunk by chunk (same bytes as json_response)
+#   ?stream=ndjson -> one JSON object per line
+STREAM_CHUNK_ROWS = 200  # rows per written chunk
+
+def _stream_mode():
+    if g.get('row_format'):
+        return None  # columnar formats are paged, never streamed
+    mode = (request.args.get('stream') or '').lower()
+    if mode in ('1', 'true', 'yes', 'json'):
+        return 'json'
+    if mode == 'ndjson':
+        return 'ndjson'
+    return None
+
+def stream_response(rows, mode, status=200):
+    """Serialize an iterable of rows lazily; only one chunk is held in memory at a time."""
+    def encode(chunk):
+        if mode == 'ndjson':
+            return b''.join(dumps_json(row) + b'\n' for row in chunk)
+        return dumps_json(chunk)[1:-1]  # one array per chunk, brackets dropped
+
+    def generate():
+        buf = []
+        sep = b''
+        if mode == 'json':
+            yield b'['
+        for row in rows:
+            buf.append(row)
+            if len(buf) >= STREAM_CHUNK_ROWS:
+                yield sep + encode(buf)
+                buf.clear()
+                if mode == 'json':
+                    sep = _JSON_ITEM_SEP
+        if buf:
+            yield sep + encode(buf)
+        if mode == 'json':
+            yield b']'
+
+    mimetype = 'application/x-ndjson' if mode == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), status=status, mimetype=mimetype)
+
+def _group_rows(groups):
+    """Flatten (cursor_key, rows) groups from the history iterators into rows."""
+    for _key, rows in groups:
+        yield from rows
+
+# -------- Compression --------
+#   Accept-Encoding negotiated per request: br (if brotli is installed), then gzip.
+#   Bodies under COMPRESS_MIN_BYTES go out as-is; streamed responses are compressed
+#   chunk by chunk with a sync flush, so clients still see rows as they are written.
+#   gzip uses mtime=0, so the same body always compresses to the same bytes.
+COMPRESS_ENABLED   = _env_flag("COMPRESS_ENABLED")
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL         = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY     = int(os.environ.get("BROTLI_QUALITY", "5"))
+COMPRESS_MIMETYPES = {"application/json", "application/x-ndjson", "application/x-msgpack"}
+_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+def _negotiated_encoding():
+    """Content-Encoding to use for this request's compressible bodies, or None."""
+    if not COMPRESS_ENABLED:
+        return None
+    return request.accept_encodings.best_match(_ENCODINGS)
+
+def _body_encoding(size: int, mimetype: str):
+    if size < COMPRESS_MIN_BYTES or mimetype not in COMPRESS_MIMETYPES:
+        return None
+    return _negotiated_encoding()
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def _compressed_stream(chunks, encoding):
+    if encoding == "br":
+        c = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress, flush, finish = c.process, c.flush, c.finish
+    else:
+        c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 16+15: gzip container
+        compress, flush, finish = c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+    for chunk in chunks:
+        out = compress(chunk.encode() if isinstance(chunk, str) else chunk) + flush()
+        if out:
+            yield out
+    yield finish()
+
+@app.after_request
+def compress_response(resp):
+    if resp.status_code != 200 or resp.mimetype not in COMPRESS_MIMETYPES or not COMPRESS_ENABLED:
+        return resp
+    resp.vary.add("Accept-Encoding")
+    if "Content-Encoding" in resp.headers:  # e.g. a pre-compressed _RESPONSE_CACHE variant
+        return resp
+    if resp.is_streamed:
+        encoding = _negotiated_encoding()
+        if encoding is None:
+            return resp
+        resp.response = _compressed_stream(resp.response, encoding)
+    else:
+        body = resp.get_data()
+        encoding = _body_encoding(len(body), resp.mimetype)
+        if encoding is None:
+            return resp
+        resp.set_data(_compress(body, encoding))
+    resp.headers["Content-Encoding"] = encoding
+    return resp
+
+# -------- Keyset pagination (history endpoints) --------
+#   ?limit=N       -> page size, capped at PAGE_MAX_ROWS (also the default)
+#   ?cursor=TOKEN  -> next page; the token comes back in X-Next-Cursor / Link
+#   A page always ends on a timestamp boundary, so one output row is never split.
+PAGE_MAX_ROWS = int(os.environ.get("PAGE_MAX_ROWS", "5000"))
+
+def _encode_cursor(key) -> str:
+    part, ts, rid = key
+    raw = json.dumps([part, ts.isoformat(), rid], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(token: str | None):
+    """(partition, ts, id) from an opaque cursor; ValueError if it was not one of ours."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        part, ts, rid = json.loads(raw)
+        return part, datetime.fromisoformat(ts), int(rid)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+def _page_limit() -> int:
+    limit = request.args.get('limit', type=int)
+    if not limit or limit < 1:
+        return PAGE_MAX_ROWS
+    return min(limit, PAGE_MAX_ROWS)
+
+def paged_response(groups, limit):
+    """
+    Take whole groups (one per output timestamp) until `limit` rows are reached.
+    If anything is left, advertise the continuation cursor in X-Next-Cursor and Link.
+    """
+    out, last_key, more = [], None, False
+    for key, rows in groups:
+        if out and len(out) + len(rows) > limit:
+            more = True
+            break
+        out.extend(rows)
+        last_key = key
+    resp = json_response(out)
+    if more:
+        token = _encode_cursor(last_key)
+        args = [(k, v) for k, v in request.args.items(multi=True) if k != 'cursor'] + [('cursor', token)]
+        resp.headers['X-Next-Cursor'] = token
+        resp.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return resp
+
+# -------- Row formats (reading endpoints) --------
+#   ?format=json     -> one object per row, as above (default)
+#   ?format=columnar -> one JSON object of parallel per-cell arrays (see _columnar_payload)
+#   ?format=msgpack  -> the same object as MessagePack (needs msgspec or msgpack)
+#   Only views wrapped in @row_formats accept it; ?stream is ignored, pages still apply.
+ROW_FORMATS = ("json", "columnar", "msgpack")
+CELL_COLUMNS = ("group", "silo", "cable", "level", "ts", "value", "state")
+
+def _msgpack_encoder():
+    if msgspec is not None:
+        return msgspec.msgpack.Encoder(enc_hook=_json_default).encode
+    if msgpack is not None:
+        return functools.partial(msgpack.packb, use_bin_type=True, default=_json_default)
+    return None
+
+dumps_msgpack = _msgpack_encoder()
+
+def row_formats(view):
+    """Validate ?format= for a reading view; json_response then encodes its rows accordingly."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        fmt = (request.args.get('format') or 'json').lower()
+        if fmt not in ROW_FORMATS:
+            return json_response({"error": f"format must be one of: {', '.join(ROW_FORMATS)}"}, 400)
+        if fmt == 'msgpack' and dumps_msgpack is None:
+            return json_response({"error": "format=msgpack needs msgspec or msgpack installed"}, 400)
+        outer = g.get('row_format')
+        g.row_format = None if fmt == 'json' else fmt
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.row_format = outer  # the body is already encoded; don't leak into later views
+    return wrapper
+
+_FLAT_CELL_KEYS = {}  # flat silo-row key -> (cable_number, level, color key), None if not a level
+
+def _flat_cell_key(key: str):
+    hit = _FLAT_CELL_KEYS.get(key, False)
+    if hit is False:
+        hit = None
+        if key.startswith("cable_") and "_level_" in key:
+            cable, _, level = key[6:].partition("_level_")
+            if level.isdigit():
+                hit = (int(cable) if cable.isdigit() else cable, int(level),
+                       f"cable_{cable}_color_{level}")
+        _FLAT_CELL_KEYS[key] = hit
+    return hit
+
+def _row_cells(row: dict, color_code: dict, topo):
+    """(group, silo, cable, level, value, state code) for each cell of any reading row shape."""
+    if "level_index" in row:  # format_sensor_row
+        sensor = topo.sensors.get(row["sensor_id"])
+        group = topo.silos[sensor.silo_id].group_name if sensor else row.get("group_id")
+        yield (group, row["silo_number"], row["cable_index"], row["level_index"],
+               row["temperature"], STATE_CODES.get(row["state"], ST_NONE))
+        return
+    group, silo = row.get("silo_group"), row.get("silo_number")
+    if "level_0" in row:  # format_levels_row
+        cable = row.get("cable_number")
+        for lvl in LEVEL_SLOTS:
+            if LEVEL_KEYS[lvl] in row:  # /readings/by-cable rows only carry levels that reported
+                yield (group, silo, cable, lvl, row[LEVEL_KEYS[lvl]],
+                       color_code.get(row.get(COLOR_KEYS[lvl]), ST_NONE))
+        return
+    for key, value in row.items():  # flat per-silo rows
+        cell = _flat_cell_key(key)
+        if cell is not None:
+            cable, lvl, color_key = cell
+            yield group, silo, cable, lvl, value, color_code.get(row.get(color_key), ST_NONE)
+
+def _columnar_payload(rows) -> dict:
+    """
+    Reading rows as parallel per-cell arrays (CELL_COLUMNS):
+      - group / ts index into `groups` / `timestamps`
+      - state is a state code; `states` and `colors` map it to a name and color, once per response
+    """
+    palette = _status_palette()
+    topo = get_topology()
+    groups, timestamps = {}, {}
+    cols = {name: [] for name in CELL_COLUMNS}
+    group_col, silo_col, cable_col, level_col, ts_col, value_col, state_col = cols.values()
+    for row in rows:
+        ts = timestamps.setdefault(row.get("timestamp"), len(timestamps))
+        for group, silo, cable, lvl, value, code in _row_cells(row, palette.color_code, topo):
+            group_col.append(groups.setdefault(group, len(groups)))
+            silo_col.append(silo)
+            cable_col.append(cable)
+            level_col.append(lvl)
+            ts_col.append(ts)
+            value_col.append(value)
+            state_col.append(code)
+    return {
+        "states": list(STATE_NAMES),
+        "colors": list(palette.level_color),
+        "groups": list(groups),
+        "timestamps": list(timestamps),
+        **cols,
+    }
+
+def row_format_response(rows, fmt, status=200):
+    payload = _columnar_payload(rows)
+    if fmt == 'msgpack':
+        return Response(dumps_msgpack(payload), status=status, mimetype='application/x-msgpack')
+    return Response(dumps_json(payload), status=status, mimetype='application/json')
+
 def _parse_dt(s: str | None):
     if not s:
         return None
@@ -79,6 +431,10 @@ def _parse_dt(s: str | None):
     except Exception:
         return None
 
+def _naive_utc(ts: datetime) -> datetime:
+    """DATETIME columns are naive UTC: convert aware timestamps, keep naive ones."""
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo is not None else ts
+
 def _day_key(dt: datetime) -> str:
     return dt.date().isoformat()
 
@@ -99,8 +455,8 @@ def _ts_reading(row=None):
             if col is not None:
                 return col
         raise RuntimeError(f"Reading has no time column (checked {candidates}).")
-    # For a row instance
-    for attr in candidates + ("polled_at",):
+    # For a row instance (columnar rows from _base_readings_query carry "ts")
+    for attr in ("ts",) + candidates + ("polled_at",):
         val = getattr(row, attr, None)
         if val is not None:
             return val
@@ -156,56 +512,130 @@ def _normalize_ts_for_flatten(ts: str | None) -> str:
 # Status / Color Helpers
 # ------------------------------------------------
 _STATUS_COLOR_CACHE = None
+_STATUS_COLOR_VERSION = 0   # bumped on every (re)load; compiled palettes key on it
 
+_HEXCHARS = frozenset(string.hexdigits)
+
+@functools.lru_cache(maxsize=1024)
 def _normalize_hex(color: str | None) -> str | None:
     """Ensure hex color has a leading '#' if it looks like bare hex."""
     if not color:
         return None
     c = color.strip()
-    hexchars = set(string.hexdigits)
-    if not c.startswith("#") and all(ch in hexchars for ch in c) and len(c) in (3, 6):
+    if not c.startswith("#") and all(ch in _HEXCHARS for ch in c) and len(c) in (3, 6):
         return "#" + c
     return c
 
 def _load_status_colors():
-    global _STATUS_COLOR_CACHE
+    global _STATUS_COLOR_CACHE, _STATUS_COLOR_VERSION
     if _STATUS_COLOR_CACHE is None:
-        _STATUS_COLOR_CACHE = {}
+        cache = {}
         for row in StatusColor.query.all():
-            _STATUS_COLOR_CACHE[row.status] = _normalize_hex(getattr(row, "color_hex", None))
+            cache[row.status] = _normalize_hex(getattr(row, "color_hex", None))
+        _STATUS_COLOR_CACHE = cache
+        _STATUS_COLOR_VERSION += 1
 
-def get_status_color(temp, product):
-    # Honor disconnect sentinels
-    if _is_disconnect_temp(temp):
-        return "disconnect", _color_for_state("disconnect")
+# -------- Compiled classification --------
+#   State codes double as severity ranks (higher = worse), so "worst of" is max().
+ST_NONE, ST_NORMAL, ST_WARN, ST_CRITICAL, ST_DISCONNECT = range(5)
+STATE_NAMES = (None, "normal", "warn", "critical", "disconnect")
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+
+class StatusPalette:
+    """
+    StatusColor compiled into per-code lookup tables (built once per load):
+      - level_color[code]: color get_status_color() reports for a classified temp
+      - worst_color[code]: silo_color for a row whose worst state is `code`
+      - color_rank(hex):   severity rank of an emitted color, for _worst_color_from_row
+      - level_rank[code]:  color_rank(level_color[code]), None for an empty color
+      - color_code[hex]:   state code behind an emitted level color (worst code on shared colors)
+    """
+    __slots__ = ("version", "level_color", "worst_color", "level_rank", "color_code",
+                 "_color_to_status", "_rank_memo")
+
+    STATUS_RANK   = {"disconnect": 4, "critical": 3, "warn": 2, "normal": 1}
+    FALLBACK_RANK = {"#9e9e9e": 4, "#808080": 4, "#d14141": 3, "#c7c150": 2, "#46d446": 1}
+
+    def __init__(self, version, colors: dict):
+        self.version = version
+        disconnect = _color_for_state("disconnect")
+        self.level_color = (None,) + tuple(
+            _normalize_hex(colors.get(name, "#ffffff")) for name in STATE_NAMES[1:4]
+        ) + (disconnect,)
+        worst = ["#ffffff"]
+        for name in STATE_NAMES[1:]:
+            c = colors.get(name) or _color_for_state(name) or "#ffffff"
+            worst.append(_normalize_hex(c) or disconnect or "#ffffff")
+        self.worst_color = tuple(sys.intern(c) for c in worst)
+        self._color_to_status = {c: st for st, c in colors.items() if c}
+        self._rank_memo = {}
+        self.level_rank = tuple(self.color_rank(c) if c else None for c in self.level_color)
+        self.color_code = {c: code for code, c in enumerate(self.level_color)}
+
+    def color_rank(self, color: str):
+        """(rank, normalized color) for a non-empty color string."""
+        hit = self._rank_memo.get(color)
+        if hit is None:
+            norm = _normalize_hex(color)
+            st = self._color_to_status.get(norm)
+            hit = (self.STATUS_RANK.get(st, self.FALLBACK_RANK.get(norm, 0)), norm)
+            self._rank_memo[color] = hit
+        return hit
+
+_PALETTE = None
+
+def _status_palette() -> StatusPalette:
+    global _PALETTE
+    p = _PALETTE
+    if p is not None and _STATUS_COLOR_CACHE is not None and p.version == _STATUS_COLOR_VERSION:
+        return p
+    _load_status_colors()
+    _PALETTE = p = StatusPalette(_STATUS_COLOR_VERSION, _STATUS_COLOR_CACHE)
+    return p
 
-    if temp is None or product is None:
-        return None, None
+_CLASSIFIERS = {}  # (product id, temp_warn, temp_critical) -> classify(temp) -> state code
 
-    warn = product.temp_warn or 35
-    crit = product.temp_critical or 40
+def _classifier_for(product):
+    """Compiled temp -> state code function for a product's thresholds (None without a product)."""
+    if product is None:
+        return None
+    key = (product.id, product.temp_warn, product.temp_critical)
+    classify = _CLASSIFIERS.get(key)
+    if classify is None:
+        classify = _CLASSIFIERS[key] = _compile_classifier(product.temp_warn or 35,
+                                                          product.temp_critical or 40)
+    return classify
+
+def _compile_classifier(warn, crit):
+    disconnect = frozenset(DISCONNECT_SENTINELS) | {math.inf, -math.inf}
+
+    def classify(temp):
+        if type(temp) is not float:
+            if _is_disconnect_temp(temp):
+                return ST_DISCONNECT
+        elif temp in disconnect or temp != temp:
+            return ST_DISCONNECT
+        if temp >= crit:
+            return ST_CRITICAL
+        if temp >= warn:
+            return ST_WARN
+        return ST_NORMAL
+    return classify
 
-    if temp >= crit:
-        state = "critical"
-    elif temp >= warn:
-        state = "warn"
+def get_status_color(temp, product):
+    classify = _classifier_for(product)
+    if classify is None:
+        code = ST_DISCONNECT if _is_disconnect_temp(temp) else ST_NONE
     else:
-        state = "normal"
-
-    _load_status_colors()
-    return state, _normalize_hex(_STATUS_COLOR_CACHE.get(state, "#ffffff"))
+        code = classify(temp)
+    return STATE_NAMES[code], _status_palette().level_color[code]
 
 def worst_state_color(states):
     # rank disconnect as severest
-    priority = {"disconnect": 4, "critical": 3, "warn": 2, "normal": 1, None: 0}
-    worst = None
-    for s in (states or []):
-        if priority.get(s, 0) > priority.get(worst, 0):
-            worst = s
-
-    _load_status_colors()
+    worst = max((STATE_CODES.get(s, ST_NONE) for s in (states or [])), default=ST_NONE)
+    palette = _status_palette()
     if worst:
-        return worst, (_STATUS_COLOR_CACHE.get(worst) or _color_for_state(worst) or "#ffffff")
+        return STATE_NAMES[worst], palette.worst_color[worst]
     return None, "#ffffff"
 
 def _color_for_state(state: str | None) -> str | None:
@@ -218,36 +648,169 @@ def _color_for_state(state: str | None) -> str | None:
     # Fallbacks if StatusColor table is empty/incomplete
     return _normalize_hex({"critical": "#d14141", "warn": "#c7c150", "normal": "#46d446", "disconnect": "#808080"}.get(state))
 
+# ------------------------------------------------
+# Topology Snapshot (Sensor -> Cable -> Silo -> SiloGroup)
+#   The wiring graph changes rarely, so every /readings/* handler resolves
+#   sensor_index / cable_index / silo_number / group name from an immutable
+#   in-process snapshot instead of re-walking the ORM graph per request.
+# ------------------------------------------------
+SensorInfo = namedtuple("SensorInfo", "id sensor_index cable_id cable_index silo_id")
+CableInfo  = namedtuple("CableInfo", "id cable_index silo_id")
+SiloInfo   = namedtuple("SiloInfo", "id silo_number group_id group_name")
+
+# how often (seconds) get_topology() runs the cheap change-detection query
+TOPOLOGY_CHECK_SECONDS = float(os.environ.get("TOPOLOGY_CHECK_SECONDS", "60"))
+
+class Topology:
+    """
+    Versioned, read-only snapshot of the silo wiring graph.
+      - sensors: sensor_id -> SensorInfo
+      - cables:  cable_id  -> CableInfo
+      - silos:   silo_id   -> SiloInfo (ordered by silo id)
+    plus reverse indexes (silo/cable -> sensor ids, number/group -> silo ids).
+    Never mutate an instance; build a new one and swap it in.
+    """
+    __slots__ = ("version", "signature", "sensors", "cables", "silos",
+                 "_sensor_ids_by_silo", "_sensor_ids_by_cable",
+                 "_silo_ids_by_number", "_silo_ids_by_group")
+
+    def __init__(self, version, signature, sensors, cables, silos):
+        self.version = version
+        self.signature = signature
+        self.sensors = sensors
+        self.cables = cables
+        self.silos = silos
+
+        by_silo, by_cable = defaultdict(list), defaultdict(list)
+        for s in sensors.values():
+            by_silo[s.silo_id].append(s.id)
+            by_cable[s.cable_id].append(s.id)
+        by_number, by_group = defaultdict(list), defaultdict(list)
+        for si in silos.values():
+            by_number[si.silo_number].append(si.id)
+            by_group[si.group_id].append(si.id)
+
+        self._sensor_ids_by_silo = {k: tuple(v) for k, v in by_silo.items()}
+        self._sensor_ids_by_cable = {k: tuple(v) for k, v in by_cable.items()}
+        self._silo_ids_by_number = {k: tuple(v) for k, v in by_number.items()}
+        self._silo_ids_by_group = {k: tuple(v) for k, v in by_group.items()}
+
+    def sensor_ids_for_silos(self, silo_ids):
+        out = []
+        for sid in dict.fromkeys(silo_ids):
+            out.extend(self._sensor_ids_by_silo.get(sid, ()))
+        return out
+
+    def sensor_ids_for_cables(self, cable_ids):
+        out = []
+        for cid in dict.fromkeys(cable_ids):
+            out.extend(self._sensor_ids_by_cable.get(cid, ()))
+        return out
+
+    def silo_ids_for_numbers(self, numbers):
+        wanted = set(numbers)
+        return [sid for sid, si in self.silos.items() if si.silo_number in wanted]
+
+    def silo_ids_for_groups(self, group_ids):
+        wanted = set(group_ids)
+        return [sid for sid, si in self.silos.items() if si.group_id in wanted]
+
+    def silo_of_sensor(self, sensor_id) -> SiloInfo | None:
+        s = self.sensors.get(sensor_id)
+        return self.silos.get(s.silo_id) if s else None
+
+_TOPOLOGY = None
+_TOPOLOGY_CHECKED_AT = 0.0
+_TOPOLOGY_LOCK = threading.Lock()
+
+def _topology_signature():
+    """
+    Cheap change-detection fingerprint for the four topology tables: one round
+    trip of COUNT/MAX/SUM aggregates. Renames (e.g. group name) are not covered;
+    use refresh_topology() / POST /topology/refresh for those.
+    """
+    aggs = (
+        func.count(Sensor.id), func.max(Sensor.id),
+        func.sum(Sensor.cable_id), func.sum(Sensor.sensor_index),
+        func.count(Cable.id), func.max(Cable.id),
+        func.sum(Cable.silo_id), func.sum(Cable.cable_index),
+        func.count(Silo.id), func.max(Silo.id),
+        func.sum(Silo.silo_group_id), func.sum(Silo.silo_number),
+        func.count(SiloGroup.id), func.max(SiloGroup.id),
+    )
+    row = db.session.query(*[db.session.query(a).scalar_subquery() for a in aggs]).one()
+    return tuple(int(v or 0) for v in row)
+
+def _build_topology(version, signature) -> Topology:
+    groups = {gid: name for gid, name in db.session.query(SiloGroup.id, SiloGroup.name)}
+
+    silos = {}
+    for sid, number, gid in db.session.query(Silo.id, Silo.silo_number, Silo.silo_group_id).order_by(Silo.id):
+        has_group = gid in groups
+        silos[sid] = SiloInfo(sid, number, gid if has_group else None, groups.get(gid))
+
+    cables = {}
+    for cid, silo_id, cable_index in db.session.query(Cable.id, Cable.silo_id, Cable.cable_index).order_by(Cable.id):
+        if silo_id in silos:
+            cables[cid] = CableInfo(cid, cable_index, silo_id)
+
+    sensors = {}
+    for sid, cable_id, sensor_index in db.session.query(Sensor.id, Sensor.cable_id, Sensor.sensor_index).order_by(Sensor.id):
+        c = cables.get(cable_id)
+        if c is not None:
+            sensors[sid] = SensorInfo(sid, sensor_index, c.id, c.cable_index, c.silo_id)
+
+    return Topology(version, signature, sensors, cables, silos)
+
+def get_topology(force: bool = False) -> Topology:
+    """
+    Return the current topology snapshot. Built on first use, then re-validated
+    at most every TOPOLOGY_CHECK_SECONDS via _topology_signature(); rebuilt only
+    when the signature moves (or when force=True).
+    """
+    global _TOPOLOGY, _TOPOLOGY_CHECKED_AT
+    topo = _TOPOLOGY
+    if topo is not None and not force and time.monotonic() - _TOPOLOGY_CHECKED_AT < TOPOLOGY_CHECK_SECONDS:
+        return topo
+
+    with _TOPOLOGY_LOCK:
+        topo = _TOPOLOGY
+        if topo is not None and not force and time.monotonic() - _TOPOLOGY_CHECKED_AT < TOPOLOGY_CHECK_SECONDS:
+            return topo  # another thread re-validated while we waited
+        sig = _topology_signature()
+        if topo is None or force or sig != topo.signature:
+            topo = _build_topology((topo.version + 1) if topo else 1, sig)
+            _TOPOLOGY = topo
+        _TOPOLOGY_CHECKED_AT = time.monotonic()
+        return topo
+
+def refresh_topology() -> Topology:
+    """Explicit invalidation: rebuild the snapshot now (call after editing silos/cables/sensors)."""
+    return get_topology(force=True)
+
 # ------------------------------------------------
 # DB Query Helpers
 #   - Base (readings):        /by-*, /avg/by-*, /max/*
 #   - Base (readings_raw):    /latest/*, /avg/latest/*
+#   Sensor/cable/silo labels come from get_topology(), not from joins.
 # ------------------------------------------------
+def _value_col(model):
+    """value_c fetched as a plain float (no Decimal objects on the hot path)."""
+    return type_coerce(model.value_c, Float).label("value_c")
+
 def _base_readings_query(sensor_ids, start, end):
-    q = Reading.query.filter(Reading.sensor_id.in_(sensor_ids))
+    """
+    Core select of columnar rows (id, sensor_id, ts, value_c) -- no ORM entities,
+    no identity map; labels are joined in memory from the topology snapshot.
+    Execute with db.session.execute(stmt).all().
+    """
+    q = (select(Reading.id, Reading.sensor_id, READ_TS_COL.label("ts"), _value_col(Reading))
+         .where(Reading.sensor_id.in_(sensor_ids)))
     if start:
-        q = q.filter(READ_TS_COL >= start)
+        q = q.where(READ_TS_COL >= start)
     if end:
-        q = q.filter(READ_TS_COL <= end)
-    return q.options(
-        selectinload(Reading.sensor)
-        .selectinload(Sensor.cable)
-        .selectinload(Cable.silo)
-        .selectinload(Silo.group)
-    )
-
-def _preload_sensors(sensor_ids):
-    """Load sensor -> cable -> silo -> group graph for given IDs."""
-    if not sensor_ids:
-        return {}
-    sensors = (Sensor.query
-               .filter(Sensor.id.in_(sensor_ids))
-               .options(
-                   selectinload(Sensor.cable)
-                     .selectinload(Cable.silo)
-                     .selectinload(Silo.group)
-               ).all())
-    return {s.id: s for s in sensors}
+        q = q.where(READ_TS_COL <= end)
+    return q
 
 def _preload_products_for_silo_ids(silo_ids):
     if not silo_ids:
@@ -258,176 +821,1267 @@ def _preload_products_for_silo_ids(silo_ids):
                .all())
     return {a.silo_id: a.product for a in assigns}
 
-def _preload_products_from_reading_rows(rows):
-    silo_ids = {r.sensor.cable.silo_id for r in rows}
+def _preload_products_from_rows(rows, topo: Topology):
+    """Products for the silos touched by Reading/ReadingRaw rows (resolved via topology)."""
+    sensors = topo.sensors
+    silo_ids = {sensors[r.sensor_id].silo_id for r in rows if r.sensor_id in sensors}
     return _preload_products_for_silo_ids(silo_ids)
 
-def _sensors_for_cables(cable_ids):
-    return (
-        Sensor.query
-        .filter(Sensor.cable_id.in_(cable_ids))
-        .options(
-            selectinload(Sensor.cable)
-            .selectinload(Cable.silo)
-            .selectinload(Silo.group)
-        )
-        .all()
-    )
-
-def _sensors_for_silos(silo_ids):
-    return (
-        Sensor.query
-        .join(Cable).join(Silo)
-        .filter(Silo.id.in_(silo_ids))
-        .options(
-            selectinload(Sensor.cable)
-            .selectinload(Cable.silo)
-            .selectinload(Silo.group)
-        )
-        .all()
-    )
-
-def _silo_number_to_ids(numbers):
+def _silo_number_to_ids(numbers, topo: Topology | None = None):
     if not numbers:
         return []
-    return [s.id for s in Silo.query.filter(Silo.silo_number.in_(numbers)).all()]
+    return (topo or get_topology()).silo_ids_for_numbers(numbers)
 
-def _sensor_rows_for_cables_window_from_readings(cable_ids, start, end):
-    sensors = _sensors_for_cables(cable_ids)
-    if not sensors:
+READ_BATCH_ROWS = int(os.environ.get("READ_BATCH_ROWS", "2000"))  # rows per keyset fetch
+
+def _reading_groups(sensor_ids, start, end, after=None, bucket=None):
+    """
+    Yield lists of reading rows sharing one bucket(ts), in (ts, id) order, strictly
+    after the keyset position `after` = (ts, id).
+    """
+    for batch in _reading_group_batches(sensor_ids, start, end, after, bucket):
+        yield from batch
+
+def _reading_group_batches(sensor_ids, start, end, after=None, bucket=None):
+    """
+    Same groups as _reading_groups, but one list of complete groups per fetch, so
+    callers can aggregate a whole batch at once. Rows are fetched READ_BATCH_ROWS at
+    a time; a batch's trailing group is held back until the next batch completes it.
+    """
+    bucket = bucket or (lambda ts: ts)
+    archived, live = _split_window_by_archive(start, end)
+    if archived and (after is None or after[0] < archived[1]):
+        # months before the archive horizon: one batch per archived month
+        for rows in _archived_rows(sensor_ids, *archived):
+            if after is not None:
+                rows = [r for r in rows if (r.ts, r.id) > after]
+            if rows:
+                yield [list(group) for _b, group in groupby(rows, key=lambda r: bucket(r.ts))]
+    if live is None:
+        return
+    start, end = live
+
+    pending = []
+    while True:
+        q = _base_readings_query(sensor_ids, start, end)
+        if after is not None:
+            a_ts, a_id = after
+            q = q.where(or_(READ_TS_COL > a_ts, and_(READ_TS_COL == a_ts, Reading.id > a_id)))
+        rows = db.session.execute(q.order_by(READ_TS_COL.asc(), Reading.id.asc())
+                                  .limit(READ_BATCH_ROWS)).all()
+        if not rows:
+            break
+        after = (rows[-1].ts, rows[-1].id)
+        pending.extend(rows)
+        if len(rows) < READ_BATCH_ROWS:
+            break
+        tail = bucket(pending[-1].ts)
+        cut = len(pending)
+        while cut and bucket(pending[cut - 1].ts) == tail:
+            cut -= 1
+        if cut:
+            yield [list(group) for _b, group in groupby(pending[:cut], key=lambda r: bucket(r.ts))]
+        pending = pending[cut:]
+    if pending:
+        yield [list(group) for _b, group in groupby(pending, key=lambda r: bucket(r.ts))]
+
+def _resume_partitions(parts, after):
+    """
+    Pair each partition with its keyset start: partitions before the cursor's are
+    skipped, the cursor's own resumes after (ts, id), later ones start from scratch.
+    """
+    if after is None:
+        return [(p, None) for p in parts]
+    part, ts, rid = after
+    if part not in parts:
+        return []
+    i = parts.index(part)
+    return [(parts[i], (ts, rid))] + [(p, None) for p in parts[i + 1:]]
+
+def _window_rows(sensor_ids, start, end):
+    """All reading rows in [start, end], archived months first, each part by (id, ts, sensor_id)."""
+    archived, live = _split_window_by_archive(start, end)
+    rows = []
+    if archived:
+        for month_rows in _archived_rows(sensor_ids, *archived):
+            rows.extend(sorted(month_rows, key=lambda r: (r.id, r.ts, r.sensor_id)))
+    if live:
+        q = _base_readings_query(sensor_ids, *live)
+        rows.extend(db.session.execute(q.order_by(Reading.id.asc(), READ_TS_COL.asc(), Reading.sensor_id.asc())).all())
+    return rows
+
+def _sensor_rows_for_cables_window_from_readings(cable_ids, start, end, topo: Topology):
+    sensor_ids = topo.sensor_ids_for_cables(cable_ids)
+    if not sensor_ids:
         return [], {}
-    sensor_ids = [s.id for s in sensors]
-    q = _base_readings_query(sensor_ids, start, end)
-    rows = q.order_by(Reading.id.asc(), READ_TS_COL.asc(), Reading.sensor_id.asc()).all()
-    return rows, _preload_products_from_reading_rows(rows)
-
-def _sensor_rows_for_silos_window_from_readings(silo_ids, start, end):
-    sensors = _sensors_for_silos(silo_ids)
-    if not sensors:
+    rows = _window_rows(sensor_ids, start, end)
+    return rows, _preload_products_from_rows(rows, topo)
+
+def _sensor_rows_for_silos_window_from_readings(silo_ids, start, end, topo: Topology):
+    sensor_ids = topo.sensor_ids_for_silos(silo_ids)
+    if not sensor_ids:
         return [], {}
-    sensor_ids = [s.id for s in sensors]
-    q = _base_readings_query(sensor_ids, start, end)
-    rows = q.order_by(Reading.id.asc(), READ_TS_COL.asc(), Reading.sensor_id.asc()).all()
-    return rows, _preload_products_from_reading_rows(rows)
+    rows = _window_rows(sensor_ids, start, end)
+    return rows, _preload_products_from_rows(rows, topo)
+
+# -------- Latest row per sensor (pushed into SQL) --------
+_WINDOW_FUNCS = None
+
+def _supports_window_functions() -> bool:
+    """ROW_NUMBER() OVER needs MySQL 8.0+, MariaDB 10.2+ or SQLite 3.25+ (cached per process)."""
+    global _WINDOW_FUNCS
+    if _WINDOW_FUNCS is None:
+        dialect = db.engine.dialect
+        if dialect.server_version_info is None:
+            with db.engine.connect():
+                pass  # populates server_version_info
+        version = tuple(dialect.server_version_info or ())
+        if dialect.name == "mysql":
+            min_version = (10, 2) if getattr(dialect, "is_mariadb", False) else (8, 0)
+        elif dialect.name == "sqlite":
+            min_version = (3, 25)
+        else:
+            min_version = ()
+        _WINDOW_FUNCS = version[:len(min_version)] >= min_version
+    return _WINDOW_FUNCS
+
+def _latest_per_sensor_query(model, ts_col, sensor_ids, start=None, end=None):
+    """
+    Query returning exactly one row per sensor: the newest in [start, end]
+    by (ts DESC, id DESC). Rows are plain tuples (id, sensor_id, value_c, <ts_col name>).
+      - window functions:  ROW_NUMBER() OVER (PARTITION BY sensor_id ORDER BY ts DESC, id DESC) = 1
+      - fallback:          join on MAX(ts) per sensor, then MAX(id) to break ties
+    """
+    cols = (model.id, model.sensor_id, _value_col(model), ts_col)
+    if _supports_window_functions():
+        rn = func.row_number().over(
+            partition_by=model.sensor_id,
+            order_by=(ts_col.desc(), model.id.desc()),
+        ).label("rn")
+        q = db.session.query(*cols, rn).filter(model.sensor_id.in_(sensor_ids))
+        if start:
+            q = q.filter(ts_col >= start)
+        if end:
+            q = q.filter(ts_col <= end)
+        ranked = q.subquery()
+        return (db.session.query(*(ranked.c[c.key] for c in cols))
+                .filter(ranked.c.rn == 1))
+
+    newest = db.session.query(model.sensor_id, func.max(ts_col).label("ts")).filter(model.sensor_id.in_(sensor_ids))
+    if start:
+        newest = newest.filter(ts_col >= start)
+    if end:
+        newest = newest.filter(ts_col <= end)
+    newest = newest.group_by(model.sensor_id).subquery()
+    tie_break = (db.session.query(func.max(model.id).label("id"))
+                 .join(newest, and_(model.sensor_id == newest.c.sensor_id, ts_col == newest.c.ts))
+                 .group_by(model.sensor_id)
+                 .subquery())
+    return db.session.query(*cols).join(tie_break, model.id == tie_break.c.id)
+
+# -------- Daily maxima (pushed into SQL) --------
+def _daily_max_rows(sensor_ids, start=None, end=None):
+    """
+    Per (sensor_id, day) maxima for [start, end]: whole days already rolled up come
+    from readings_daily, the rest (partial edge days, the current day) from `readings`.
+    Rows have the shape documented on _daily_max_rows_live().
+    """
+    if not sensor_ids:
+        return []
+    days, segments = _split_window_by_rollup(start, end)
+    rows = _daily_max_rows_rollup(sensor_ids, *days) if days else []
+    for seg_start, seg_end in segments:
+        archived, live = _split_window_by_archive(seg_start, seg_end)
+        if archived:
+            rows.extend(_daily_max_rows_archived(sensor_ids, *archived))
+        if live:
+            rows.extend(_daily_max_rows_live(sensor_ids, *live))
+    return rows
+
+def _daily_max_rows_live(sensor_ids, start=None, end=None):
+    """
+    GROUP BY (sensor_id, DATE(ts)) over `readings`, so only one row per sensor-day
+    crosses the wire. Each row is a tuple:
+      sensor_id, value_c (the day's max; None if every sample was NULL),
+      peak_at (ts of the max sample, latest one on ties; first ts of the day if all NULL),
+      last_at (latest ts that sensor has in the day)
+    """
+    if not sensor_ids:
+        return []
+    day = func.date(READ_TS_COL)
+    q = (db.session.query(Reading.sensor_id.label("sensor_id"),
+                          func.max(Reading.value_c).label("max_value"),
+                          func.min(READ_TS_COL).label("first_at"),
+                          func.max(READ_TS_COL).label("last_at"))
+         .filter(Reading.sensor_id.in_(sensor_ids)))
+    if start:
+        q = q.filter(READ_TS_COL >= start)
+    if end:
+        q = q.filter(READ_TS_COL <= end)
+    daily = q.group_by(Reading.sensor_id, day).subquery()
+
+    # argmax: the peak row lies in [first_at, last_at] of its own day and window
+    peak = aliased(Reading)
+    peak_ts = getattr(peak, READ_TS_COL.key)
+    return (db.session.query(daily.c.sensor_id,
+                             daily.c.max_value.label("value_c"),
+                             func.coalesce(func.max(peak_ts), daily.c.first_at).label("peak_at"),
+                             daily.c.last_at)
+            .outerjoin(peak, and_(peak.sensor_id == daily.c.sensor_id,
+                                  peak_ts >= daily.c.first_at,
+                                  peak_ts <= daily.c.last_at,
+                                  peak.value_c == daily.c.max_value))
+            .group_by(daily.c.sensor_id, daily.c.max_value, daily.c.first_at, daily.c.last_at)
+            .all())
+
+# -------- Optional tables (migrations/*.sql) --------
+_TABLES_PRESENT = {}
+
+def _table_available(model) -> bool:
+    """True if the model is importable and its table exists (checked once per process)."""
+    if model is None:
+        return False
+    name = model.__tablename__
+    if name not in _TABLES_PRESENT:
+        _TABLES_PRESENT[name] = sa_inspect(db.engine).has_table(name)
+    return _TABLES_PRESENT[name]
+
+# -------- Daily rollups (readings_daily / readings_daily_levels) --------
+ROLLUP_JOB = "readings_daily"
+_MIDNIGHT = datetime.min.time()
+_END_OF_DAY = datetime.max.time()
+
+def _rollups_available() -> bool:
+    return (_env_flag("USE_READINGS_DAILY")
+            and _table_available(ReadingDaily)
+            and _table_available(ReadingDailyLevel)
+            and _table_available(RollupState))
+
+def _rollup_watermark():
+    state = db.session.get(RollupState, ROLLUP_JOB)
+    return state.last_ts if state else None
+
+def _split_window_by_rollup(start, end):
+    """
+    Split [start, end] into (rollup_days, live_segments):
+      - rollup_days: (first_day or None, last_day) of whole days covered by the rollup, or None
+      - live_segments: [(seg_start, seg_end), ...] still answered from `readings`
+    """
+    if not _rollups_available():
+        return None, [(start, end)]
+    watermark = _rollup_watermark()
+    if watermark is None:
+        return None, [(start, end)]
+
+    first = None
+    if start is not None:
+        first = start.date() if start.time() == _MIDNIGHT else start.date() + timedelta(days=1)
+    last = watermark.date()
+    if end is not None:
+        last = min(last, end.date() if end.time() == _END_OF_DAY else end.date() - timedelta(days=1))
+    if first is not None and first > last:
+        return None, [(start, end)]
+
+    segments = []
+    if start is not None and start.time() != _MIDNIGHT:
+        segments.append((start, datetime.combine(first, _MIDNIGHT) - timedelta(microseconds=1)))
+    if end is None or not (end.time() == _END_OF_DAY and end.date() == last):
+        segments.append((datetime.combine(last + timedelta(days=1), _MIDNIGHT), end))
+    return (first, last), segments
+
+def _daily_max_rows_rollup(sensor_ids, first_day, last_day):
+    """Same row shape as _daily_max_rows_live(), read from readings_daily."""
+    q = (db.session.query(ReadingDaily.sensor_id,
+                          ReadingDaily.max_c.label("value_c"),
+                          func.coalesce(ReadingDaily.max_at, ReadingDaily.first_at).label("peak_at"),
+                          ReadingDaily.last_at)
+         .filter(ReadingDaily.sensor_id.in_(sensor_ids), ReadingDaily.day <= last_day))
+    if first_day is not None:
+        q = q.filter(ReadingDaily.day >= first_day)
+    return q.all()
+
+def _daily_level_max_avg_rollup(silo_ids, first_day, last_day):
+    """{(silo_id, 'YYYY-MM-DD') -> {level -> max of hourly cross-cable avg}} from readings_daily_levels."""
+    q = (db.session.query(ReadingDailyLevel.silo_id, ReadingDailyLevel.day,
+                          ReadingDailyLevel.level_index, ReadingDailyLevel.max_avg_c)
+         .filter(ReadingDailyLevel.silo_id.in_(silo_ids), ReadingDailyLevel.day <= last_day))
+    if first_day is not None:
+        q = q.filter(ReadingDailyLevel.day >= first_day)
+    out = {}
+    for sid, day, lvl, max_avg in q:
+        levels = out.setdefault((sid, day.isoformat()), {})
+        if max_avg is not None:
+            levels[lvl] = float(max_avg)
+    return out
 
-def _raw_rows_for_silo_ids(silo_ids, start=None, end=None):
-    """Fetch raw rows for the silo set (via sensors). No relationships needed on ReadingRaw."""
+def _rollup_one_day(day: date, topo: Topology):
+    """(Re)build readings_daily + readings_daily_levels rows for one calendar day."""
+    lo = datetime.combine(day, _MIDNIGHT)
+    rows = (db.session.query(Reading.sensor_id, READ_TS_COL, Reading.value_c)
+            .filter(READ_TS_COL >= lo, READ_TS_COL < lo + timedelta(days=1))
+            .order_by(READ_TS_COL.asc(), Reading.id.asc())
+            .all())
+
+    per_sensor = {}
+    lvl_sensors, lvl_stamps, lvl_values = [], [], []  # same grouping as /readings/avg/max/*
+    for sensor_id, ts, value in rows:
+        agg = per_sensor.get(sensor_id)
+        if agg is None:
+            agg = per_sensor[sensor_id] = {
+                "sensor_id": sensor_id, "day": day,
+                "min_c": None, "max_c": None, "sum_c": None, "count_c": 0,
+                "last_c": None, "first_at": ts, "last_at": ts, "max_at": None,
+            }
+        # rows are ascending, so the last one seen wins "last" and ">=" keeps the latest peak
+        agg["last_at"], agg["last_c"] = ts, value
+        if value is not None:
+            if agg["max_c"] is None or value >= agg["max_c"]:
+                agg["max_c"], agg["max_at"] = value, ts
+            if agg["min_c"] is None or value < agg["min_c"]:
+                agg["min_c"] = value
+            agg["sum_c"] = value if agg["sum_c"] is None else agg["sum_c"] + value
+            agg["count_c"] += 1
+
+        s = topo.sensors.get(sensor_id)
+        if s is not None and s.sensor_index is not None:
+            lvl_sensors.append(sensor_id)
+            lvl_stamps.append(ts)
+            lvl_values.append(float(value) if value is not None else None)
+
+    per_silo_levels = {}  # silo_id -> {lvl: max avg or None}
+    for sid, _ts, avgs in silo_ts_level_avgs(lvl_sensors, lvl_stamps, lvl_values, topo):
+        best = per_silo_levels.setdefault(sid, {})
+        for lvl, avg_val in avgs.items():
+            cur = best.get(lvl)
+            if cur is None or (avg_val is not None and avg_val > cur):
+                best[lvl] = avg_val
+
+    ReadingDaily.query.filter(ReadingDaily.day == day).delete(synchronize_session=False)
+    ReadingDailyLevel.query.filter(ReadingDailyLevel.day == day).delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(ReadingDaily, list(per_sensor.values()))
+    db.session.bulk_insert_mappings(ReadingDailyLevel, [
+        {"silo_id": sid, "day": day, "level_index": lvl,
+         "max_avg_c": (Decimal(str(v)) if v is not None else None)}
+        for sid, levels in per_silo_levels.items() for lvl, v in levels.items()
+    ])
+
+def refresh_readings_daily(since: date | None = None) -> dict:
+    """
+    Roll up whole days of `readings` newer than the stored watermark (or from `since`,
+    to redo days after late loads). The newest day in `readings` may still be filling,
+    so it is left to the live path. Commits per day, so the job is restartable.
+    The hourly rollup moves the watermark back when it rewrites rolled-up hours
+    (_rewind_daily_rollup); a run that sees that happen goes back to redo those days.
+    """
+    _seed_rollup_state(ROLLUP_JOB)
+    state = db.session.get(RollupState, ROLLUP_JOB)
+
+    newest = db.session.query(func.max(READ_TS_COL)).scalar()
+    if newest is None:
+        return {"days": 0, "watermark": None}
+    last_day = newest.date() - timedelta(days=1)
+
+    if state.last_ts is not None:
+        day = state.last_ts.date() + timedelta(days=1)
+        if since is not None:
+            day = min(day, since)
+    elif since is not None:
+        day = since
+    else:
+        day = db.session.query(func.min(READ_TS_COL)).scalar().date()
+
+    topo = get_topology()
+    n = 0
+    mark = state.last_ts
+    while day <= last_day:
+        # locked per day, like _rewind_daily_rollup, so a rewind can't be overwritten
+        state = (db.session.query(RollupState)
+                 .filter(RollupState.name == ROLLUP_JOB)
+                 .with_for_update()
+                 .populate_existing()
+                 .one())
+        if mark is not None and state.last_ts is not None and state.last_ts < mark:
+            day = min(day, state.last_ts.date() + timedelta(days=1))
+        _rollup_one_day(day, topo)
+        if state.last_ts is None or day >= state.last_ts.date():
+            state.last_ts = datetime.combine(day, _END_OF_DAY)
+        mark = state.last_ts
+        db.session.commit()
+        n += 1
+        day += timedelta(days=1)
+    db.session.commit()
+    return {"days": n, "watermark": state.last_ts.isoformat() if state.last_ts else None}
+
+# -------- Hourly rollup (readings_raw -> readings) --------
+#   One `readings` row per (sensor, hour_start): the hour's last raw poll (newest polled_at,
+#   then highest id), with sample_at = that poll's polled_at. New raw rows are read by id
+#   after the RollupState checkpoint; each batch's writes and checkpoint commit together,
+#   so a crashed or repeated run resumes cleanly and re-applying a batch changes nothing.
+#   Raw ids are not committed strictly in order (concurrent /ingest/raw, the external
+#   poller), so each run first re-folds the HOURLY_ROLLUP_OVERLAP_IDS ids below the
+#   checkpoint: a lower id that committed after the checkpoint passed it is picked up there.
+#   Writes into days readings_daily already covers move its watermark back to be re-rolled.
+HOURLY_ROLLUP_JOB = "readings_hourly"
+HOURLY_ROLLUP_BATCH = int(os.environ.get("HOURLY_ROLLUP_BATCH", "50000"))       # raw rows per transaction
+HOURLY_ROLLUP_OVERLAP_IDS = int(os.environ.get("HOURLY_ROLLUP_OVERLAP_IDS", "10000"))  # re-read below the checkpoint
+HOURLY_ROLLUP_LOOKUP_CHUNK = 1000  # (sensor, hour) pairs per existing-row lookup
+HOURLY_ROLLUP_INTERVAL = float(os.environ.get("HOURLY_ROLLUP_INTERVAL", "0"))  # seconds; 0 = no background thread
+_HOURLY_ROLLUP_LOCK = threading.Lock()
+
+def _rollup_raw_batch(after_id, upto_id=None):
+    """
+    Fold the next HOURLY_ROLLUP_BATCH raw rows (after_id < id [<= upto_id]) into `readings`.
+    Returns (last raw id, last polled_at, rows read, inserted, updated, earliest hour written
+    or None); rows read = 0 when caught up.
+    """
+    q = db.session.query(ReadingRaw.id, ReadingRaw.sensor_id, ReadingRaw.value_c, ReadingRaw.polled_at)
+    if upto_id is not None:
+        q = q.filter(ReadingRaw.id <= upto_id)
+    raw = (q.filter(ReadingRaw.id > after_id)
+           .order_by(ReadingRaw.id.asc())
+           .limit(HOURLY_ROLLUP_BATCH)
+           .all())
+    if not raw:
+        return after_id, None, 0, 0, 0, None
+
+    picked = {}  # (sensor_id, hour) -> raw row
+    for r in raw:
+        key = (r.sensor_id, _hour_floor(r.polled_at))
+        cur = picked.get(key)
+        if cur is None or (r.polled_at, r.id) > (cur.polled_at, cur.id):
+            picked[key] = r
+
+    # only the (sensor, hour) cells in the batch: a batch spanning weeks stays small
+    existing = {}  # (sensor_id, hour) -> (readings.id, sample_at, value_c); highest id if duplicated
+    keys = list(picked)
+    for c in range(0, len(keys), HOURLY_ROLLUP_LOOKUP_CHUNK):
+        for rid, sensor_id, hour, sample_at, value_c in (
+                db.session.query(Reading.id, Reading.sensor_id, READ_TS_COL, Reading.sample_at, Reading.value_c)
+                .filter(tuple_(Reading.sensor_id, READ_TS_COL).in_(keys[c:c + HOURLY_ROLLUP_LOOKUP_CHUNK]))
+                .order_by(Reading.id.asc())):
+            existing[(sensor_id, hour)] = (rid, sample_at, value_c)
+
+    inserts, updates, written = [], [], []
+    for (sensor_id, hour), r in picked.items():
+        have = existing.get((sensor_id, hour))
+        if have is None:
+            inserts.append({"sensor_id": sensor_id, "hour_start": hour,
+                            "value_c": r.value_c, "sample_at": r.polled_at})
+        elif r.polled_at >= have[1] and (r.polled_at, r.value_c) != (have[1], have[2]):
+            # same or newer poll for the hour replaces the representative sample
+            updates.append({"id": have[0], "value_c": r.value_c, "sample_at": r.polled_at})
+        else:
+            continue
+        written.append(hour)
+    db.session.bulk_insert_mappings(Reading, inserts)
+    db.session.bulk_update_mappings(Reading, updates)
+    return (raw[-1].id, max(r.polled_at for r in raw), len(raw), len(inserts), len(updates),
+            min(written, default=None))
+
+def _rewind_daily_rollup(hour: datetime):
+    """
+    Move the readings_daily watermark back before `hour`'s day if that day is already
+    rolled up, in the caller's transaction: the next refresh_readings_daily re-rolls
+    it, and until then _split_window_by_rollup answers those days from `readings`.
+    """
+    state = (db.session.query(RollupState)
+             .filter(RollupState.name == ROLLUP_JOB)
+             .with_for_update()
+             .one_or_none())
+    if state is not None and state.last_ts is not None and state.last_ts >= hour:
+        state.last_ts = datetime.combine(hour.date() - timedelta(days=1), _END_OF_DAY)
+
+def _seed_rollup_state(name: str):
+    """Create a job's checkpoint row if it is missing; racing seeders just lose the insert."""
+    if db.session.get(RollupState, name) is not None:
+        return
+    try:
+        db.session.execute(RollupState.__table__.insert().values(name=name, last_id=0))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # another runner seeded it first
+
+def refresh_readings_hourly(max_batches: int | None = None) -> dict:
+    """
+    Roll new readings_raw rows into hourly `readings` until caught up (or max_batches).
+    The checkpoint row is seeded first, then locked (SELECT ... FOR UPDATE) per batch, so
+    concurrent runners (CLI + background thread, several workers) serialize instead of
+    double-applying, including on the very first run. The overlap below the checkpoint
+    is re-folded first (rechecked); hours it doesn't change are not rewritten.
+    """
+    totals = {"batches": 0, "rows": 0, "rechecked": 0, "inserted": 0, "updated": 0}
+    with _HOURLY_ROLLUP_LOCK:
+        _seed_rollup_state(HOURLY_ROLLUP_JOB)
+        state = (db.session.query(RollupState)
+                 .filter(RollupState.name == HOURLY_ROLLUP_JOB)
+                 .with_for_update()
+                 .one())
+        checkpoint = state.last_id or 0
+        after_id = max(0, checkpoint - HOURLY_ROLLUP_OVERLAP_IDS)
+        while after_id < checkpoint:
+            after_id, _ts, n, ins, upd, changed = _rollup_raw_batch(after_id, upto_id=checkpoint)
+            if not n:
+                break
+            if changed is not None:
+                _rewind_daily_rollup(changed)
+            totals["rechecked"] += n
+            totals["inserted"] += ins
+            totals["updated"] += upd
+        db.session.commit()
+        while max_batches is None or totals["batches"] < max_batches:
+            state = (db.session.query(RollupState)
+                     .filter(RollupState.name == HOURLY_ROLLUP_JOB)
+                     .with_for_update()
+                     .one())
+            last_id, last_ts, n, ins, upd, changed = _rollup_raw_batch(state.last_id or 0)
+            if not n:
+                db.session.commit()
+                break
+            if changed is not None:
+                _rewind_daily_rollup(changed)
+            state.last_id = last_id
+            if state.last_ts is None or last_ts > state.last_ts:
+                state.last_ts = last_ts
+            db.session.commit()
+            totals["batches"] += 1
+            totals["rows"] += n
+            totals["inserted"] += ins
+            totals["updated"] += upd
+    totals.update(hourly_rollup_status())
+    return totals
+
+def hourly_rollup_status() -> dict:
+    """
+    Lag of the hourly rollup behind readings_raw:
+      - lag_ids: raw ids not yet folded in (upper bound on pending rows)
+      - lag_seconds: newest raw polled_at minus the newest polled_at already folded in
+    """
+    state = db.session.get(RollupState, HOURLY_ROLLUP_JOB)
+    checkpoint_id = (state.last_id if state else None) or 0
+    checkpoint_ts = state.last_ts if state else None
+    raw_max_id = db.session.query(func.max(ReadingRaw.id)).scalar() or 0
+    newest = (db.session.query(ReadingRaw.polled_at).filter(ReadingRaw.id == raw_max_id).scalar()
+              if raw_max_id else None)
+    lag_seconds = (max(0.0, (newest - checkpoint_ts).total_seconds())
+                   if newest is not None and checkpoint_ts is not None else None)
+    return {
+        "checkpoint_id": checkpoint_id,
+        "checkpoint_ts": checkpoint_ts.isoformat() if checkpoint_ts else None,
+        "raw_max_id": raw_max_id,
+        "lag_ids": max(0, raw_max_id - checkpoint_id),
+        "lag_seconds": lag_seconds,
+    }
+
+def start_hourly_rollup_thread(interval: float = HOURLY_ROLLUP_INTERVAL) -> threading.Thread:
+    """Run refresh_readings_hourly() every `interval` seconds in a daemon thread."""
+    def loop():
+        while True:
+            with app.app_context():
+                try:
+                    refresh_readings_hourly()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception("hourly rollup failed")
+            time.sleep(interval)
+
+    t = threading.Thread(target=loop, name="hourly-rollup", daemon=True)
+    t.start()
+    return t
+
+# -------- Latest raw row per sensor --------
+RAW_LATEST_LOOKBACK = timedelta(hours=float(os.environ.get("RAW_LATEST_LOOKBACK_HOURS", "24")))
+
+def _sensor_latest_available() -> bool:
+    """sensor_latest is used only if the table exists and USE_SENSOR_LATEST isn't off."""
+    return _env_flag("USE_SENSOR_LATEST") and _table_available(SensorLatest)
+
+def _latest_raw_rows(sensor_ids, start=None, end=None):
+    """
+    Newest readings_raw row per sensor within [start, end] (ties -> highest id).
+    Without `end` the answer comes straight from sensor_latest, so the cost depends
+    on sensor count rather than on how much history readings_raw holds; bounded
+    windows let the database pick the row (see _latest_per_sensor_query).
+    """
+    if not sensor_ids:
+        return []
+    if end is None and _sensor_latest_available():
+        q = (select(SensorLatest.raw_id.label("id"), SensorLatest.sensor_id,
+                    _value_col(SensorLatest), SensorLatest.polled_at)
+             .where(SensorLatest.sensor_id.in_(sensor_ids)))
+        if start:
+            q = q.where(SensorLatest.polled_at >= start)
+        return db.session.execute(q.order_by(SensorLatest.polled_at.desc(), SensorLatest.sensor_id.asc())).all()
+
+    if start is None:
+        # probe a recent window first so RANGE partitions on polled_at are pruned;
+        # only sensors silent for the whole lookback go back to the older partitions
+        probe_start = (end or datetime.utcnow()) - RAW_LATEST_LOOKBACK
+        rows = _latest_per_sensor_query(ReadingRaw, ReadingRaw.polled_at, sensor_ids, probe_start, end).all()
+        missing = set(sensor_ids).difference(r.sensor_id for r in rows)
+        if missing:
+            rows += _latest_per_sensor_query(ReadingRaw, ReadingRaw.polled_at, sorted(missing), None, end).all()
+    else:
+        rows = _latest_per_sensor_query(ReadingRaw, ReadingRaw.polled_at, sensor_ids, start, end).all()
+    rows.sort(key=lambda r: r.sensor_id)
+    rows.sort(key=lambda r: r.polled_at, reverse=True)
+    return rows
+
+def _latest_raw_rows_for_silo_ids(silo_ids, topo: Topology, start=None, end=None):
+    """Latest raw row per sensor for the silo set. Returns (rows, products_by_silo)."""
     if ReadingRaw is None:
         # fallback to readings if raw table not available
-        return _sensor_rows_for_silos_window_from_readings(silo_ids, start, end)
+        return _sensor_rows_for_silos_window_from_readings(silo_ids, start, end, topo)
+
+    rows = _latest_raw_rows(topo.sensor_ids_for_silos(silo_ids), start, end)
+    return rows, _preload_products_from_rows(rows, topo)
+
+def rebuild_sensor_latest() -> int:
+    """Re-seed sensor_latest from readings_raw (backfill / repair after bulk loads). Returns row count."""
+    newest = (db.session.query(ReadingRaw.sensor_id, func.max(ReadingRaw.polled_at).label("polled_at"))
+              .group_by(ReadingRaw.sensor_id)
+              .subquery())
+    rows = (db.session.query(ReadingRaw.id, ReadingRaw.sensor_id, ReadingRaw.value_c,
+                             ReadingRaw.polled_at, ReadingRaw.poll_run_id)
+            .join(newest, and_(ReadingRaw.sensor_id == newest.c.sensor_id,
+                               ReadingRaw.polled_at == newest.c.polled_at))
+            .all())
+    best = {}
+    for r in rows:
+        cur = best.get(r.sensor_id)
+        if cur is None or r.id > cur.id:
+            best[r.sensor_id] = r
+
+    SensorLatest.query.delete()
+    db.session.bulk_insert_mappings(SensorLatest, [
+        {"sensor_id": r.sensor_id, "raw_id": r.id, "value_c": r.value_c,
+         "polled_at": r.polled_at, "poll_run_id": r.poll_run_id}
+        for r in best.values()
+    ])
+    db.session.commit()
+    return len(best)
+
+# -------- readings_raw partitions (MySQL / MariaDB) --------
+#   readings_raw is RANGE COLUMNS(polled_at) partitioned, one partition per month (or day):
+#     p_old    -> everything before the first managed period (from the initial conversion)
+#     pYYYYMM  -> [period start, next period start)    (pYYYYMMDD for daily partitions)
+#     p_future -> MAXVALUE catch-all, kept empty by creating RAW_PARTITIONS_AHEAD periods ahead
+#   Partitions ending before now - RAW_RETENTION_DAYS are dropped, or with
+#   RAW_EXPIRED_ACTION=archive swapped out into a readings_raw_<partition> table first.
+#   Every raw read is bounded on polled_at (see _latest_raw_rows), so pruning applies.
+RAW_PARTITION_UNIT    = os.environ.get("RAW_PARTITION_UNIT", "month")  # month | day
+RAW_PARTITIONS_AHEAD  = int(os.environ.get("RAW_PARTITIONS_AHEAD", "3"))
+RAW_RETENTION_DAYS    = int(os.environ.get("RAW_RETENTION_DAYS", "400"))
+RAW_EXPIRED_ACTION    = os.environ.get("RAW_EXPIRED_ACTION", "drop")   # drop | archive
+RAW_TABLE = "readings_raw"
+
+def _period_start(ts: datetime, unit: str) -> datetime:
+    ts = datetime.combine(ts.date(), _MIDNIGHT)
+    return ts.replace(day=1) if unit == "month" else ts
+
+def _next_period(ts: datetime, unit: str) -> datetime:
+    ts = _period_start(ts, unit)
+    if unit == "month":
+        return ts.replace(year=ts.year + ts.month // 12, month=ts.month % 12 + 1)
+    return ts + timedelta(days=1)
+
+def _partition_def(lower: datetime, upper: datetime, unit: str) -> str:
+    name = "p" + lower.strftime("%Y%m" if unit == "month" else "%Y%m%d")
+    return f"PARTITION {name} VALUES LESS THAN ('{upper:%Y-%m-%d %H:%M:%S}')"
+
+def _raw_partitions():
+    """[(name, upper bound or None for MAXVALUE)] of readings_raw; [] if not partitioned."""
+    rows = db.session.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_METHOD, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t ORDER BY PARTITION_ORDINAL_POSITION"),
+        {"t": RAW_TABLE}).all()
+    out = []
+    for name, method, desc in rows:
+        if name is None:
+            return []
+        if method != "RANGE COLUMNS":
+            raise ValueError(f"{RAW_TABLE} is partitioned by {method}, expected RANGE COLUMNS(polled_at)")
+        out.append((name, None if desc == "MAXVALUE" else datetime.fromisoformat(desc.strip("'"))))
+    return out
 
-    sensors = _sensors_for_silos(silo_ids)
-    if not sensors:
-        return [], {}, {}
-    sensor_ids = [s.id for s in sensors]
-    sensor_by_id = {s.id: s for s in sensors}
+def _raw_foreign_keys():
+    return [name for (name,) in db.session.execute(text(
+        "SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS "
+        "WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = :t"), {"t": RAW_TABLE})]
 
-    q = ReadingRaw.query.filter(ReadingRaw.sensor_id.in_(sensor_ids))
-    if start:
-        q = q.filter(ReadingRaw.polled_at >= start)
-    if end:
-        q = q.filter(ReadingRaw.polled_at <= end)
+def plan_raw_partitions(existing, foreign_keys, now: datetime, unit: str = RAW_PARTITION_UNIT,
+                        ahead: int = RAW_PARTITIONS_AHEAD, retention_days: int = RAW_RETENTION_DAYS,
+                        action: str = RAW_EXPIRED_ACTION):
+    """
+    DDL statements that bring readings_raw to the target layout (pure; nothing is executed).
+      existing:     _raw_partitions() output ([] = not partitioned yet)
+      foreign_keys: FK names on readings_raw (InnoDB can't partition a table with FKs)
+    """
+    if unit not in ("month", "day"):
+        raise ValueError(f"RAW_PARTITION_UNIT must be month or day, not {unit!r}")
+    if action not in ("drop", "archive"):
+        raise ValueError(f"RAW_EXPIRED_ACTION must be drop or archive, not {action!r}")
+
+    current = _period_start(now, unit)
+    horizon = current
+    for _ in range(ahead + 1):
+        horizon = _next_period(horizon, unit)
+
+    def periods(lower):
+        defs = []
+        while lower < horizon:
+            upper = _next_period(lower, unit)
+            defs.append(_partition_def(lower, upper, unit))
+            lower = upper
+        return defs
+
+    if not existing:
+        # one-time conversion: the partition column must be part of the primary key
+        stmts = [f"ALTER TABLE {RAW_TABLE} DROP FOREIGN KEY `{fk}`" for fk in foreign_keys]
+        stmts.append(f"ALTER TABLE {RAW_TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, polled_at)")
+        defs = [f"PARTITION p_old VALUES LESS THAN ('{current:%Y-%m-%d %H:%M:%S}')"] + periods(current)
+        defs.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+        stmts.append(f"ALTER TABLE {RAW_TABLE} PARTITION BY RANGE COLUMNS(polled_at) ({', '.join(defs)})")
+        return stmts
+
+    stmts = []
+    bounded = [(name, upper) for name, upper in existing if upper is not None]
+    catch_all = next((name for name, upper in existing if upper is None), None)
+    last = max((upper for _name, upper in bounded), default=None)
+    # an unaligned last bound (unit switched) starts its period early; its upper bound still grows
+    new_defs = periods(current if last is None else _period_start(last, unit))
+    if new_defs:
+        if catch_all:
+            new_defs.append(f"PARTITION {catch_all} VALUES LESS THAN (MAXVALUE)")
+            stmts.append(f"ALTER TABLE {RAW_TABLE} REORGANIZE PARTITION {catch_all} INTO ({', '.join(new_defs)})")
+        else:
+            stmts.append(f"ALTER TABLE {RAW_TABLE} ADD PARTITION ({', '.join(new_defs)})")
+
+    cutoff = now - timedelta(days=retention_days)
+    expired = [name for name, upper in bounded if upper <= cutoff]
+    if not catch_all and not new_defs and len(expired) == len(existing):
+        expired = expired[:-1]  # a partitioned table keeps at least one partition
+    for name in expired:
+        if action == "archive":
+            archive = f"{RAW_TABLE}_{name}"
+            stmts += [f"CREATE TABLE {archive} LIKE {RAW_TABLE}",
+                      f"ALTER TABLE {archive} REMOVE PARTITIONING",
+                      f"ALTER TABLE {RAW_TABLE} EXCHANGE PARTITION {name} WITH TABLE {archive}"]
+        stmts.append(f"ALTER TABLE {RAW_TABLE} DROP PARTITION {name}")
+    return stmts
+
+def manage_raw_partitions(dry_run: bool = True, now: datetime | None = None) -> list:
+    """
+    Create upcoming / rotate out expired readings_raw partitions. With dry_run the plan is
+    computed from the live information_schema but nothing is executed. Returns the statements.
+    """
+    if db.engine.dialect.name != "mysql":
+        raise RuntimeError("readings_raw partitioning needs MySQL or MariaDB")
+    existing = _raw_partitions()
+    stmts = plan_raw_partitions(existing, [] if existing else _raw_foreign_keys(), now or datetime.utcnow())
+    if not dry_run:
+        for stmt in stmts:
+            db.session.execute(text(stmt))  # DDL commits implicitly on MySQL
+        db.session.commit()
+    return stmts
+
+# -------- Cold archive (readings -> memory-mapped .npy columns) --------
+#   {ARCHIVE_DIR}/{ARCHIVE_SITE}/readings/YYYY-MM/ holds one month of `readings` as plain
+#   .npy columns sorted by (sensor_id, ts, id): the reader memory-maps them and binary-
+#   searches each sensor's slice instead of loading the month. Compact dtypes (int32 ids,
+#   epoch seconds, value_c as int32 hundredths) stand in for zip compression, which .npz
+#   can't combine with mmap. Windows before the horizon (end of the newest archived month)
+#   are read from the archive, the rest from MySQL, so archived months may be purged.
+#   Rows that land in an archived month later (id above meta.json's max_id) stay invisible
+#   until the next archive run re-archives that month; purge never deletes them before.
+ARCHIVE_DIR  = os.environ.get("ARCHIVE_DIR")  # unset = no archive
+ARCHIVE_SITE = os.environ.get("ARCHIVE_SITE", "default")
+ARCHIVE_BATCH_ROWS = int(os.environ.get("ARCHIVE_BATCH_ROWS", "100000"))
+READINGS_RETENTION_DAYS = int(os.environ.get("READINGS_RETENTION_DAYS", "365"))  # default archive cutoff
+_ARCHIVE_COLUMNS = ("id", "sensor_id", "ts", "sample_at", "value_c")
+_ARCHIVE_NULL = -2 ** 31  # value_c NULL
+_EPOCH = datetime(1970, 1, 1)
+
+ArchivedReading = namedtuple("ArchivedReading", "id sensor_id ts value_c")  # same fields as _base_readings_query rows
+ArchivedDailyMax = namedtuple("ArchivedDailyMax", "sensor_id value_c peak_at last_at")
+
+def _archive_root():
+    if not ARCHIVE_DIR or np is None:
+        return None
+    return os.path.join(ARCHIVE_DIR, ARCHIVE_SITE, "readings")
 
-    rows = (q.order_by(ReadingRaw.id.asc(), ReadingRaw.polled_at.asc(), ReadingRaw.sensor_id.asc()).all())
+def _archive_months():
+    """Archived months ('YYYY-MM'), oldest first; only complete ones (meta.json written last)."""
+    root = _archive_root()
+    if root is None or not os.path.isdir(root):
+        return []
+    return sorted(m for m in os.listdir(root)
+                  if len(m) == 7 and os.path.isfile(os.path.join(root, m, "meta.json")))
+
+def _archive_horizon():
+    """Start of the first month not in the archive, or None without an archive."""
+    months = _archive_months()
+    if not months:
+        return None
+    return _next_period(datetime.strptime(months[-1], "%Y-%m"), "month")
 
-    # products by silo
-    silo_ids_set = {sensor_by_id[r.sensor_id].cable.silo_id for r in rows} if rows else set()
-    products = _preload_products_for_silo_ids(silo_ids_set)
-    return rows, sensor_by_id, products
+def _split_window_by_archive(start, end):
+    """
+    Split [start, end] into (archived window or None, live window or None). Both come
+    back as naive UTC (like the horizon and the archived ts column), whatever the input.
+    """
+    start = _naive_utc(start) if start is not None else None
+    end = _naive_utc(end) if end is not None else None
+    horizon = _archive_horizon()
+    if horizon is None or (start is not None and start >= horizon):
+        return None, (start, end)
+    if end is not None and end < horizon:
+        return (start, end), None
+    return (start, horizon - timedelta(microseconds=1)), (horizon, end)
+
+@functools.lru_cache(maxsize=64)
+def _open_archive_month(path: str, _stamp):
+    """Memory-mapped columns of one archived month (_stamp = meta.json mtime, busts the cache)."""
+    return {col: np.load(os.path.join(path, f"{col}.npy"), mmap_mode="r") for col in _ARCHIVE_COLUMNS}
+
+def _epoch_seconds(ts: datetime, up: bool = False) -> int:
+    """Whole seconds since 1970 (floored, or ceiled with up=True)."""
+    return -((_EPOCH - ts) // timedelta(seconds=1)) if up else (ts - _EPOCH) // timedelta(seconds=1)
+
+def _archived_rows(sensor_ids, start, end):
+    """Yield one list of ArchivedReading per archived month overlapping [start, end], in (ts, id) order."""
+    root = _archive_root()
+    sensors = np.array(sorted(set(sensor_ids)), dtype=np.int64)
+    # ts is whole seconds: ts >= start <=> ts >= ceil(start), ts <= end <=> ts <= floor(end)
+    lo_s = _epoch_seconds(start, up=True) if start is not None else None
+    hi_s = _epoch_seconds(end) if end is not None else None
+    for month in _archive_months():
+        first = datetime.strptime(month, "%Y-%m")
+        if (end is not None and first > end) or (start is not None and _next_period(first, "month") <= start):
+            continue
+        path = os.path.join(root, month)
+        cols = _open_archive_month(path, os.path.getmtime(os.path.join(path, "meta.json")))
+        sid_col, ts_col = cols["sensor_id"], cols["ts"]
+        left = np.searchsorted(sid_col, sensors, side="left")
+        right = np.searchsorted(sid_col, sensors, side="right")
+        slices = []
+        for a, b in zip(left.tolist(), right.tolist()):
+            if a == b:
+                continue
+            ts_slice, base = ts_col[a:b], a
+            if lo_s is not None:
+                a = base + int(np.searchsorted(ts_slice, lo_s, side="left"))
+            if hi_s is not None:
+                b = base + int(np.searchsorted(ts_slice, hi_s, side="right"))
+            if a < b:
+                slices.append(np.arange(a, b))
+        if not slices:
+            continue
+        idx = np.concatenate(slices)
+        ids, sids, ts = cols["id"][idx], sid_col[idx], ts_col[idx]
+        values = cols["value_c"][idx]
+        order = np.lexsort((ids, ts))
+        stamps = ts[order].astype("datetime64[s]").tolist()
+        vals = [None if v == _ARCHIVE_NULL else v / 100 for v in values[order].tolist()]
+        yield list(map(ArchivedReading, ids[order].tolist(), sids[order].tolist(), stamps, vals))
+
+def _daily_max_rows_archived(sensor_ids, start, end):
+    """Same row shape as _daily_max_rows_live(), computed from archived months."""
+    out = {}
+    for rows in _archived_rows(sensor_ids, start, end):
+        for r in rows:  # (ts, id) ascending
+            key = (r.sensor_id, r.ts.date())
+            cur = out.get(key)
+            if cur is None:
+                out[key] = ArchivedDailyMax(r.sensor_id, r.value_c, r.ts, r.ts)
+                continue
+            value, peak_at = cur.value_c, cur.peak_at
+            if r.value_c is not None and (value is None or r.value_c >= value):
+                # latest peak on ties; the first valued sample replaces an all-NULL placeholder
+                value, peak_at = r.value_c, r.ts
+            out[key] = ArchivedDailyMax(r.sensor_id, value, peak_at, r.ts)
+    return list(out.values())
+
+def _archive_meta(root: str, name: str) -> dict:
+    path = os.path.join(root, name)
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if "max_id" not in meta:  # written before max_id was recorded
+        ids = _open_archive_month(path, os.path.getmtime(os.path.join(path, "meta.json")))["id"]
+        meta["max_id"] = int(ids.max()) if len(ids) else 0
+    return meta
+
+def _late_rows(lo: datetime, hi: datetime, max_id: int) -> int:
+    """`readings` rows in [lo, hi) that arrived after the month was archived."""
+    return (db.session.query(func.count(Reading.id))
+            .filter(READ_TS_COL >= lo, READ_TS_COL < hi, Reading.id > max_id).scalar() or 0)
+
+def archive_readings(before: date, purge: bool = False) -> dict:
+    """
+    Export every whole month of `readings` before `before` that isn't archived yet
+    (oldest first, so the archive stays contiguous). Each month is written to a temp
+    directory and renamed into place. Archived months that gained rows since (late loads,
+    rollup inserts: ids above the month's recorded max_id) are re-archived, merged with
+    what the archive already holds; until then those rows are not visible to reads.
+    With purge, each archived month's rows up to its max_id are then deleted from
+    `readings` in ARCHIVE_BATCH_ROWS chunks, so a row is never purged unarchived.
+    """
+    root = _archive_root()
+    if root is None:
+        raise RuntimeError("archiving needs ARCHIVE_DIR and NumPy")
+    os.makedirs(root, exist_ok=True)
+    oldest = db.session.query(func.min(READ_TS_COL)).scalar()
+    stop = _period_start(datetime.combine(before, _MIDNIGHT), "month")
+    done = set(_archive_months())
+    month = _period_start(oldest, "month") if oldest is not None else stop
+    if done:
+        month = min(month, datetime.strptime(min(done), "%Y-%m"))
+        stop = max(stop, _archive_horizon())
+
+    written, rows_total, metas = [], 0, {}
+    while month < stop:
+        name = f"{month:%Y-%m}"
+        nxt = _next_period(month, "month")
+        if name not in done:
+            rows_total += _archive_one_month(root, name, month, nxt)
+            written.append(name)
+        elif _late_rows(month, nxt, _archive_meta(root, name)["max_id"]):
+            rows_total += _archive_one_month(root, name, month, nxt, merge=True)
+            written.append(name)
+        metas[name] = (month, nxt, _archive_meta(root, name)["max_id"])
+        month = nxt
+
+    purged = 0
+    horizon = _archive_horizon()
+    if purge and horizon is not None:
+        for lo, hi, max_id in metas.values():
+            while True:
+                ids = [rid for (rid,) in db.session.query(Reading.id)
+                       .filter(READ_TS_COL >= lo, READ_TS_COL < hi, Reading.id <= max_id)
+                       .limit(ARCHIVE_BATCH_ROWS)]
+                if not ids:
+                    break
+                Reading.query.filter(Reading.id.in_(ids)).delete(synchronize_session=False)
+                db.session.commit()
+                purged += len(ids)
+    return {"months": written, "rows": rows_total, "purged": purged,
+            "horizon": horizon.isoformat() if horizon else None}
+
+def _archive_one_month(root: str, name: str, lo: datetime, hi: datetime, merge: bool = False) -> int:
+    """
+    Write month `name` from `readings` rows in [lo, hi). With merge, archived rows whose
+    id is no longer in `readings` (purged) are kept; rows still there win (they may
+    have been rewritten by the rollup since).
+    """
+    parts = {col: [] for col in _ARCHIVE_COLUMNS}
+    last_id = None
+    while True:
+        q = (select(Reading.id, Reading.sensor_id, READ_TS_COL.label("ts"), Reading.sample_at, _value_col(Reading))
+             .where(READ_TS_COL >= lo, READ_TS_COL < hi))
+        if last_id is not None:
+            q = q.where(Reading.id > last_id)
+        rows = db.session.execute(q.order_by(Reading.id.asc()).limit(ARCHIVE_BATCH_ROWS)).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        ids, sids, ts, sample_at, values = zip(*rows)
+        vals = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        parts["id"].append(np.array(ids, dtype=np.int64))
+        parts["sensor_id"].append(np.array(sids, dtype=np.int32))
+        parts["ts"].append(np.array(ts, dtype="datetime64[s]").astype(np.int64))
+        parts["sample_at"].append(np.array(sample_at, dtype="datetime64[us]").astype(np.int64))
+        parts["value_c"].append(np.where(np.isnan(vals), _ARCHIVE_NULL,
+                                         np.rint(np.nan_to_num(vals) * 100)).astype(np.int32))
+
+    if merge:
+        path = os.path.join(root, name)
+        old = _open_archive_month(path, os.path.getmtime(os.path.join(path, "meta.json")))
+        live_ids = np.concatenate(parts["id"]) if parts["id"] else np.array([], dtype=np.int64)
+        keep = ~np.isin(old["id"], live_ids)
+        for col in _ARCHIVE_COLUMNS:
+            parts[col].insert(0, np.array(old[col][keep]))
+
+    cols = {col: (np.concatenate(chunks) if chunks else np.array([], dtype=np.int64))
+            for col, chunks in parts.items()}
+    order = np.lexsort((cols["id"], cols["ts"], cols["sensor_id"]))
+    tmp = os.path.join(root, f".{name}.tmp")
+    os.makedirs(tmp, exist_ok=True)
+    for col, arr in cols.items():
+        np.save(os.path.join(tmp, f"{col}.npy"), arr[order])
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"month": name, "rows": int(len(order)), "site": ARCHIVE_SITE,
+                   "max_id": int(cols["id"].max()) if len(order) else 0,
+                   "written_at": datetime.utcnow().isoformat(timespec="seconds")}, f)
+    if merge:
+        old_dir = os.path.join(root, f".{name}.old")
+        os.replace(os.path.join(root, name), old_dir)
+        os.replace(tmp, os.path.join(root, name))
+        shutil.rmtree(old_dir)
+    else:
+        os.replace(tmp, os.path.join(root, name))
+    return int(len(order))
 
-# -------- Convenience: fetch all silo IDs / numbers --------
-def _all_silo_ids():
-    return [sid for (sid,) in db.session.query(Silo.id).all()]
+# -------- Convenience: fetch all silo IDs --------
+def _all_silo_ids(topo: Topology | None = None):
+    return list((topo or get_topology()).silos.keys())
 
-def _all_silo_numbers():
-    return [num for (num,) in db.session.query(Silo.silo_number).all()]
+def _silo_group_to_ids(group_ids, topo: Topology | None = None):
+    if not group_ids:
+        return []
+    return (topo or get_topology()).silo_ids_for_groups(group_ids)
+
+# -------- Silo selection (silo_id / silo_number / silo_group_id) --------
+class SiloSelector:
+    """
+    Which silos a request asks for, by id, number or group. Resolved against the
+    topology snapshot, so the by-silo-number / by-silo-group-id routes call the
+    id-based handlers directly with a selector instead of re-dispatching.
+      - id / number: empty list -> all silos
+      - group:       empty list -> no silos
+    """
+    __slots__ = ("kind", "values")
+
+    PARAMS = {"id": "silo_id", "number": "silo_number", "group": "silo_group_id"}
+
+    def __init__(self, kind: str = "id", values=()):
+        self.kind = kind
+        self.values = list(values)
+
+    @classmethod
+    def from_request(cls, kind: str = "id") -> "SiloSelector":
+        return cls(kind, request.args.getlist(cls.PARAMS[kind], type=int))
+
+    def resolve(self, topo: Topology | None = None) -> list:
+        topo = topo or get_topology()
+        if self.kind == "group":
+            return _silo_group_to_ids(self.values, topo)
+        if not self.values:
+            return _all_silo_ids(topo)
+        if self.kind == "number":
+            return _silo_number_to_ids(self.values, topo)
+        return list(self.values)
+
+# -------- Response cache (latest endpoints) --------
+#   Key: (view, sorted silo ids, other query params, topology version, raw watermark).
+#   The watermark is MAX(readings_raw.id), so an entry is valid until new raw data lands;
+#   RESPONSE_CACHE_TTL bounds staleness from product / threshold edits.
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "256"))  # entries; 0 disables
+RESPONSE_CACHE_TTL  = float(os.environ.get("RESPONSE_CACHE_TTL", "300"))  # seconds
+
+class ResponseCache:
+    """Thread-safe LRU of pre-serialized response bodies with hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (stored_at, body bytes, mimetype, {encoding: compressed body})
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and time.monotonic() - hit[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return hit
+            if hit is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, body: bytes, mimetype: str):
+        entry = (time.monotonic(), body, mimetype, {})
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+_RESPONSE_CACHE = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+def _raw_watermark():
+    """Highest raw reading id (falls back to readings when there is no raw table)."""
+    return _data_watermark()[0]
+
+def cached_by_watermark(view):
+    """
+    Serve a silo view's JSON from _RESPONSE_CACHE while no new raw rows have arrived.
+    The wrapped view keeps its (selector=None) signature, so aliases share entries.
+    """
+    selector_params = set(SiloSelector.PARAMS.values())
+
+    @functools.wraps(view)
+    def wrapper(selector: SiloSelector | None = None):
+        if RESPONSE_CACHE_SIZE <= 0:
+            return view(selector)
+        topo = get_topology()
+        silo_ids = (selector or SiloSelector.from_request()).resolve(topo)
+        if not silo_ids:
+            return view(selector)
+
+        params = tuple(sorted((k, v) for k, v in request.args.items(multi=True) if k not in selector_params))
+        key = (view.__name__, tuple(sorted(set(silo_ids))), params, topo.version, _raw_watermark())
+        hit = _RESPONSE_CACHE.get(key)
+        if hit is not None:
+            return _use_cached_encoding(Response(hit[1], status=200, mimetype=hit[2]), hit)
+
+        resp = view(SiloSelector("id", silo_ids))
+        if resp.status_code == 200 and not resp.is_streamed:
+            _use_cached_encoding(resp, _RESPONSE_CACHE.put(key, resp.get_data(), resp.mimetype))
+        return resp
+    return wrapper
+
+def _use_cached_encoding(resp, entry):
+    """Swap in the entry's compressed body for this request, compressing once per encoding."""
+    _stored_at, body, mimetype, variants = entry
+    encoding = _body_encoding(len(body), mimetype)
+    if encoding is not None:
+        data = variants.get(encoding)
+        if data is None:
+            data = variants[encoding] = _compress(body, encoding)
+        resp.set_data(data)
+        resp.headers["Content-Encoding"] = encoding
+    return resp
+
+# -------- Conditional requests (ETag / If-None-Match) --------
+#   Reading and estimate views get a strong ETag hashed from everything their body
+#   depends on besides the URL: the data watermark (_data_watermark), the topology
+#   signature, the status palette, the JSON backend and the negotiated Content-Encoding
+#   (so each compressed representation has its own tag). It is computed before the
+#   view runs, so a poll whose If-None-Match still matches costs one aggregate query
+#   and gets 304 with no body; a tag can only be older than its body, never newer.
+ETAG_ENABLED = _env_flag("ETAG_ENABLED")
+
+def _data_watermark() -> tuple:
+    """
+    One round trip of MAX/COUNT/SUM aggregates over what the reading views read:
+    raw and hourly ids, rollup job watermarks, products/thresholds and assignments.
+    Runs once per request (memoized on flask.g for that request object).
+    """
+    req = request._get_current_object() if has_request_context() else None
+    memo = g.get("data_watermark") if req is not None else None
+    if memo is not None and memo[0] is req:
+        return memo[1]
+
+    model = ReadingRaw if ReadingRaw is not None else Reading
+    aggs = [
+        func.max(model.id), func.max(Reading.id),
+        func.count(Product.id), func.max(Product.id), func.sum(Product.temp_normal),
+        func.sum(Product.temp_warn), func.sum(Product.temp_critical),
+        func.count(SiloProductAssignment.silo_id),
+        func.sum(SiloProductAssignment.silo_id * SiloProductAssignment.product_id),
+    ]
+    if _table_available(RollupState):
+        aggs += [func.max(RollupState.last_id), func.max(RollupState.last_ts), func.max(RollupState.updated_at)]
+    row = tuple(db.session.query(*[db.session.query(a).scalar_subquery() for a in aggs]).one())
+    if req is not None:
+        g.data_watermark = (req, row)
+    return row
+
+def _data_etag() -> str:
+    palette = _status_palette()
+    parts = (request.full_path, JSON_BACKEND, _negotiated_encoding(), get_topology().signature,
+             palette.level_color, palette.worst_color, _data_watermark())
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+def conditional_by_watermark(view):
+    """Answer 304 when If-None-Match matches the current _data_etag(); tag 200 responses."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ETAG_ENABLED:
+            return view(*args, **kwargs)
+        etag = _data_etag()
+        if request.if_none_match.contains_weak(etag):
+            resp = Response(status=304)
+            resp.vary.add("Accept-Encoding")  # the tag depends on it; compress_response skips 304s
+        else:
+            resp = view(*args, **kwargs)
+            if resp.status_code != 200:
+                return resp
+        resp.set_etag(etag)
+        resp.headers.setdefault("Cache-Control", "no-cache")  # always revalidate, 304 is cheap
+        return resp
+    return wrapper
 
 # ------------------------------------------------
 # Format Helpers
 # ------------------------------------------------
-def format_levels_row(silo, cable_number, timestamp_iso, level_values, product):
+LEVEL_KEYS = tuple(f"level_{lvl}" for lvl in range(8))
+COLOR_KEYS = tuple(f"color_{lvl}" for lvl in range(8))
+
+def format_levels_row(silo: SiloInfo, cable_number, timestamp_iso, level_values, product):
     row = OrderedDict()
-    row["silo_group"] = silo.group.name if silo.group else None
+    row["silo_group"] = silo.group_name
     row["silo_number"] = silo.silo_number
     row["cable_number"] = cable_number
-    states = []
+    palette = _status_palette()
+    level_color = palette.level_color
+    classify = _classifier_for(product)
+    worst = ST_NONE
 
     for lvl in range(8):
         temp = level_values.get(lvl)
 
         if temp is None:
             # treat missing reading as a DISCONNECT state
-            state = "disconnect"
-            color = _color_for_state("disconnect")
+            code = ST_DISCONNECT
+        elif classify is None:
+            code = ST_NONE
         else:
             # normal threshold-based coloring
-            state, color = get_status_color(temp, product) if product else (None, None)
+            code = classify(temp)
 
-        row[f"level_{lvl}"] = (round(temp, 2) if temp is not None else None)
-        row[f"color_{lvl}"] = _normalize_hex(color)  # <-- normalize before emitting
-        states.append(state)
+        row[LEVEL_KEYS[lvl]] = (round(temp, 2) if temp is not None else None)
+        row[COLOR_KEYS[lvl]] = level_color[code]  # already normalized
+        if code > worst:
+            worst = code
 
     # ensure 'disconnect' wins over warn/critical/normal
-    _, silo_color = worst_state_color(states)
-    row["silo_color"] = _normalize_hex(silo_color) or _color_for_state("disconnect") or "#ffffff"
+    row["silo_color"] = palette.worst_color[worst]
     row["timestamp"] = timestamp_iso
     return row
 
-def format_sensor_row_from_reading(r, product_by_silo):
-    sensor = r.sensor
-    cable = sensor.cable
-    silo = cable.silo
-    temp = _temperature_from_any(r)
-    product = product_by_silo.get(silo.id)
-    state, color = get_status_color(temp, product) if product else (None, None)
+def format_sensor_row(topo: Topology, sensor_id, temp, timestamp_iso, product_by_silo):
+    """One per-sensor row (readings or readings_raw); labels resolved from the topology snapshot."""
+    sensor = topo.sensors[sensor_id]
+    silo = topo.silos[sensor.silo_id]
+    classify = _classifier_for(product_by_silo.get(silo.id))
+    code = classify(temp) if classify is not None else ST_NONE
+    state, color = STATE_NAMES[code], _status_palette().level_color[code]
     return OrderedDict([
-        ("sensor_id", r.sensor_id),
-        ("group_id", silo.group.id if silo.group else None),
+        ("sensor_id", sensor_id),
+        ("group_id", silo.group_id),
         ("silo_number", silo.silo_number),
-        ("cable_index", cable.cable_index),
+        ("cable_index", sensor.cable_index),
         ("level_index", sensor.sensor_index),
         ("state", state),
-        ("color", _normalize_hex(color)),  # <-- normalize
+        ("color", color),  # already normalized
         ("temperature", round(temp, 2) if temp is not None else None),
-        ("timestamp", _timestamp_iso_from_any(r)),
-    ])
-
-def format_sensor_row_from_raw(raw_row, sensor, product_by_silo):
-    """raw_row has sensor_id, value_c, polled_at; sensor is a Sensor with relationships."""
-    cable = sensor.cable
-    silo = cable.silo
-    temp = _temperature_from_any(raw_row)
-    product = product_by_silo.get(silo.id)
-    state, color = get_status_color(temp, product) if product else (None, None)
-    return OrderedDict([
-        ("sensor_id", raw_row.sensor_id),
-        ("group_id", silo.group.id if silo.group else None),
-        ("silo_number", silo.silo_number),
-        ("cable_index", cable.cable_index),
-        ("level_index", sensor.sensor_index),
-        ("state", state),
-        ("color", _normalize_hex(color)),  # <-- normalize
-        ("temperature", round(temp, 2) if temp is not None else None),
-        ("timestamp", raw_row.polled_at.isoformat()),
+        ("timestamp", timestamp_iso),
     ])
 
 # ----- Flatten per-cable rows -> one row per silo -----
 def _worst_color_from_row(row: dict) -> str:
-    _load_status_colors()
-    status_to_color = _STATUS_COLOR_CACHE or {}
-    color_to_status = {c: s for s, c in status_to_color.items() if c}
-
-    status_rank   = {"disconnect": 4, "critical": 3, "warn": 2, "normal": 1}
-    fallback_rank = {"#9e9e9e": 4, "#808080": 4, "#d14141": 3, "#c7c150": 2, "#46d446": 1}
+    color_rank = _status_palette().color_rank
 
     best_color, best_rank = None, -1
     for k, v in row.items():
         if "_color_" not in k or not isinstance(v, str) or not v:
             continue
-        st  = color_to_status.get(_normalize_hex(v))
-        rnk = status_rank.get(st, fallback_rank.get(_normalize_hex(v), 0))
+        rnk, color = color_rank(v)
         if rnk > best_rank:
-            best_rank, best_color = rnk, _normalize_hex(v)
+            best_rank, best_color = rnk, color
 
     return best_color or "#ffffff"
 
@@ -437,10 +2091,6 @@ def _flatten_rows_per_silo(per_cable_rows):
     one row PER (silo_group, silo_number, timestamp [second precision]).
     Also set silo_color to the worst color present in that row's body.
     """
-    _load_status_colors()
-    status_to_color = _STATUS_COLOR_CACHE or {}
-    color_to_status = {c: s for s, c in status_to_color.items() if c}
-
     grouped = {}  # (silo_group, silo_number, timestamp_norm) -> row dict (flat)
 
     for r in per_cable_rows:
@@ -483,14 +2133,86 @@ def _flatten_rows_per_silo(per_cable_rows):
     out.sort(key=lambda d: (d["silo_number"], d["timestamp"] or ""))
     return out
 
+# ----- Direct builder: cable x level arrays -> one row per silo -----
+LEVEL_SLOTS = range(8)
+_NO_RANK = (-1, None)
+_CABLE_FLAT_KEYS = {}  # cable_number -> (cable_N_level_0, cable_N_color_0, ..., cable_N_color_7)
+
+def _cable_flat_keys(cable_number) -> tuple:
+    keys = _CABLE_FLAT_KEYS.get(cable_number)
+    if keys is None:
+        keys = tuple(sys.intern(f"cable_{cable_number}_{k}")
+                     for lvl in LEVEL_SLOTS for k in (LEVEL_KEYS[lvl], COLOR_KEYS[lvl]))
+        _CABLE_FLAT_KEYS[cable_number] = keys
+    return keys
+
+class SiloRowBuilder:
+    """
+    Same rows as format_levels_row + _flatten_rows_per_silo, without the per-cable dicts:
+      - add() classifies one cable's 8 levels into flat cells and keeps its worst color
+      - rows() lays the cells out per (silo_group, silo_number, second) and folds the
+        per-cable worst colors into silo_color
+    Cables must be added in the order their keys should appear; re-adding a
+    cable_number to the same row overwrites its cells in place.
+    """
+    __slots__ = ("_palette", "_rows")
+
+    def __init__(self):
+        self._palette = _status_palette()
+        self._rows = {}  # (silo_group, silo_number, second) -> [cable_count, {cable_number: (cells, worst)}]
+
+    def add(self, silo: SiloInfo, cable_number, second: datetime, levels, product):
+        """levels: temps indexed by level (None = missing); second: timestamp already truncated."""
+        key = (silo.group_name, silo.silo_number, second)
+        g = self._rows.get(key)
+        if g is None:
+            g = self._rows[key] = [0, {}]
+        if isinstance(cable_number, int):
+            g[0] = max(g[0], cable_number + 1)
+
+        level_color, level_rank = self._palette.level_color, self._palette.level_rank
+        classify = _classifier_for(product)
+        cells = []
+        worst = _NO_RANK
+        for temp in levels:
+            if temp is None:
+                code = ST_DISCONNECT
+            elif classify is None:
+                code = ST_NONE
+            else:
+                code = classify(temp)
+            cells.append(round(temp, 2) if temp is not None else None)
+            cells.append(level_color[code])
+            rank = level_rank[code]
+            if rank is not None and rank[0] > worst[0]:
+                worst = rank
+        g[1][cable_number] = (cells, worst)
+
+    def rows(self) -> list:
+        out = []
+        for (sg, sn, second), (cable_count, cables) in self._rows.items():
+            row = {"silo_group": sg, "silo_number": sn, "cable_count": cable_count,
+                   "timestamp": second.isoformat()}
+            worst = _NO_RANK
+            for cable_number, (cells, cable_worst) in cables.items():
+                row.update(zip(_cable_flat_keys(cable_number), cells))
+                if cable_worst[0] > worst[0]:
+                    worst = cable_worst
+            row["silo_color"] = worst[1] or "#ffffff"
+            out.append(row)
+
+        out.sort(key=lambda d: (d["silo_number"], d["timestamp"]))
+        return out
+
 # ------------------------------------------------
 # Cable-row helpers (for /readings/by-cable*)
 # ------------------------------------------------
 STATUS_RANK = {"normal": 0, "warn": 1, "critical": 2}
+_CABLE_RANK = tuple(STATUS_RANK.get(name, -1) for name in STATE_NAMES)  # by state code
 
-def _init_cable_row(cable: Cable, silo: Silo, ts_iso: str) -> OrderedDict:
+def _init_cable_row(cable: CableInfo, silo: SiloInfo, ts_iso: str) -> OrderedDict:
     row = OrderedDict([
-        ("silo_group",  silo.group.name if silo.group else None),
+        ("silo_group",  silo.group_name),
         ("silo_number", silo.silo_number),
         ("cable_number", cable.cable_index),
         ("silo_color",  "#ffffff"),
@@ -528,6 +2250,168 @@ def level_pick_max(level_lists):
     return {lvl: (round(max(v), 2) if (v := [x for x in lst if x is not None]) else None)
             for lvl, lst in level_lists.items()}
 
+# ------------------------------------------------
+# Aggregation engine (cross-cable level averages per silo & timestamp)
+#   Pure Python below NUMPY_MIN_ROWS readings or without NumPy; otherwise the
+#   grouping and reductions run on arrays. Both give identical results: sums
+#   accumulate in row order, rounding matches round(x, 2), and only NULLs are
+#   skipped (disconnect sentinels are averaged in, as in avg_ignore_none).
+# ------------------------------------------------
+USE_NUMPY      = _env_flag("USE_NUMPY")
+NUMPY_MIN_ROWS = int(os.environ.get("NUMPY_MIN_ROWS", "512"))
+
+def _numpy_enabled(n_rows: int) -> bool:
+    return np is not None and USE_NUMPY and n_rows >= NUMPY_MIN_ROWS
+
+def _reading_columns(readings):
+    """(sensor_ids, timestamps, values) lists from columnar reading rows."""
+    return (list(map(attrgetter("sensor_id"), readings)),
+            list(map(attrgetter("ts"), readings)),
+            list(map(attrgetter("value_c"), readings)))
+
+def silo_ts_level_avgs(sensor_ids, stamps, values, topo: Topology):
+    """
+    [(silo_id, ts, {level: avg})] for every (silo, ts) seen, in first-seen order;
+    avg is avg_ignore_none over the silo's cables at that level.
+    """
+    if _numpy_enabled(len(sensor_ids)):
+        frame = _np_level_frame(sensor_ids, stamps, values, topo)
+        out = [(sid, stamps[i], {}) for sid, i in zip(frame.group_silo.tolist(), frame.group_first.tolist())]
+        groups, levels = frame.cells()
+        for g, lvl, m in zip(groups, levels, _np_round2(frame.means[frame.present]).tolist()):
+            out[g][2][lvl] = m if m == m else None
+        return out
+
+    grouped = {}
+    sensors = topo.sensors
+    for sensor_id, ts, v in zip(sensor_ids, stamps, values):
+        s = sensors[sensor_id]
+        key = (s.silo_id, ts)
+        level_lists = grouped.get(key)
+        if level_lists is None:
+            level_lists = grouped[key] = defaultdict(list)
+        level_lists[s.sensor_index].append(v)
+    return [(sid, ts, level_lists_to_avg(level_lists)) for (sid, ts), level_lists in grouped.items()]
+
+def day_max_of_level_avgs(sensor_ids, stamps, values, topo: Topology, per_day_max_of_avg):
+    """
+    Fold readings into {(silo_id, 'YYYY-MM-DD') -> {lvl: max over the day of the
+    per-timestamp level avg}}; merges into (and returns) per_day_max_of_avg.
+    """
+    if not _numpy_enabled(len(sensor_ids)):
+        for sid, ts, avgs in silo_ts_level_avgs(sensor_ids, stamps, values, topo):
+            best = per_day_max_of_avg.setdefault((sid, _day_key(ts)), {})
+            for lvl, avg_val in avgs.items():
+                if avg_val is None:
+                    continue
+                cur = best.get(lvl)
+                if cur is None or avg_val > cur:
+                    best[lvl] = avg_val
+        return per_day_max_of_avg
+
+    frame = _np_level_frame(sensor_ids, stamps, values, topo)
+    n_levels = len(frame.levels)
+    group_day = frame.group_ts // 86_400_000_000  # microseconds -> days since epoch
+    _, day_first, day_of_group = _np_first_seen(frame.group_silo * (1 << 32) + group_day)
+
+    avgs = _np_round2(frame.means)
+    cell_group, cell_level = np.divmod(np.arange(len(avgs)), max(n_levels, 1))
+    ok = ~np.isnan(avgs)
+    best = np.full(len(day_first) * n_levels, -np.inf)
+    np.maximum.at(best, (day_of_group[cell_group] * n_levels + cell_level)[ok], avgs[ok])
+
+    day_rows = [per_day_max_of_avg.setdefault((int(frame.group_silo[g]), _day_key(stamps[frame.group_first[g]])), {})
+                for g in day_first.tolist()]
+    for c in np.flatnonzero(best > -np.inf).tolist():
+        d, li = divmod(c, n_levels)
+        lvl, v = int(frame.levels[li]), float(best[c])
+        cur = day_rows[d].get(lvl)
+        if cur is None or v > cur:
+            day_rows[d][lvl] = v
+    return per_day_max_of_avg
+
+# -------- NumPy internals --------
+class _LevelFrame:
+    """
+    Readings reduced to a (group x level) grid, groups = (silo, ts) in first-seen order:
+      - group_silo / group_ts / group_first: per group silo id, ts (us), first row index
+      - levels: distinct sensor_index values (grid columns)
+      - means: flat grid of unrounded averages (NaN where no non-NULL value)
+      - present: flat grid mask of cells that had any reading at all
+    """
+    __slots__ = ("group_silo", "group_ts", "group_first", "levels", "means", "present")
+
+    def cells(self):
+        """(group index list, level list) of the present cells, in grid order."""
+        idx = np.flatnonzero(self.present)
+        if not len(self.levels):
+            return [], []
+        g, li = np.divmod(idx, len(self.levels))
+        return g.tolist(), self.levels[li].tolist()
+
+_NP_SENSOR_TABLES = {}  # topology version -> (sorted sensor ids, silo ids, levels, has_level)
+
+def _np_sensor_tables(topo: Topology):
+    tables = _NP_SENSOR_TABLES.get(topo.version)
+    if tables is None:
+        infos = [topo.sensors[sid] for sid in sorted(topo.sensors)]
+        tables = (np.array([s.id for s in infos], dtype=np.int64),
+                  np.array([s.silo_id for s in infos], dtype=np.int64),
+                  np.array([s.sensor_index or 0 for s in infos], dtype=np.int64),
+                  np.array([s.sensor_index is not None for s in infos], dtype=bool))
+        _NP_SENSOR_TABLES.clear()
+        _NP_SENSOR_TABLES[topo.version] = tables
+    return tables
+
+def _np_first_seen(keys):
+    """Factorize keys in first-seen order -> (unique keys, first index of each, code per element)."""
+    uniq, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return uniq[order], first[order], rank[inverse.reshape(-1)]
+
+def _np_level_frame(sensor_ids, stamps, values, topo: Topology) -> _LevelFrame:
+    ids, silo_tab, level_tab, has_level_tab = _np_sensor_tables(topo)
+    pos = np.searchsorted(ids, np.asarray(sensor_ids, dtype=np.int64))
+    silo = silo_tab[pos]
+    # factorize timestamps by hashing; converting every datetime to datetime64 is far slower
+    ts_index = {}
+    ts_code = np.fromiter((ts_index.setdefault(t, len(ts_index)) for t in stamps),
+                          dtype=np.int64, count=len(stamps))
+    ts_us = np.asarray(list(ts_index), dtype="datetime64[us]").view(np.int64)
+
+    _, group_first, group_of = _np_first_seen(silo * len(ts_index) + ts_code)
+
+    has = has_level_tab[pos]
+    levels, level_code = np.unique(level_tab[pos][has], return_inverse=True)
+    size = len(group_first) * len(levels)
+    cell = group_of[has] * len(levels) + level_code.reshape(-1)
+    vals = np.asarray(values, dtype=float)[has]
+    ok = ~np.isnan(vals)
+    sums = np.bincount(cell[ok], weights=vals[ok], minlength=size)  # sequential, in row order
+    counts = np.bincount(cell[ok], minlength=size)
+
+    frame = _LevelFrame()
+    frame.group_silo = silo[group_first]
+    frame.group_ts = ts_us[ts_code[group_first]]
+    frame.group_first = group_first
+    frame.levels = levels
+    frame.means = np.full(size, np.nan)
+    np.divide(sums, counts, out=frame.means, where=counts > 0)
+    frame.present = np.bincount(cell, minlength=size) > 0
+    return frame
+
+def _np_round2(x):
+    """Elementwise round(v, 2) with Python's exact semantics (NaN passes through)."""
+    scaled = x * 100.0
+    out = np.round(scaled) / 100.0
+    # x * 100 can land on the wrong side of a .5 boundary; let Python decide those
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie).tolist():
+        out[i] = round(float(x[i]), 2)
+    return out
+
 def _iso_day_anchor(day_str: str) -> str:
     return f"{day_str}T00:00:00"
 
@@ -616,21 +2500,59 @@ def _kmeans2_1d(values, max_iter=50):
         labels.append(0 if abs(v - c0) <= abs(v - c1) else 1)
     return labels, (c0, c1)
 
+def _kmeans2_1d_batch(values, mask, max_iter=50):
+    """
+    _kmeans2_1d for every row of a masked (n, k) array at once (NumPy).
+    Each row follows the scalar iteration exactly: same init, same tie rule, sums
+    accumulated column by column (same order as sum()), and a row stops updating
+    once it converges. Rows need >= 2 masked-in cells.
+    Returns: labels (n, k) of 0/1, centroids c0 (n,), c1 (n,)
+    """
+    c0 = np.where(mask, values, np.inf).min(axis=1)
+    c1 = np.where(mask, values, -np.inf).max(axis=1)
+    active = np.ones(len(values), dtype=bool)
+
+    def col_sum(sel):
+        total = np.zeros(len(values))
+        for j in range(values.shape[1]):
+            total = total + np.where(sel[:, j], values[:, j], 0.0)
+        return total
+
+    for _ in range(max_iter):
+        in0 = mask & (np.abs(values - c0[:, None]) <= np.abs(values - c1[:, None]))
+        in1 = mask & ~in0
+        n0, n1 = in0.sum(axis=1), in1.sum(axis=1)
+        new_c0 = np.divide(col_sum(in0), n0, out=c0.copy(), where=n0 > 0)
+        new_c1 = np.divide(col_sum(in1), n1, out=c1.copy(), where=n1 > 0)
+
+        converged = (np.abs(new_c0 - c0) < 1e-9) & (np.abs(new_c1 - c1) < 1e-9)
+        update = active & ~converged
+        c0 = np.where(update, new_c0, c0)
+        c1 = np.where(update, new_c1, c1)
+        active = update
+        if not active.any():
+            break
+
+    labels = np.where(np.abs(values - c0[:, None]) <= np.abs(values - c1[:, None]), 0, 1)
+    return labels, c0, c1
+
 def _latest_whole_silo_profile(silo_ids, start=None, end=None):
     """
     Build one temperature profile per silo (levels 0..7) using the latest RAW snapshot:
       - choose the most recent polled_at per silo (like /avg/latest/by-silo-id)
       - average across all cables for each level (ignore disconnect/Nones)
-    Returns: list of dicts [{"silo": Silo, "timestamp": iso, "levels": {lvl->avg or None}, "product": Product}, ...]
+    Returns: list of dicts [{"silo": SiloInfo, "timestamp": iso, "levels": {lvl->avg or None}, "product": Product}, ...]
     """
-    rows, sensor_by_id, products = _raw_rows_for_silo_ids(silo_ids, start, end)
+    topo = get_topology()
+    rows, products = _latest_raw_rows_for_silo_ids(silo_ids, topo, start, end)
     if not rows:
         return []
+    sensor_by_id = topo.sensors
 
     # latest timestamp per silo
     latest_ts = {}
     for r in rows:
-        silo_id = sensor_by_id[r.sensor_id].cable.silo_id
+        silo_id = sensor_by_id[r.sensor_id].silo_id
         ts = r.polled_at
         if ts and ts > latest_ts.get(silo_id, datetime.min):
             latest_ts[silo_id] = ts
@@ -639,7 +2561,7 @@ def _latest_whole_silo_profile(silo_ids, start=None, end=None):
     level_lists_by_silo = {}    # sid -> {lvl: [temps]}
     for r in rows:
         s = sensor_by_id[r.sensor_id]
-        sid = s.cable.silo_id
+        sid = s.silo_id
         ts = r.polled_at
         if ts != latest_ts.get(sid):
             continue
@@ -649,29 +2571,28 @@ def _latest_whole_silo_profile(silo_ids, start=None, end=None):
             level_lists_by_silo.setdefault(sid, defaultdict(list))
             level_lists_by_silo[sid][lvl].append(float(t))
 
-    # load Silo objects (labels)
-    silos = (Silo.query.filter(Silo.id.in_(list(latest_ts.keys())))
-             .options(selectinload(Silo.group)).all())
-    silo_by_id = {s.id: s for s in silos}
+    silo_by_id = topo.silos
 
     out = []
     for sid, ts in latest_ts.items():
-        # build 0..7 with average of lists
-        lv_lists = level_lists_by_silo.get(sid, {})
-        levels_avg = {}
-        for lvl in range(8):
-            lst = lv_lists.get(lvl, [])
-            levels_avg[lvl] = (round(sum(lst) / len(lst), 2) if lst else None)
         out.append({
             "silo": silo_by_id.get(sid),
             "timestamp": ts.isoformat(),
-            "levels": levels_avg,
+            "levels": _profile_levels(level_lists_by_silo.get(sid, {})),
             "product": products.get(sid)
         })
     # stable order
     out.sort(key=lambda d: d["silo"].silo_number if d["silo"] else 0)
     return out
 
+def _profile_levels(level_lists):
+    """{lvl: [valid temps]} -> {0..7: rounded average or None}."""
+    levels_avg = {}
+    for lvl in range(8):
+        lst = level_lists.get(lvl, [])
+        levels_avg[lvl] = (round(sum(lst) / len(lst), 2) if lst else None)
+    return levels_avg
+
 def _estimate_fill_from_profile(levels_dict):
     """
     Given {0..7 -> temp or None}, run k-means (k=2) on valid temps.
@@ -752,6 +2673,153 @@ def _estimate_fill_from_profile(levels_dict):
         "valid_count": len(valid)
     }
 
+def _estimate_fill_batch(levels_dicts):
+    """
+    _estimate_fill_from_profile for many profiles (same results, same order). With
+    NumPy, validity, k-means and the fill boundary run on one (n_silos x 8) array.
+    """
+    if not _numpy_enabled(8 * len(levels_dicts)):
+        return [_estimate_fill_from_profile(d) for d in levels_dicts]
+
+    values = np.array([[t if isinstance(t, (int, float)) else None for t in map(d.get, range(8))]
+                       for d in levels_dicts], dtype=float)
+    valid = np.isfinite(values) & ~np.isin(values, list(DISCONNECT_SENTINELS))
+    valid_count = valid.sum(axis=1)
+    multi = valid_count >= 2
+
+    labels, c0, c1 = _kmeans2_1d_batch(values[multi], valid[multi])
+    mat_label = np.where(c0 >= c1, 0, 1)
+    material = np.zeros_like(valid)
+    material[multi] = valid[multi] & (labels == mat_label[:, None])
+
+    # topmost material level; +0.5 if the level right above it is (valid, hence) air
+    has_mat = material.any(axis=1)
+    top_mat = 7 - np.argmax(material[:, ::-1], axis=1)
+    above = np.minimum(top_mat + 1, 7)
+    flips = (top_mat < 7) & valid[np.arange(len(values)), above]
+    fill = np.where(has_mat, top_mat + np.where(flips, 0.5, 1.0), 0.0)
+
+    c_mat = np.where(c0 >= c1, c0, c1).tolist()
+    c_air = np.where(c0 >= c1, c1, c0).tolist()
+    valid_l, material_l = valid.tolist(), material.tolist()
+    out = []
+    k = 0
+    for i, d in enumerate(levels_dicts):
+        n_valid = int(valid_count[i])
+        if n_valid < 2:
+            out.append({
+                "fill_index_float": None,
+                "fill_percent": None,
+                "cluster_means": {"air": None, "material": None},
+                "assignments": {lvl: ("material" if valid_l[i][lvl] else None) for lvl in range(8)},
+                "valid_count": n_valid
+            })
+            continue
+        # valid levels first, then the invalid ones (same key order as the scalar path)
+        assign = {lvl: ("material" if material_l[i][lvl] else "air") for lvl in range(8) if valid_l[i][lvl]}
+        assign.update((lvl, None) for lvl in range(8) if not valid_l[i][lvl])
+        fill_idx_f = float(fill[i])
+        out.append({
+            "fill_index_float": round(fill_idx_f, 2),
+            "fill_percent": round((fill_idx_f / 8.0) * 100.0, 1),
+            "cluster_means": {"air": round(c_air[k], 2), "material": round(c_mat[k], 2)},
+            "assignments": assign,
+            "valid_count": n_valid
+        })
+        k += 1
+    return out
+
+def _level_estimate_row(silo: SiloInfo, timestamp_iso, levels, est, debug=False) -> OrderedDict:
+    """One /silos/level-estimate* output row."""
+    row = OrderedDict()
+    row["silo_group"] = silo.group_name
+    row["silo_number"] = silo.silo_number
+    row["timestamp"] = timestamp_iso
+    # echo the whole-silo averaged profile
+    for lvl in range(8):
+        row[f"level_{lvl}"] = levels.get(lvl)
+
+    row["fill_index_float"] = est["fill_index_float"]
+    row["fill_percent"] = est["fill_percent"]
+    row["cluster_means"] = est["cluster_means"]
+    if debug:
+        row["assignments"] = est["assignments"]
+        row["valid_count"] = est["valid_count"]
+    return row
+
+# -------- Fill-level history (hourly readings) --------
+#   (topology version, silo id, hour) -> (levels, estimate), or None for an hour with
+#   no readings. Hours from the newest reading hour on are still open and never stored,
+#   so a repeated or sliding-window query only computes the hours it has not seen.
+#   A request may span at most FILL_HISTORY_CACHE_SIZE (silo, hour) cells, so it never
+#   evicts its own earliest hours before the next poll; ask for fewer silos or hours.
+FILL_HISTORY_CACHE_SIZE = int(os.environ.get("FILL_HISTORY_CACHE_SIZE", "200000"))  # entries
+FILL_HISTORY_MAX_HOURS  = int(os.environ.get("FILL_HISTORY_MAX_HOURS", str(24 * 93)))  # per request
+_ONE_HOUR = timedelta(hours=1)
+
+_FILL_HISTORY = OrderedDict()
+_FILL_HISTORY_LOCK = threading.Lock()
+
+def _hour_floor(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+def _latest_reading_ts(sensor_ids):
+    """Newest readings timestamp among the given sensors (None if they have none)."""
+    return (db.session.query(func.max(READ_TS_COL))
+            .filter(Reading.sensor_id.in_(sensor_ids)).scalar())
+
+def _hourly_fill_estimates(silo_ids, hours, topo: Topology, open_from: datetime, refresh=False):
+    """
+    {(silo_id, hour): (levels, estimate) or None} for every requested pair. Cached pairs
+    are reused; the rest come from one keyset scan of `readings` over the missing span.
+    """
+    keys = [(sid, h) for sid in silo_ids for h in hours]
+    found = {}
+    if not refresh:
+        with _FILL_HISTORY_LOCK:
+            for key in keys:
+                ck = (topo.version,) + key
+                if ck in _FILL_HISTORY:
+                    _FILL_HISTORY.move_to_end(ck)
+                    found[key] = _FILL_HISTORY[ck]
+    missing = [key for key in keys if key not in found]
+    if not missing:
+        return found
+
+    wanted = set(missing)
+    lo = min(h for _sid, h in missing)
+    hi = max(h for _sid, h in missing) + _ONE_HOUR - timedelta(microseconds=1)
+    sensor_ids = topo.sensor_ids_for_silos(sorted({sid for sid, _h in missing}))
+    sensor_by_id = topo.sensors
+    level_lists = {}  # (sid, hour) -> {lvl: [temps]}
+    for batch in _reading_group_batches(sensor_ids, lo, hi, bucket=_hour_floor):
+        for group in batch:
+            hour = _hour_floor(group[0].ts)
+            for r in group:
+                s = sensor_by_id[r.sensor_id]
+                key = (s.silo_id, hour)
+                if key not in wanted:
+                    continue
+                # an hour of only disconnected sensors still gets a (no-estimate) row
+                lists = level_lists.setdefault(key, defaultdict(list))
+                if _is_valid_temp_for_avg(r.value_c):
+                    lists[s.sensor_index].append(float(r.value_c))
+
+    computed = [key for key in missing if key in level_lists]
+    profiles = [_profile_levels(level_lists[key]) for key in computed]
+    fresh = dict.fromkeys(missing)
+    fresh.update(zip(computed, zip(profiles, _estimate_fill_batch(profiles))))
+
+    if FILL_HISTORY_CACHE_SIZE > 0:
+        with _FILL_HISTORY_LOCK:
+            for key, value in fresh.items():
+                if key[1] < open_from:
+                    _FILL_HISTORY[(topo.version,) + key] = value
+            while len(_FILL_HISTORY) > FILL_HISTORY_CACHE_SIZE:
+                _FILL_HISTORY.popitem(last=False)
+    found.update(fresh)
+    return found
+
 # ======================================================
 #                      SENSORS
 # ======================================================
@@ -787,6 +2855,8 @@ def login():
 
 # -------- ALL (readings) --------
 @app.get('/readings/by-sensor')
+@conditional_by_watermark
+@row_formats
 def readings_by_sensor_all():
     sensor_ids = request.args.getlist('sensor_id', type=int)
     if not sensor_ids:
@@ -794,15 +2864,35 @@ def readings_by_sensor_all():
     start = _parse_dt(request.args.get('start'))
     end   = _parse_dt(request.args.get('end'))
 
-    q = _base_readings_query(sensor_ids, start, end)
-    rows = q.order_by(Reading.id.asc(), READ_TS_COL.asc(), Reading.sensor_id.asc()).all()
+    topo = get_topology()
+    sensor_ids = [sid for sid in sensor_ids if sid in topo.sensors]
+    if not sensor_ids:
+        return json_response([])
 
-    product_by_silo = _preload_products_from_reading_rows(rows)
-    out = [format_sensor_row_from_reading(r, product_by_silo) for r in rows]
-    return json_response(out)
+    try:
+        after = _decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    products = _preload_products_for_silo_ids({topo.sensors[sid].silo_id for sid in sensor_ids})
+    groups = _iter_sensor_rows(sensor_ids, start, end, topo, products, after)
+    mode = _stream_mode()
+    if mode:
+        return stream_response(_group_rows(groups), mode)
+    return paged_response(groups, _page_limit())
+
+def _iter_sensor_rows(sensor_ids, start, end, topo: Topology, product_by_silo, after=None):
+    """(cursor_key, rows) per timestamp for /readings/by-sensor, in (ts, id) order."""
+    for part, resume in _resume_partitions([None], after):
+        for group in _reading_groups(sensor_ids, start, end, resume):
+            rows = [format_sensor_row(topo, r.sensor_id, r.value_c, r.ts.isoformat(), product_by_silo)
+                    for r in group]
+            yield (part, group[-1].ts, group[-1].id), rows
 
 # -------- LATEST (readings_raw) --------
 @app.get('/readings/latest/by-sensor')
+@conditional_by_watermark
+@row_formats
 def readings_by_sensor_latest():
     sensor_ids = request.args.getlist('sensor_id', type=int)
     if not sensor_ids:
@@ -810,46 +2900,38 @@ def readings_by_sensor_latest():
     start = _parse_dt(request.args.get('start'))
     end   = _parse_dt(request.args.get('end'))
 
+    topo = get_topology()
+    sensor_ids = [sid for sid in sensor_ids if sid in topo.sensors]
+    if not sensor_ids:
+        return json_response([])
+
     # Use readings_raw
     if ReadingRaw is None:
         # fallback to readings table latest
         q = _base_readings_query(sensor_ids, start, end)
-        rows = q.order_by(READ_TS_COL.desc(), Reading.sensor_id.asc(), Reading.id.desc()).all()
+        rows = db.session.execute(q.order_by(READ_TS_COL.desc(), Reading.sensor_id.asc(), Reading.id.desc())).all()
         latest = {}
         for r in rows:
             if r.sensor_id not in latest:
                 latest[r.sensor_id] = r
-        product_by_silo = _preload_products_from_reading_rows(list(latest.values()))
-        out = [format_sensor_row_from_reading(r, product_by_silo) for r in sorted(latest.values(), key=lambda x: x.sensor_id)]
+        product_by_silo = _preload_products_from_rows(list(latest.values()), topo)
+        out = [format_sensor_row(topo, r.sensor_id, r.value_c, r.ts.isoformat(), product_by_silo)
+               for r in sorted(latest.values(), key=lambda x: x.sensor_id)]
         return json_response(out)
 
-    q = ReadingRaw.query.filter(ReadingRaw.sensor_id.in_(sensor_ids))
-    if start:
-        q = q.filter(ReadingRaw.polled_at >= start)
-    if end:
-        q = q.filter(ReadingRaw.polled_at <= end)
-    rows = q.order_by(ReadingRaw.polled_at.desc(), ReadingRaw.sensor_id.asc(), ReadingRaw.id.desc()).all()
-
-    latest = {}
-    for r in rows:
-        if r.sensor_id not in latest:
-            latest[r.sensor_id] = r
-
-    sensor_by_id = _preload_sensors(list(latest.keys()))
-    silo_ids = {sensor_by_id[sid].cable.silo_id for sid in latest.keys()}
-    products = _preload_products_for_silo_ids(silo_ids)
+    latest = {r.sensor_id: r for r in _latest_raw_rows(sensor_ids, start, end)}
+    products = _preload_products_from_rows(list(latest.values()), topo)
 
     out = []
     for sid in sorted(latest.keys()):
         raw = latest[sid]
-        sensor = sensor_by_id.get(sid)
-        if not sensor:
-            continue
-        out.append(format_sensor_row_from_raw(raw, sensor, products))
+        out.append(format_sensor_row(topo, sid, raw.value_c, raw.polled_at.isoformat(), products))
     return json_response(out)
 
 # -------- MAX (readings) --------
 @app.get('/readings/max/by-sensor')
+@conditional_by_watermark
+@row_formats
 def readings_by_sensor_max():
     sensor_ids = request.args.getlist('sensor_id', type=int)
     if not sensor_ids:
@@ -857,24 +2939,19 @@ def readings_by_sensor_max():
     start = _parse_dt(request.args.get('start'))
     end   = _parse_dt(request.args.get('end'))
 
-    q = _base_readings_query(sensor_ids, start, end)
-    rows = q.order_by(READ_TS_COL.desc(), Reading.sensor_id.asc()).all()
+    topo = get_topology()
+    sensor_ids = [sid for sid in sensor_ids if sid in topo.sensors]
+    if not sensor_ids:
+        return json_response([])
 
-    best_row_per_day = {}
-    best_temp_per_day = {}
-    for r in rows:
-        ts = _ts_reading(r)
-        k = (r.sensor_id, _day_key(ts))
-        cur = best_temp_per_day.get(k)
-        temp = _temperature_from_any(r)
-        if cur is None or (temp is not None and temp > cur):
-            best_temp_per_day[k] = temp
-            best_row_per_day[k] = r
-
-    chosen = list(best_row_per_day.values())
-    chosen.sort(key=lambda r: _day_key(_ts_reading(r)), reverse=True)
-    product_by_silo = _preload_products_from_reading_rows(chosen)
-    out = [format_sensor_row_from_reading(r, product_by_silo) for r in chosen]
+    chosen = _daily_max_rows(sensor_ids, start, end)
+    # newest day first; within a day, sensors whose latest sample is newest first
+    chosen.sort(key=lambda r: r.sensor_id)
+    chosen.sort(key=lambda r: r.last_at, reverse=True)
+    chosen.sort(key=lambda r: _day_key(r.peak_at), reverse=True)
+    product_by_silo = _preload_products_from_rows(chosen, topo)
+    out = [format_sensor_row(topo, r.sensor_id, _temperature_from_any(r), r.peak_at.isoformat(), product_by_silo)
+           for r in chosen]
     return json_response(out)
 
 # ======================================================
@@ -883,6 +2960,8 @@ def readings_by_sensor_max():
 
 # -------- ALL (readings) --------
 @app.get('/readings/by-cable')
+@conditional_by_watermark
+@row_formats
 def readings_by_cable_all():
     cable_ids = request.args.getlist('cable_id', type=int)
     if not cable_ids:
@@ -890,35 +2969,66 @@ def readings_by_cable_all():
     start = _parse_dt(request.args.get('start'))
     end   = _parse_dt(request.args.get('end'))
 
-    readings, product_by_silo = _sensor_rows_for_cables_window_from_readings(cable_ids, start, end)
-    if not readings:
-        return json_response([])
+    topo = get_topology()
+    try:
+        after = _decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
 
-    grouped = {}
+    silo_ids = {topo.cables[cid].silo_id for cid in cable_ids if cid in topo.cables}
+    products = _preload_products_for_silo_ids(silo_ids)
+    groups = _iter_cable_rows(cable_ids, start, end, topo, products, after)
+    mode = _stream_mode()
+    if mode:
+        return stream_response(_group_rows(groups), mode)
+    return paged_response(groups, _page_limit())
+
+def _accumulate_cable_rows(readings, topo: Topology, product_by_silo, grouped):
+    """Fold reading rows into {(cable_id, ts_iso) -> cable row under construction}."""
+    level_color = _status_palette().level_color
     for r in readings:
-        s = r.sensor; c = s.cable; silo = c.silo
-        ts_iso = _timestamp_iso_from_any(r)
+        s = topo.sensors[r.sensor_id]; c = topo.cables[s.cable_id]; silo = topo.silos[s.silo_id]
+        ts_iso = r.ts.isoformat()
         key = (c.id, ts_iso)
         row = grouped.get(key)
         if row is None:
             row = _init_cable_row(c, silo, ts_iso=ts_iso)
             grouped[key] = row
 
-        product = product_by_silo.get(silo.id)
-        temp = _temperature_from_any(r)
-        state, color = get_status_color(temp, product) if product else (None, "#ffffff")
-        rank = STATUS_RANK.get(state, -1)
+        classify = _classifier_for(product_by_silo.get(silo.id))
+        temp = r.value_c
+        if classify is not None:
+            code = classify(temp)
+            color = level_color[code]
+        else:
+            code, color = ST_NONE, "#ffffff"
+        rank = _CABLE_RANK[code]
         if rank > row["_worst_rank"]:
             row["_worst_rank"] = rank
             row["silo_color"] = color
         row["_levels"][s.sensor_index] = (round(temp, 2) if temp is not None else None, color)
-
-    items = sorted(grouped.items(), key=lambda kv: (kv[1]["cable_number"], kv[1]["timestamp"]))
-    out = [_finalize_cable_row(row) for _, row in items]
-    return json_response(out)
+    return grouped
+
+def _iter_cable_rows(cable_ids, start, end, topo: Topology, product_by_silo, after=None):
+    """(cursor_key, rows) per timestamp for /readings/by-cable: cable_number, then time."""
+    by_number = defaultdict(list)
+    for cid in dict.fromkeys(cable_ids):
+        c = topo.cables.get(cid)
+        if c is not None:
+            by_number[c.cable_index].append(cid)
+    for cable_number, resume in _resume_partitions(sorted(by_number), after):
+        sensor_ids = topo.sensor_ids_for_cables(by_number[cable_number])
+        if not sensor_ids:
+            continue
+        for group in _reading_groups(sensor_ids, start, end, resume):
+            rows = [_finalize_cable_row(row)
+                    for row in _accumulate_cable_rows(group, topo, product_by_silo, {}).values()]
+            yield (cable_number, group[-1].ts, group[-1].id), rows
 
 # -------- LATEST (readings_raw) --------
 @app.get('/readings/latest/by-cable')
+@conditional_by_watermark
+@row_formats
 def readings_by_cable_latest():
     cable_ids = request.args.getlist('cable_id', type=int)
     if not cable_ids:
@@ -927,36 +3037,35 @@ def readings_by_cable_latest():
     end   = _parse_dt(request.args.get('end'))
 
     # get sensors for those cables
-    sensors = _sensors_for_cables(cable_ids)
-    if not sensors:
+    topo = get_topology()
+    sensor_ids = topo.sensor_ids_for_cables(cable_ids)
+    if not sensor_ids:
         return json_response([])
-    sensor_ids = [s.id for s in sensors]
-    sensor_by_id = {s.id: s for s in sensors}
-    silo_ids = {s.cable.silo_id for s in sensors}
+    sensor_by_id = topo.sensors
+    silo_ids = {sensor_by_id[sid].silo_id for sid in sensor_ids}
 
     if ReadingRaw is None:
         # fallback to readings
-        rows, products = _sensor_rows_for_cables_window_from_readings(cable_ids, start, end)
+        rows, products = _sensor_rows_for_cables_window_from_readings(cable_ids, start, end, topo)
         if not rows:
             return json_response([])
         latest_ts = {}
         for r in rows:
-            c = r.sensor.cable
-            ts = _ts_reading(r)
+            c = topo.cables[sensor_by_id[r.sensor_id].cable_id]
+            ts = r.ts
             if ts and ts > latest_ts.get(c.id, datetime.min):
                 latest_ts[c.id] = ts
         per_cable_levels, meta = {}, {}
-        products = _preload_products_from_reading_rows(rows)
         for r in rows:
-            s = r.sensor; c = s.cable; silo = c.silo
-            ts = _ts_reading(r)
+            s = sensor_by_id[r.sensor_id]; c = topo.cables[s.cable_id]; silo = topo.silos[s.silo_id]
+            ts = r.ts
             if ts != latest_ts.get(c.id):
                 continue
             if c.id not in per_cable_levels:
                 per_cable_levels[c.id] = {}
                 meta[c.id] = (silo, c.cable_index, ts, products.get(silo.id))
             if s.sensor_index not in per_cable_levels[c.id]:
-                per_cable_levels[c.id][s.sensor_index] = _temperature_from_any(r)
+                per_cable_levels[c.id][s.sensor_index] = r.value_c
         out = []
         for cid, levels in per_cable_levels.items():
             silo, cable_number, ts, product = meta[cid]
@@ -965,28 +3074,23 @@ def readings_by_cable_latest():
         out.sort(key=lambda d: (d["silo_number"], d["cable_number"]))
         return json_response(out)
 
-    # raw path
-    q = ReadingRaw.query.filter(ReadingRaw.sensor_id.in_(sensor_ids))
-    if start:
-        q = q.filter(ReadingRaw.polled_at >= start)
-    if end:
-        q = q.filter(ReadingRaw.polled_at <= end)
-    rows = q.order_by(ReadingRaw.polled_at.desc(), ReadingRaw.sensor_id.asc(), ReadingRaw.id.desc()).all()
+    # raw path (one row per sensor)
+    rows = _latest_raw_rows(sensor_ids, start, end)
     if not rows:
         return json_response([])
 
     latest_ts = {}  # cable_id -> ts
     for r in rows:
-        c = sensor_by_id[r.sensor_id].cable
-        if r.polled_at > latest_ts.get(c.id, datetime.min):
-            latest_ts[c.id] = r.polled_at
+        cid = sensor_by_id[r.sensor_id].cable_id
+        if r.polled_at > latest_ts.get(cid, datetime.min):
+            latest_ts[cid] = r.polled_at
 
     product_by_silo = _preload_products_for_silo_ids(silo_ids)
     per_cable_levels = {}
     per_cable_meta = {}
 
     for r in rows:
-        s = sensor_by_id[r.sensor_id]; c = s.cable; silo = c.silo
+        s = sensor_by_id[r.sensor_id]; c = topo.cables[s.cable_id]; silo = topo.silos[s.silo_id]
         ts = r.polled_at
         if ts != latest_ts.get(c.id):
             continue
@@ -994,7 +3098,7 @@ def readings_by_cable_latest():
             per_cable_levels[c.id] = {}
             per_cable_meta[c.id] = (silo, c.cable_index, ts, product_by_silo.get(silo.id))
         if s.sensor_index not in per_cable_levels[c.id]:
-            per_cable_levels[c.id][s.sensor_index] = _temperature_from_any(r)
+            per_cable_levels[c.id][s.sensor_index] = r.value_c
 
     out = []
     for cid, levels in per_cable_levels.items():
@@ -1006,6 +3110,8 @@ def readings_by_cable_latest():
 
 # -------- MAX (readings) --------
 @app.get('/readings/max/by-cable')
+@conditional_by_watermark
+@row_formats
 def readings_by_cable_max():
     cable_ids = request.args.getlist('cable_id', type=int)
     if not cable_ids:
@@ -1013,16 +3119,17 @@ def readings_by_cable_max():
     start = _parse_dt(request.args.get('start'))
     end   = _parse_dt(request.args.get('end'))
 
-    readings, products = _sensor_rows_for_cables_window_from_readings(cable_ids, start, end)
-    if not readings:
+    topo = get_topology()
+    daily = _daily_max_rows(topo.sensor_ids_for_cables(cable_ids), start, end)
+    if not daily:
         return json_response([])
+    products = _preload_products_from_rows(daily, topo)
 
     grouped = {}
     meta = {}
-    for r in readings:
-        s = r.sensor; c = s.cable; silo = c.silo
-        tsv = _ts_reading(r)
-        d = _day_key(tsv)
+    for r in daily:
+        s = topo.sensors[r.sensor_id]; c = topo.cables[s.cable_id]; silo = topo.silos[s.silo_id]
+        d = _day_key(r.peak_at)
         key = (c.id, d)
         if key not in grouped:
             grouped[key] = defaultdict(list)
@@ -1044,84 +3151,110 @@ def readings_by_cable_max():
 #                      SILOS
 # ======================================================
 
-def _sensor_rows_for_silos_window(silo_ids, start, end):
-    return _sensor_rows_for_silos_window_from_readings(silo_ids, start, end)
+def _sensor_rows_for_silos_window(silo_ids, start, end, topo: Topology):
+    return _sensor_rows_for_silos_window_from_readings(silo_ids, start, end, topo)
 
-def _avg_rows_for_silo_ids(silo_ids, start, end):
-    return _sensor_rows_for_silos_window_from_readings(silo_ids, start, end)
+def _avg_rows_for_silo_ids(silo_ids, start, end, topo: Topology):
+    return _sensor_rows_for_silos_window_from_readings(silo_ids, start, end, topo)
 
 # -------- ALL (readings) --------
 @app.get('/readings/by-silo-id')
-def readings_by_silo_id_all():
-    silo_ids = request.args.getlist('silo_id', type=int)
-    if not silo_ids:
-        silo_ids = _all_silo_ids()
+@conditional_by_watermark
+@row_formats
+def readings_by_silo_id_all(selector: SiloSelector | None = None):
+    topo = get_topology()
+    silo_ids = (selector or SiloSelector.from_request()).resolve(topo)
     if not silo_ids:
         return json_response([])
 
     start = _parse_dt(request.args.get('start'))
     end   = _parse_dt(request.args.get('end'))
-    readings, products = _sensor_rows_for_silos_window_from_readings(silo_ids, start, end)
-    if not readings:
-        return json_response([])
-
-    grouped = {}
-    meta = {}
-    for r in readings:
-        s = r.sensor; c = s.cable; silo = c.silo
-        ts_iso = _timestamp_iso_from_any(r)
-        key = (silo.id, c.id, ts_iso)
-        if key not in grouped:
-            grouped[key] = {}
-            meta[key] = (silo, c.cable_index, products.get(silo.id))
-        grouped[key][s.sensor_index] = _temperature_from_any(r)
 
-    out = []
-    for key, levels in grouped.items():
-        silo, cable_number, product = meta[key]
-        out.append(format_levels_row(silo, cable_number, key[2], levels, product))
+    try:
+        after = _decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
 
-    out.sort(key=lambda d: (_parse_iso(d["timestamp"]), d["silo_number"], d["cable_number"]))
-    return json_response(_flatten_rows_per_silo(out))
+    products = _preload_products_for_silo_ids(silo_ids)
+    groups = _iter_silo_rows(silo_ids, start, end, topo, products, after)
+    mode = _stream_mode()
+    if mode:
+        return stream_response(_group_rows(groups), mode)
+    return paged_response(groups, _page_limit())
+
+def _silo_second_rows(readings, topo: Topology, products) -> list:
+    """Flat rows for one (silo, second) group: levels per (cable, exact timestamp), last value wins."""
+    per_cable = {}  # (cable_id, ts) -> (silo, cable_number, ts, levels)
+    for r in readings:
+        s = topo.sensors[r.sensor_id]
+        key = (s.cable_id, r.ts)
+        entry = per_cable.get(key)
+        if entry is None:
+            entry = per_cable[key] = (topo.silos[s.silo_id], topo.cables[s.cable_id].cable_index,
+                                      r.ts, [None] * 8)
+        if s.sensor_index in LEVEL_SLOTS:
+            entry[3][s.sensor_index] = r.value_c
+
+    builder = SiloRowBuilder()
+    for silo, cable_number, ts, levels in sorted(per_cable.values(), key=lambda e: (e[2], e[1])):
+        builder.add(silo, cable_number, ts.replace(microsecond=0), levels, products.get(silo.id))
+    return builder.rows()
+
+def _silos_by_number(silo_ids, topo: Topology):
+    return sorted((topo.silos[sid] for sid in dict.fromkeys(silo_ids) if sid in topo.silos),
+                  key=lambda si: si.silo_number)
+
+def _iter_silo_rows(silo_ids, start, end, topo: Topology, products, after=None):
+    """(cursor_key, rows) per second bucket for /readings/by-silo-id: silo_number, then time."""
+    silos = {silo.id: silo for silo in _silos_by_number(silo_ids, topo)}
+    for sid, resume in _resume_partitions(list(silos), after):
+        sensor_ids = topo.sensor_ids_for_silos([sid])
+        if not sensor_ids:
+            continue
+        for group in _reading_groups(sensor_ids, start, end, resume,
+                                     bucket=lambda ts: ts.replace(microsecond=0)):
+            yield (sid, group[-1].ts, group[-1].id), _silo_second_rows(group, topo, products)
 
 # -------- LATEST (readings_raw) --------
 @app.get('/readings/latest/by-silo-id')
-def readings_by_silo_id_latest():
-    silo_ids = request.args.getlist('silo_id', type=int)
-    if not silo_ids:
-        silo_ids = _all_silo_ids()
+@conditional_by_watermark
+@row_formats
+@cached_by_watermark
+def readings_by_silo_id_latest(selector: SiloSelector | None = None):
+    topo = get_topology()
+    silo_ids = (selector or SiloSelector.from_request()).resolve(topo)
     if not silo_ids:
         return json_response([])
 
     start = _parse_dt(request.args.get('start'))
     end   = _parse_dt(request.args.get('end'))
-    rows, sensor_by_id, products = _raw_rows_for_silo_ids(silo_ids, start, end)
+    rows, products = _latest_raw_rows_for_silo_ids(silo_ids, topo, start, end)
     if not rows:
         return json_response([])
+    sensor_by_id = topo.sensors
 
     # 1) Track the latest timestamp per (silo_id, cable_id)
     latest_ts = {}  # (silo_id, cable_id) -> datetime
     for r in rows:
-        s = sensor_by_id[r.sensor_id]; c = s.cable; silo = c.silo
+        s = sensor_by_id[r.sensor_id]; c = topo.cables[s.cable_id]; silo = topo.silos[s.silo_id]
         ts = r.polled_at
         key = (silo.id, c.id)
         if ts and ts > latest_ts.get(key, datetime.min):
             latest_ts[key] = ts
 
-    # 2) Build levels for those latest cable timestamps
+    # 2) Build levels for those latest cable timestamps (first value per level wins)
     per_key_levels = {}
     meta = {}
     for r in rows:
-        s = sensor_by_id[r.sensor_id]; c = s.cable; silo = c.silo
+        s = sensor_by_id[r.sensor_id]; c = topo.cables[s.cable_id]; silo = topo.silos[s.silo_id]
         ts = r.polled_at
         key = (silo.id, c.id)
         if ts != latest_ts.get(key):
             continue
         if key not in per_key_levels:
             per_key_levels[key] = {}
-            meta[key] = (silo, c.cable_index, ts, products.get(silo.id))
-        if s.sensor_index not in per_key_levels[key]:
-            per_key_levels[key][s.sensor_index] = _temperature_from_any(r)
+            meta[key] = (silo, c.cable_index, products.get(silo.id))
+        per_key_levels[key].setdefault(s.sensor_index, r.value_c)
 
     if not per_key_levels:
         return json_response([])
@@ -1135,40 +3268,37 @@ def readings_by_silo_id_latest():
         if (silo_id not in latest_sec_per_silo) or (sec > latest_sec_per_silo[silo_id]):
             latest_sec_per_silo[silo_id] = sec
 
-    # 4) Emit one per-cable row but **with the silo's latest bucketed timestamp**
-    out = []
-    for (silo_id, _cable_id), levels in per_key_levels.items():
-        silo, cable_number, ts_actual, product = meta[(silo_id, _cable_id)]
-        shared_ts = latest_sec_per_silo.get(silo_id, ts_actual.replace(microsecond=0))
-        out.append(
-            format_levels_row(silo, cable_number, shared_ts.isoformat(), levels, product)
-        )
-
-    # 5) Flatten to one row per silo+timestamp (they now share the same ts)
-    out.sort(key=lambda d: (d["silo_number"], d["cable_number"]))
-    return json_response(_flatten_rows_per_silo(out))
+    # 4) One flat row per silo, cables in (silo_number, cable_number) order
+    builder = SiloRowBuilder()
+    for key in sorted(per_key_levels, key=lambda k: (meta[k][0].silo_number, meta[k][1])):
+        silo, cable_number, product = meta[key]
+        levels = per_key_levels[key]
+        builder.add(silo, cable_number, latest_sec_per_silo[silo.id],
+                    [levels.get(lvl) for lvl in LEVEL_SLOTS], product)
+    return json_response(builder.rows())
 
 # -------- MAX (readings) --------
 @app.get('/readings/max/by-silo-id')
-def readings_by_silo_id_max():
-    silo_ids = request.args.getlist('silo_id', type=int)
-    if not silo_ids:
-        silo_ids = _all_silo_ids()
+@conditional_by_watermark
+@row_formats
+def readings_by_silo_id_max(selector: SiloSelector | None = None):
+    topo = get_topology()
+    silo_ids = (selector or SiloSelector.from_request()).resolve(topo)
     if not silo_ids:
         return json_response([])
 
     start = _parse_dt(request.args.get('start'))
     end   = _parse_dt(request.args.get('end'))
-    readings, products = _sensor_rows_for_silos_window_from_readings(silo_ids, start, end)
-    if not readings:
+    daily = _daily_max_rows(topo.sensor_ids_for_silos(silo_ids), start, end)
+    if not daily:
         return json_response([])
+    products = _preload_products_from_rows(daily, topo)
 
     grouped = {}
     meta = {}
-    for r in readings:
-        s = r.sensor; c = s.cable; silo = c.silo
-        tsv = _ts_reading(r)
-        d = _day_key(tsv)
+    for r in daily:
+        s = topo.sensors[r.sensor_id]; c = topo.cables[s.cable_id]; silo = topo.silos[s.silo_id]
+        d = _day_key(r.peak_at)
         key = (silo.id, c.id, d)
         if key not in grouped:
             grouped[key] = defaultdict(list)
@@ -1189,39 +3319,15 @@ def readings_by_silo_id_max():
 # -------- by SILO NUMBER wrappers --------
 @app.get('/readings/by-silo-number')
 def readings_by_silo_number_all():
-    numbers = request.args.getlist('silo_number', type=int)
-    if not numbers:
-        numbers = _all_silo_numbers()
-    if not numbers:
-        return json_response([])
-    silo_ids = _silo_number_to_ids(numbers)
-    with app.test_request_context(query_string=[('silo_id', sid) for sid in silo_ids] +
-                                  [(k, v) for k, v in request.args.items() if k != 'silo_number']):
-        return readings_by_silo_id_all()
+    return readings_by_silo_id_all(SiloSelector.from_request("number"))
 
 @app.get('/readings/latest/by-silo-number')
 def readings_by_silo_number_latest():
-    numbers = request.args.getlist('silo_number', type=int)
-    if not numbers:
-        numbers = _all_silo_numbers()
-    if not numbers:
-        return json_response([])
-    silo_ids = _silo_number_to_ids(numbers)
-    with app.test_request_context(query_string=[('silo_id', sid) for sid in silo_ids] +
-                                  [(k, v) for k, v in request.args.items() if k != 'silo_number']):
-        return readings_by_silo_id_latest()
+    return readings_by_silo_id_latest(SiloSelector.from_request("number"))
 
 @app.get('/readings/max/by-silo-number')
 def readings_by_silo_number_max():
-    numbers = request.args.getlist('silo_number', type=int)
-    if not numbers:
-        numbers = _all_silo_numbers()
-    if not numbers:
-        return json_response([])
-    silo_ids = _silo_number_to_ids(numbers)
-    with app.test_request_context(query_string=[('silo_id', sid) for sid in silo_ids] +
-                                  [(k, v) for k, v in request.args.items() if k != 'silo_number']):
-        return readings_by_silo_id_max()
+    return readings_by_silo_id_max(SiloSelector.from_request("number"))
 
 # ======================================================
 #           SILO-AVERAGED (across all cables)
@@ -1229,47 +3335,56 @@ def readings_by_silo_number_max():
 
 # -------- ALL (readings) --------
 @app.get('/readings/avg/by-silo-id')
-def readings_by_silo_id_avg_all():
-    silo_ids = request.args.getlist('silo_id', type=int)
-    if not silo_ids:
-        silo_ids = _all_silo_ids()
+@conditional_by_watermark
+@row_formats
+def readings_by_silo_id_avg_all(selector: SiloSelector | None = None):
+    topo = get_topology()
+    silo_ids = (selector or SiloSelector.from_request()).resolve(topo)
     if not silo_ids:
         return json_response([])
 
     start = _parse_dt(request.args.get('start'))
     end   = _parse_dt(request.args.get('end'))
 
-    readings, products = _avg_rows_for_silo_ids(silo_ids, start, end)
-    if not readings:
-        return json_response([])
-
-    grouped = {}
-    for r in readings:
-        s = r.sensor; silo = s.cable.silo
-        ts_iso = _timestamp_iso_from_any(r)
-        key = (silo.id, ts_iso)
-        if key not in grouped:
-            grouped[key] = defaultdict(list)
-        grouped[key][s.sensor_index].append(_temperature_from_any(r))
-
-    out = []
-    # reusable silo cache
-    silo_by_id = {s.id: s for s in {rr.sensor.cable.silo for rr in readings}}
-    for (sid, ts), level_lists in grouped.items():
-        silo = silo_by_id[sid]
-        product = products.get(sid)
-        levels_avg = level_lists_to_avg(level_lists)
-        out.append(format_levels_row(silo, None, ts, levels_avg, product))
+    try:
+        after = _decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
 
-    out.sort(key=lambda d: (d["silo_number"], _parse_iso(d["timestamp"])))
-    return json_response(out)
+    products = _preload_products_for_silo_ids(silo_ids)
+    groups = _iter_silo_avg_rows(silo_ids, start, end, topo, products, after)
+    mode = _stream_mode()
+    if mode:
+        return stream_response(_group_rows(groups), mode)
+    return paged_response(groups, _page_limit())
+
+def _silo_avg_level_rows(readings, topo: Topology, products):
+    """One cross-cable averaged format_levels_row per (silo, timestamp), in first-seen order."""
+    silo_by_id = topo.silos
+    return [format_levels_row(silo_by_id[sid], None, ts.isoformat(), levels_avg, products.get(sid))
+            for sid, ts, levels_avg in silo_ts_level_avgs(*_reading_columns(readings), topo)]
+
+def _iter_silo_avg_rows(silo_ids, start, end, topo: Topology, products, after=None):
+    """(cursor_key, rows) per timestamp for /readings/avg/by-silo-id: silo_number, then time."""
+    silos = {silo.id: silo for silo in _silos_by_number(silo_ids, topo)}
+    for sid, resume in _resume_partitions(list(silos), after):
+        sensor_ids = topo.sensor_ids_for_silos([sid])
+        if not sensor_ids:
+            continue
+        for batch in _reading_group_batches(sensor_ids, start, end, resume):
+            # one partition = one silo, so each group is exactly one averaged row
+            rows = _silo_avg_level_rows([r for group in batch for r in group], topo, products)
+            for group, row in zip(batch, rows):
+                yield (sid, group[-1].ts, group[-1].id), [row]
 
 # -------- LATEST (readings_raw) --------
 @app.get('/readings/avg/latest/by-silo-id')
-def readings_by_silo_id_avg_latest():
-    silo_ids = request.args.getlist('silo_id', type=int)
-    if not silo_ids:
-        silo_ids = _all_silo_ids()
+@conditional_by_watermark
+@row_formats
+@cached_by_watermark
+def readings_by_silo_id_avg_latest(selector: SiloSelector | None = None):
+    topo = get_topology()
+    silo_ids = (selector or SiloSelector.from_request()).resolve(topo)
     if not silo_ids:
         return json_response([])
 
@@ -1280,9 +3395,10 @@ def readings_by_silo_id_avg_latest():
     color_from = (request.args.get('color_from') or 'avg').lower()
     color_from_max = (color_from == 'max')
 
-    rows, sensor_by_id, products = _raw_rows_for_silo_ids(silo_ids, start, end)
+    rows, products = _latest_raw_rows_for_silo_ids(silo_ids, topo, start, end)
     if not rows:
         return json_response([])
+    sensor_by_id = topo.sensors
 
     def second_bucket(dt): return dt.replace(microsecond=0) if dt else None
 
@@ -1291,7 +3407,7 @@ def readings_by_silo_id_avg_latest():
         s = sensor_by_id.get(r.sensor_id)
         if not s or not r.polled_at:
             continue
-        sid = s.cable.silo_id
+        sid = s.silo_id
         sec = second_bucket(r.polled_at)
         cur = latest_second.get(sid)
         if (cur is None) or (sec > cur):
@@ -1305,7 +3421,7 @@ def readings_by_silo_id_avg_latest():
         s = sensor_by_id.get(r.sensor_id)
         if not s or not r.polled_at:
             continue
-        sid = s.cable.silo_id
+        sid = s.silo_id
         if second_bucket(r.polled_at) != latest_second.get(sid):
             continue
         key = (sid, r.sensor_id)
@@ -1317,15 +3433,13 @@ def readings_by_silo_id_avg_latest():
     for (sid, sensor_id), r in chosen_per_sensor.items():
         s = sensor_by_id[sensor_id]
         lvl = s.sensor_index
-        t   = _temperature_from_any(r)
+        t   = r.value_c
         if _is_disconnect_temp(t):
             continue
         per_silo_vals.setdefault(sid, defaultdict(list))
         per_silo_vals[sid][lvl].append(float(t))
 
-    silos = (Silo.query.filter(Silo.id.in_(list(per_silo_vals.keys())))
-             .options(selectinload(Silo.group)).all())
-    silo_by_id = {s.id: s for s in silos}
+    silo_by_id = topo.silos
 
     out = []
     for sid, level_lists in per_silo_vals.items():
@@ -1366,52 +3480,36 @@ def readings_by_silo_id_avg_latest():
     return json_response(out)
 
 # -------- MAX (readings) --------
+def _accumulate_day_max_of_avg(readings, topo: Topology, per_day_max_of_avg):
+    """Fold hourly readings into {(silo_id, day) -> {lvl: max of the hourly cross-cable avg}}."""
+    return day_max_of_level_avgs(*_reading_columns(readings), topo, per_day_max_of_avg)
+
 @app.get('/readings/avg/max/by-silo-id')
-def readings_by_silo_id_avg_max():
-    silo_ids = request.args.getlist('silo_id', type=int)
-    if not silo_ids:
-        silo_ids = _all_silo_ids()
+@conditional_by_watermark
+@row_formats
+def readings_by_silo_id_avg_max(selector: SiloSelector | None = None):
+    topo = get_topology()
+    silo_ids = (selector or SiloSelector.from_request()).resolve(topo)
     if not silo_ids:
         return json_response([])
 
     start = _parse_dt(request.args.get('start'))
     end   = _parse_dt(request.args.get('end'))
 
-    readings, products = _avg_rows_for_silo_ids(silo_ids, start, end)
-    if not readings:
+    # whole rolled-up days from readings_daily_levels, the rest live
+    days, segments = _split_window_by_rollup(start, end)
+    per_day_max_of_avg = _daily_level_max_avg_rollup(silo_ids, *days) if days else {}
+    products = {}
+    for seg_start, seg_end in segments:
+        readings, seg_products = _avg_rows_for_silo_ids(silo_ids, seg_start, seg_end, topo)
+        products.update(seg_products)
+        _accumulate_day_max_of_avg(readings, topo, per_day_max_of_avg)
+    if not per_day_max_of_avg:
         return json_response([])
+    missing = {sid for (sid, _) in per_day_max_of_avg} - products.keys()
+    products.update(_preload_products_for_silo_ids(missing))
 
-    per_ts_levels = {}
-    for r in readings:
-        s = r.sensor; silo = s.cable.silo
-        ts_iso = _timestamp_iso_from_any(r)
-        key = (silo.id, ts_iso)
-        if key not in per_ts_levels:
-            per_ts_levels[key] = defaultdict(list)
-        per_ts_levels[key][s.sensor_index].append(_temperature_from_any(r))
-
-    per_ts_avgs = {}
-    for key, level_lists in per_ts_levels.items():
-        per_ts_avgs[key] = level_lists_to_avg(level_lists)
-
-    per_day_max_of_avg = {}
-    for (sid, ts), avgs in per_ts_avgs.items():
-        day = _day_key(_parse_iso(ts))
-        dkey = (sid, day)
-        if dkey not in per_day_max_of_avg:
-            per_day_max_of_avg[dkey] = {}
-        for lvl, avg_val in avgs.items():
-            if avg_val is None:
-                continue
-            cur = per_day_max_of_avg[dkey].get(lvl)
-            if cur is None or avg_val > cur:
-                per_day_max_of_avg[dkey][lvl] = avg_val
-
-    # load silos
-    silo_ids_used = {sid for (sid, _) in per_day_max_of_avg.keys()}
-    silos = (Silo.query.filter(Silo.id.in_(list(silo_ids_used)))
-             .options(selectinload(Silo.group)).all())
-    silo_by_id = {s.id: s for s in silos}
+    silo_by_id = topo.silos
 
     out = []
     for (sid, day), lvl_max_avg in per_day_max_of_avg.items():
@@ -1428,108 +3526,154 @@ def readings_by_silo_id_avg_max():
 # -------- SILO NUMBER wrappers for AVG --------
 @app.get('/readings/avg/by-silo-number')
 def readings_by_silo_number_avg_all():
-    numbers = request.args.getlist('silo_number', type=int)
-    if not numbers:
-        numbers = _all_silo_numbers()
-    if not numbers:
-        return json_response([])
-    silo_ids = _silo_number_to_ids(numbers)
-    with app.test_request_context(query_string=[('silo_id', sid) for sid in silo_ids] +
-                                  [(k, v) for k, v in request.args.items() if k != 'silo_number']):
-        return readings_by_silo_id_avg_all()
+    return readings_by_silo_id_avg_all(SiloSelector.from_request("number"))
 
 @app.get('/readings/avg/latest/by-silo-number')
 def readings_by_silo_number_avg_latest():
-    numbers = request.args.getlist('silo_number', type=int)
-    if not numbers:
-        numbers = _all_silo_numbers()
-    if not numbers:
-        return json_response([])
-    silo_ids = _silo_number_to_ids(numbers)
-    with app.test_request_context(query_string=[('silo_id', sid) for sid in silo_ids] +
-                                  [(k, v) for k, v in request.args.items() if k != 'silo_number']):
-        return readings_by_silo_id_avg_latest()
+    return readings_by_silo_id_avg_latest(SiloSelector.from_request("number"))
 
 @app.get('/readings/avg/max/by-silo-number')
 def readings_by_silo_number_avg_max():
-    numbers = request.args.getlist('silo_number', type=int)
-    if not numbers:
-        numbers = _all_silo_numbers()
-    if not numbers:
-        return json_response([])
-    silo_ids = _silo_number_to_ids(numbers)
-    with app.test_request_context(query_string=[('silo_id', sid) for sid in silo_ids] +
-                                  [(k, v) for k, v in request.args.items() if k != 'silo_number']):
-        return readings_by_silo_id_avg_max()
+    return readings_by_silo_id_avg_max(SiloSelector.from_request("number"))
 
 # -------- by SILO GROUP ID (maps to silo IDs) --------
-def _silo_group_to_ids(group_ids):
-    if not group_ids:
-        return []
-    silos = Silo.query.filter(Silo.silo_group_id.in_(group_ids)).all()
-    return [s.id for s in silos]
-
 @app.get('/readings/by-silo-group-id')
 def readings_by_silo_group_id_all():
-    group_ids = request.args.getlist('silo_group_id', type=int)
-    if not group_ids:
-        return json_response([])
-    silo_ids = _silo_group_to_ids(group_ids)
-    with app.test_request_context(query_string=[('silo_id', sid) for sid in silo_ids] +
-                                  [(k, v) for k, v in request.args.items() if k != 'silo_group_id']):
-        return readings_by_silo_id_all()
+    return readings_by_silo_id_all(SiloSelector.from_request("group"))
 
 @app.get('/readings/latest/by-silo-group-id')
 def readings_by_silo_group_id_latest():
-    group_ids = request.args.getlist('silo_group_id', type=int)
-    if not group_ids:
-        return json_response([])
-    silo_ids = _silo_group_to_ids(group_ids)
-    with app.test_request_context(query_string=[('silo_id', sid) for sid in silo_ids] +
-                                  [(k, v) for k, v in request.args.items() if k != 'silo_group_id']):
-        return readings_by_silo_id_latest()
+    return readings_by_silo_id_latest(SiloSelector.from_request("group"))
 
 @app.get('/readings/max/by-silo-group-id')
 def readings_by_silo_group_id_max():
-    group_ids = request.args.getlist('silo_group_id', type=int)
-    if not group_ids:
-        return json_response([])
-    silo_ids = _silo_group_to_ids(group_ids)
-    with app.test_request_context(query_string=[('silo_id', sid) for sid in silo_ids] +
-                                  [(k, v) for k, v in request.args.items() if k != 'silo_group_id']):
-        return readings_by_silo_id_max()
+    return readings_by_silo_id_max(SiloSelector.from_request("group"))
 
 @app.get('/readings/avg/by-silo-group-id')
 def readings_by_silo_group_id_avg_all():
-    group_ids = request.args.getlist('silo_group_id', type=int)
-    if not group_ids:
-        return json_response([])
-    silo_ids = _silo_group_to_ids(group_ids)
-    with app.test_request_context(query_string=[('silo_id', sid) for sid in silo_ids] +
-                                  [(k, v) for k, v in request.args.items() if k != 'silo_group_id']):
-        return readings_by_silo_id_avg_all()
+    return readings_by_silo_id_avg_all(SiloSelector.from_request("group"))
 
 @app.get('/readings/avg/latest/by-silo-group-id')
 def readings_by_silo_group_id_avg_latest():
-    group_ids = request.args.getlist('silo_group_id', type=int)
-    if not group_ids:
-        return json_response([])
-    silo_ids = _silo_group_to_ids(group_ids)
-    with app.test_request_context(query_string=[('silo_id', sid) for sid in silo_ids] +
-                                  [(k, v) for k, v in request.args.items() if k != 'silo_group_id']):
-        return readings_by_silo_id_avg_latest()
+    return readings_by_silo_id_avg_latest(SiloSelector.from_request("group"))
 
 @app.get('/readings/avg/max/by-silo-group-id')
 def readings_by_silo_group_id_avg_max():
-    group_ids = request.args.getlist('silo_group_id', type=int)
-    if not group_ids:
-        return json_response([])
-    silo_ids = _silo_group_to_ids(group_ids)
-    with app.test_request_context(query_string=[('silo_id', sid) for sid in silo_ids] +
-                                  [(k, v) for k, v in request.args.items() if k != 'silo_group_id']):
-        return readings_by_silo_id_avg_max()
+    return readings_by_silo_id_avg_max(SiloSelector.from_request("group"))
+
+# -------- Alerts --------
+ALERT_SNAPSHOT_CHUNK = 200  # (silo, window) pairs per query (SQLite caps compound SELECTs at 500)
+
+# -------- Alert snapshot memo --------
+#   Readings timestamps are hour_start buckets, so a snapshot only depends on the anchor
+#   and window rounded inward to that resolution: (silo, ceil(anchor - window), floor(anchor)).
+#   Alerts sharing a silo and rounded window share one snapshot within a request, and
+#   across requests for ALERT_SNAPSHOT_TTL seconds (0 = per request only) while the
+#   data watermark is unchanged: new raw rows or an hourly rollup pass start a new
+#   generation, so the memo never disagrees with the reading endpoints.
+ALERT_SNAPSHOT_RESOLUTION = float(os.environ.get("ALERT_SNAPSHOT_RESOLUTION", "3600"))  # seconds; 0 = exact
+ALERT_SNAPSHOT_TTL        = float(os.environ.get("ALERT_SNAPSHOT_TTL", "30"))           # seconds
+ALERT_SNAPSHOT_MEMO_SIZE  = int(os.environ.get("ALERT_SNAPSHOT_MEMO_SIZE", "4096"))    # entries
+
+_ALERT_SNAPSHOTS = OrderedDict()  # (topology version, data watermark, silo_id, lo, hi) -> (stored_at, levels or None)
+_ALERT_SNAPSHOTS_LOCK = threading.Lock()
+
+def _round_ts(ts: datetime, resolution: float, up: bool = False) -> datetime:
+    """Floor (or ceil) a timestamp to a multiple of `resolution` seconds."""
+    if resolution <= 0:
+        return ts
+    step = timedelta(seconds=resolution)
+    floored = ts - (ts - datetime.min) % step
+    return floored + step if up and floored != ts else floored
+
+def _alert_level_snapshots(pairs, window: timedelta, topo: Topology):
+    """
+    Level snapshots for many (silo_id, anchor) pairs at once.
+    For each pair, pick the latest Reading per sensor with anchor - window <= ts <= anchor
+    (by ts DESC, id DESC), then collapse to 8 levels by taking MAX across cables.
+    Pairs are first reduced to distinct rounded windows and served from the memo;
+    the rest are fetched together (see _query_alert_snapshots).
+    Returns: {(silo_id, anchor): {0..7: temp or None}}; pairs without readings are absent.
+    """
+    bounds_by_pair = {}
+    for sid, ts in pairs:
+        if topo.sensor_ids_for_silos([sid]):
+            bounds_by_pair[(sid, ts)] = (sid, _round_ts(ts - window, ALERT_SNAPSHOT_RESOLUTION, up=True),
+                                         _round_ts(ts, ALERT_SNAPSHOT_RESOLUTION))
+    wanted = list(dict.fromkeys(bounds_by_pair.values()))
+
+    found = {}
+    if ALERT_SNAPSHOT_TTL > 0:
+        generation = (topo.version, _data_watermark())
+        now = time.monotonic()
+        with _ALERT_SNAPSHOTS_LOCK:
+            for b in wanted:
+                hit = _ALERT_SNAPSHOTS.get(generation + b)
+                if hit is not None and now - hit[0] <= ALERT_SNAPSHOT_TTL:
+                    found[b] = hit[1]
+    missing = [b for b in wanted if b not in found]
+    if missing:
+        fresh = dict.fromkeys(missing)
+        fresh.update(_query_alert_snapshots(missing, topo))
+        found.update(fresh)
+        if ALERT_SNAPSHOT_TTL > 0:
+            now = time.monotonic()
+            with _ALERT_SNAPSHOTS_LOCK:
+                for b, levels in fresh.items():
+                    _ALERT_SNAPSHOTS[generation + b] = (now, levels)
+                    _ALERT_SNAPSHOTS.move_to_end(generation + b)
+                while len(_ALERT_SNAPSHOTS) > ALERT_SNAPSHOT_MEMO_SIZE:
+                    _ALERT_SNAPSHOTS.popitem(last=False)
+
+    return {pair: found[b] for pair, b in bounds_by_pair.items() if found[b] is not None}
+
+def _query_alert_snapshots(bounds, topo: Topology):
+    """
+    {(silo_id, lo, hi): {0..7: temp or None}} for windows lo <= ts <= hi; windows without
+    readings are absent. The windows become a derived table joined to readings through
+    sensors/cables, so one query covers a whole chunk instead of one scan per alert.
+    """
+    out = {}
+    for c in range(0, len(bounds), ALERT_SNAPSHOT_CHUNK):
+        chunk = bounds[c:c + ALERT_SNAPSHOT_CHUNK]
+        windows = union_all(*(select(literal(k).label("k"), literal(sid).label("silo_id"),
+                                     literal(lo, DateTime).label("lo"), literal(hi, DateTime).label("hi"))
+                              for k, (sid, lo, hi) in enumerate(chunk))).subquery("windows")
+        ts_col = READ_TS_COL
+        cols = (windows.c.k, Reading.id, Reading.sensor_id, _value_col(Reading), ts_col.label("ts"))
+        joined = (select(*cols)
+                  .join(Sensor, Sensor.id == Reading.sensor_id)
+                  .join(Cable, Cable.id == Sensor.cable_id)
+                  .join(windows, and_(windows.c.silo_id == Cable.silo_id,
+                                      ts_col >= windows.c.lo, ts_col <= windows.c.hi)))
+        if _supports_window_functions():
+            rn = func.row_number().over(partition_by=(windows.c.k, Reading.sensor_id),
+                                        order_by=(ts_col.desc(), Reading.id.desc())).label("rn")
+            ranked = joined.add_columns(rn).subquery()
+            rows = db.session.execute(select(ranked.c.k, ranked.c.sensor_id, ranked.c.value_c)
+                                      .where(ranked.c.rn == 1)).all()
+        else:
+            rows = db.session.execute(joined.order_by(windows.c.k, Reading.sensor_id,
+                                                      ts_col.desc(), Reading.id.desc())).all()
+
+        seen = set()
+        for r in rows:
+            # ordered/ranked by time then id, so the first row per (window, sensor) is the latest <= hi
+            if (r.k, r.sensor_id) in seen:
+                continue
+            seen.add((r.k, r.sensor_id))
+            level_max = out.setdefault(chunk[r.k], {})
+            temp = r.value_c
+            if temp is None:
+                continue
+            lvl = topo.sensors[r.sensor_id].sensor_index
+            t = float(round(temp, 2))
+            cur = level_max.get(lvl)
+            if cur is None or t > cur:
+                level_max[lvl] = t
 
-# -------- Alerts (leave as-is for now) --------
+    # make sure we have explicit keys for 0..7 (missing -> None)
+    return {key: {lvl: level_max.get(lvl) for lvl in range(8)} for key, level_max in out.items()}
 
 @app.get('/alerts/active')
 def alerts_active():
@@ -1543,62 +3687,6 @@ def alerts_active():
       window_hours: float/int hours for look-back (default 2)
     """
 
-    def _snapshot_levels_at_ts(silo_id: int, ts_anchor: datetime, window: timedelta):
-        """
-        For the given silo and anchor time, pick the latest Reading per sensor
-        with timestamp <= anchor and >= anchor - window. Then collapse to 8
-        levels by taking MAX across cables for the same level index.
-        Returns: (silo_obj, {level->temp or None}, product)
-        """
-        # sensors in silo
-        sensors = _sensors_for_silos([silo_id])
-        if not sensors:
-            return None, {}, None
-
-        silo = sensors[0].cable.silo
-        sensor_ids = [s.id for s in sensors]
-
-        # product for thresholds
-        products = _preload_products_for_silo_ids({silo_id})
-        product = products.get(silo_id)
-
-        # bound window
-        start = ts_anchor - window
-        end = ts_anchor
-
-        # latest row per sensor_id at/before ts_anchor
-        q = _base_readings_query(sensor_ids, start, end).order_by(
-            READ_TS_COL.desc(), Reading.sensor_id.asc(), Reading.id.desc()
-        )
-        rows = q.all()
-        if not rows:
-            # no data in window -> empty; format_levels_row will mark disconnects
-            return silo, {}, product
-
-        latest_per_sensor = {}
-        for r in rows:
-            sid = r.sensor_id
-            # because ordered DESC by time then id, first seen is the latest <= anchor
-            if sid not in latest_per_sensor:
-                latest_per_sensor[sid] = r
-
-        # collapse across cables by level index using MAX temperature
-        level_max = {}  # level_index -> float
-        for r in latest_per_sensor.values():
-            s = r.sensor
-            lvl = s.sensor_index
-            temp = _temperature_from_any(r)
-            if temp is None:
-                continue
-            t = float(round(temp, 2))
-            cur = level_max.get(lvl)
-            if cur is None or t > cur:
-                level_max[lvl] = t
-
-        # make sure we have explicit keys for 0..7 (missing -> None)
-        complete = {lvl: level_max.get(lvl) for lvl in range(8)}
-        return silo, complete, product
-
     # --- fetch active alerts newest-first by "coalesced" timestamp ---
     window_param = request.args.get("window_hours")
     try:
@@ -1606,6 +3694,7 @@ def alerts_active():
     except ValueError:
         window_hours = 2.0
     lookback = timedelta(hours=window_hours)
+    topo = get_topology()
 
     coalesced_ts = func.coalesce(Alert.last_seen_at, Alert.first_seen_at)
     alerts = (Alert.query
@@ -1615,26 +3704,24 @@ def alerts_active():
     if not alerts:
         return json_response([])
 
-    # prefetch silos for labels
-    silo_ids = {a.silo_id for a in alerts if a.silo_id is not None}
-    silos = (Silo.query
-             .filter(Silo.id.in_(list(silo_ids)))
-             .options(selectinload(Silo.group))
-             .all())
-    silo_by_id = {s.id: s for s in silos}
+    silo_by_id = topo.silos
+    now = datetime.utcnow()
+    anchors = [a.last_seen_at or a.first_seen_at or now for a in alerts]
 
-    out = []
-    for a in alerts:
-        ts_anchor = a.last_seen_at or a.first_seen_at or datetime.utcnow()
-
-        # build snapshot at the alert time
-        silo_obj, levels_by_idx, product = _snapshot_levels_at_ts(a.silo_id, ts_anchor, lookback)
+    # build every snapshot at its alert time in one pass; products preloaded once
+    snapshots = _alert_level_snapshots(zip((a.silo_id for a in alerts), anchors), lookback, topo)
+    products = _preload_products_for_silo_ids({a.silo_id for a in alerts})
 
-        # fall back to preloaded silo (for names) if needed
-        silo_for_names = silo_by_id.get(a.silo_id) or silo_obj
+    out = []
+    for a, ts_anchor in zip(alerts, anchors):
+        silo_for_names = silo_by_id.get(a.silo_id)
         if not silo_for_names:
             # no silo -> skip record (or emit minimal)
             continue
+        # silos without sensors keep the old "no product" snapshot
+        has_sensors = bool(topo.sensor_ids_for_silos([a.silo_id]))
+        levels_by_idx = snapshots.get((a.silo_id, ts_anchor), {})
+        product = products.get(a.silo_id) if has_sensors else None
 
         # use the common formatter so level coloring + disconnect handling is consistent
         row = format_levels_row(
@@ -1663,7 +3750,8 @@ def alerts_active():
     return json_response(out)
 
 @app.get('/silos/level-estimate')
-def silos_level_estimate():
+@conditional_by_watermark
+def silos_level_estimate(selector: SiloSelector | None = None):
     """
     Estimate silo fill level using k-means (k=2) on whole-silo temperature profile.
     - Build a single 8-level profile per silo by averaging all cables per level
@@ -1678,9 +3766,8 @@ def silos_level_estimate():
 
     Returns: list of rows (one per silo).
     """
-    silo_ids = request.args.getlist('silo_id', type=int)
-    if not silo_ids:
-        silo_ids = _all_silo_ids()
+    topo = get_topology()
+    silo_ids = (selector or SiloSelector.from_request()).resolve(topo)
     if not silo_ids:
         return json_response([])
 
@@ -1689,30 +3776,13 @@ def silos_level_estimate():
     debug = request.args.get('debug') in ('1', 'true', 'yes')
 
     profiles = _latest_whole_silo_profile(silo_ids, start, end)
+    estimates = _estimate_fill_batch([p["levels"] for p in profiles])
     out = []
-    for p in profiles:
+    for p, est in zip(profiles, estimates):
         silo = p["silo"]
         if not silo:
             continue
-        levels = p["levels"]
-        est = _estimate_fill_from_profile(levels)
-
-        row = OrderedDict()
-        row["silo_group"] = silo.group.name if silo.group else None
-        row["silo_number"] = silo.silo_number
-        row["timestamp"] = p["timestamp"]
-        # echo the whole-silo averaged profile
-        for lvl in range(8):
-            row[f"level_{lvl}"] = levels.get(lvl)
-
-        row["fill_index_float"] = est["fill_index_float"]
-        row["fill_percent"] = est["fill_percent"]
-        row["cluster_means"] = est["cluster_means"]
-        if debug:
-            row["assignments"] = est["assignments"]
-            row["valid_count"] = est["valid_count"]
-
-        out.append(row)
+        out.append(_level_estimate_row(silo, p["timestamp"], p["levels"], est, debug))
 
     # sort by silo_number
     out.sort(key=lambda d: d["silo_number"])
@@ -1721,16 +3791,226 @@ def silos_level_estimate():
 # Optional convenience wrapper by silo_number
 @app.get('/silos/level-estimate/by-number')
 def silos_level_estimate_by_number():
-    numbers = request.args.getlist('silo_number', type=int)
-    if not numbers:
-        numbers = _all_silo_numbers()
-    if not numbers:
+    return silos_level_estimate(SiloSelector.from_request("number"))
+
+@app.get('/silos/level-estimate/history')
+@conditional_by_watermark
+def silos_level_estimate_history(selector: SiloSelector | None = None):
+    """
+    Hourly fill-level estimates from the hourly `readings` table: same profile and
+    k-means estimate as /silos/level-estimate, once per silo per hour.
+
+    Query:
+      silo_id (repeatable)  -> specific silos; default = all silos
+      start / end (ISO)     -> hour range (inclusive); default = the 24 hours up to the newest reading
+      refresh=1             -> recompute the range instead of reusing cached hours (after late loads)
+      debug=1               -> include cluster assignments and inputs
+
+    Returns: rows ordered by silo_number, then hour; hours without readings are omitted.
+    """
+    topo = get_topology()
+    silo_ids = (selector or SiloSelector.from_request()).resolve(topo)
+    if not silo_ids:
+        return json_response([])
+    sensor_ids = topo.sensor_ids_for_silos(silo_ids)
+    newest = _latest_reading_ts(sensor_ids) if sensor_ids else None
+    if newest is None:
+        return json_response([])
+
+    start = _parse_dt(request.args.get('start'))
+    end   = _parse_dt(request.args.get('end'))
+    start = _naive_utc(start) if start else None  # `...Z` parses aware; hours are naive UTC
+    end   = _naive_utc(end) if end else None
+    debug = request.args.get('debug') in ('1', 'true', 'yes')
+    refresh = request.args.get('refresh') in ('1', 'true', 'yes')
+
+    open_from = _hour_floor(newest)
+    last = min(_hour_floor(end), open_from) if end else open_from
+    if start is None:
+        start = last - 23 * _ONE_HOUR
+    first = _hour_floor(start)
+    if first < start:
+        first += _ONE_HOUR
+    n_hours = int((last - first) / _ONE_HOUR) + 1
+    if n_hours <= 0:
         return json_response([])
-    silo_ids = _silo_number_to_ids(numbers)
-    with app.test_request_context(query_string=[('silo_id', sid) for sid in silo_ids] +
-                                  [(k, v) for k, v in request.args.items() if k != 'silo_number']):
-        return silos_level_estimate()
+    if n_hours > FILL_HISTORY_MAX_HOURS:
+        return json_response({"error": f"range too large: {n_hours} hours (max {FILL_HISTORY_MAX_HOURS})"}, 400)
+
+    hours = [first + i * _ONE_HOUR for i in range(n_hours)]
+    silos = _silos_by_number(silo_ids, topo)
+    if 0 < FILL_HISTORY_CACHE_SIZE < len(silos) * n_hours:
+        return json_response({"error": f"range too large: {len(silos)} silos x {n_hours} hours "
+                                       f"(max {FILL_HISTORY_CACHE_SIZE} silo-hours)"}, 400)
+    estimates = _hourly_fill_estimates([silo.id for silo in silos], hours, topo, open_from, refresh)
+
+    out = []
+    for silo in silos:
+        for hour in hours:
+            hit = estimates[(silo.id, hour)]
+            if hit is not None:
+                levels, est = hit
+                out.append(_level_estimate_row(silo, hour.isoformat(), levels, est, debug))
+    return json_response(out)
+
+@app.get('/silos/level-estimate/history/by-number')
+def silos_level_estimate_history_by_number():
+    return silos_level_estimate_history(SiloSelector.from_request("number"))
+
+# -------- Raw ingest (poller) --------
+INGEST_CHUNK_ROWS = int(os.environ.get("INGEST_CHUNK_ROWS", "5000"))  # rows per multi-row INSERT
+RAW_VALUE_LIMIT = 9999.99                 # readings_raw.value_c is DECIMAL(6,2)
+RAW_DISCONNECT_VALUE = min(DISCONNECT_SENTINELS)  # stored for NaN/inf (not representable in DECIMAL)
+
+def ingest_raw_batch(poll_run_id, polled_at: datetime, sensor_ids, values, topo: Topology | None = None) -> int:
+    """
+    Insert one poll's readings into readings_raw in a single transaction, as multi-row
+    INSERTs of INGEST_CHUNK_ROWS (executemany). sensor_ids[i] pairs with values[i].
+      - sensor ids must exist in the topology snapshot (new sensors: POST /topology/refresh)
+      - values: number or None; sentinels in DISCONNECT_SENTINELS are kept as-is,
+        NaN/inf become RAW_DISCONNECT_VALUE
+    Raises ValueError on a bad batch (nothing is written). Returns rows inserted.
+    sensor_latest follows via its insert trigger (migrations/sensor_latest.sql).
+    """
+    if len(sensor_ids) != len(values):
+        raise ValueError("sensor_id and value_c must have the same length")
+    polled_at = _naive_utc(polled_at)
+    sensors = (topo or get_topology()).sensors
+
+    rows = []
+    seen = set()
+    for sensor_id, value in zip(sensor_ids, values):
+        if isinstance(sensor_id, bool) or not isinstance(sensor_id, int) or sensor_id not in sensors:
+            raise ValueError(f"unknown sensor_id: {sensor_id!r}")
+        if sensor_id in seen:
+            raise ValueError(f"duplicate sensor_id: {sensor_id}")
+        seen.add(sensor_id)
+        if value is not None:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"invalid value_c for sensor {sensor_id}: {value!r}")
+            value = float(value)
+            if math.isnan(value) or math.isinf(value):
+                value = RAW_DISCONNECT_VALUE
+            elif value not in DISCONNECT_SENTINELS and abs(value) > RAW_VALUE_LIMIT:
+                raise ValueError(f"value_c out of range for sensor {sensor_id}: {value}")
+        rows.append({"sensor_id": sensor_id, "value_c": value,
+                     "polled_at": polled_at, "poll_run_id": poll_run_id})
+
+    stmt = ReadingRaw.__table__.insert()
+    try:
+        for c in range(0, len(rows), INGEST_CHUNK_ROWS):
+            db.session.execute(stmt, rows[c:c + INGEST_CHUNK_ROWS])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(rows)
+
+@app.post('/ingest/raw')
+def ingest_raw():
+    """
+    Bulk insert one poll into readings_raw.
+
+    Body (JSON):
+      {"poll_run_id": 123 | null, "polled_at": ISO,
+       "sensor_id": [1, 2, ...], "value_c": [21.5, -127, null, ...]}
+
+    Returns 201 {"inserted": n, "poll_run_id": ..., "polled_at": ISO}; 400 on a bad batch.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return json_response({"error": "JSON object body required"}, 400)
+    polled_at = _parse_dt(data.get("polled_at"))
+    if polled_at is None:
+        return json_response({"error": "polled_at (ISO datetime) required"}, 400)
+    poll_run_id = data.get("poll_run_id")
+    if poll_run_id is not None and (isinstance(poll_run_id, bool) or not isinstance(poll_run_id, int)):
+        return json_response({"error": "poll_run_id must be an integer"}, 400)
+    sensor_ids, values = data.get("sensor_id"), data.get("value_c")
+    if not isinstance(sensor_ids, list) or not isinstance(values, list):
+        return json_response({"error": "sensor_id and value_c arrays required"}, 400)
+
+    try:
+        n = ingest_raw_batch(poll_run_id, polled_at, sensor_ids, values)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+    return json_response({"inserted": n, "poll_run_id": poll_run_id,
+                          "polled_at": _naive_utc(polled_at).isoformat()}, 201)
+
+# -------- sensor_latest maintenance --------
+@app.cli.command("sync-sensor-latest")
+def sync_sensor_latest_command():
+    """Rebuild sensor_latest from readings_raw: `flask --app app sync-sensor-latest`."""
+    n = rebuild_sensor_latest()
+    print(f"sensor_latest: {n} sensors")
+
+# -------- Daily rollup refresher --------
+@app.cli.command("refresh-readings-daily")
+@click.option("--since", default=None, help="YYYY-MM-DD: also redo days from here (after late loads).")
+def refresh_readings_daily_command(since):
+    """Roll up whole days newer than the watermark: `flask --app app refresh-readings-daily`."""
+    result = refresh_readings_daily(date.fromisoformat(since) if since else None)
+    print(f"readings_daily: {result['days']} day(s), watermark={result['watermark']}")
+
+# -------- Hourly rollup (readings_raw -> readings) --------
+@app.cli.command("refresh-readings-hourly")
+@click.option("--batches", default=None, type=int, help="Stop after N batches (default: until caught up).")
+def refresh_readings_hourly_command(batches):
+    """Fold new raw rows into hourly readings: `flask --app app refresh-readings-hourly`."""
+    r = refresh_readings_hourly(batches)
+    print(f"readings (hourly): {r['rows']} raw row(s) in {r['batches']} batch(es) "
+          f"(+{r['rechecked']} rechecked), {r['inserted']} inserted, {r['updated']} updated; checkpoint={r['checkpoint_id']}, "
+          f"lag_ids={r['lag_ids']}, lag_seconds={r['lag_seconds']}")
+
+@app.get('/rollups/hourly/status')
+def hourly_rollup_status_view():
+    """Checkpoint and lag of the raw -> hourly readings rollup."""
+    return json_response(hourly_rollup_status())
+
+# -------- readings_raw partitions --------
+@app.cli.command("partition-readings-raw")
+@click.option("--dry-run", is_flag=True, help="Print the DDL without executing it.")
+def partition_readings_raw_command(dry_run):
+    """Add upcoming / expire old readings_raw partitions: `flask --app app partition-readings-raw`."""
+    stmts = manage_raw_partitions(dry_run=dry_run)
+    for stmt in stmts:
+        print(stmt + ";")
+    print(f"readings_raw partitions: {len(stmts)} statement(s){' (dry run)' if dry_run else ''}")
+
+# -------- Cold archive --------
+@app.cli.command("archive-readings")
+@click.option("--before", default=None, help="YYYY-MM-DD: archive whole months before this (default: READINGS_RETENTION_DAYS ago).")
+@click.option("--purge", is_flag=True, help="Delete archived months from `readings` afterwards.")
+def archive_readings_command(before, purge):
+    """Export old months of readings to the cold archive: `flask --app app archive-readings`."""
+    cutoff = date.fromisoformat(before) if before else date.today() - timedelta(days=READINGS_RETENTION_DAYS)
+    r = archive_readings(cutoff, purge)
+    print(f"readings archive: {len(r['months'])} month(s) {', '.join(r['months'])} "
+          f"({r['rows']} rows), purged {r['purged']}, horizon={r['horizon']}")
+
+# -------- Topology maintenance --------
+@app.post('/topology/refresh')
+def topology_refresh():
+    """Explicitly rebuild the in-process topology snapshot (after editing silos/cables/sensors)."""
+    topo = refresh_topology()
+    return json_response({
+        "version": topo.version,
+        "silos": len(topo.silos),
+        "cables": len(topo.cables),
+        "sensors": len(topo.sensors),
+    })
+
+# -------- Response cache stats --------
+@app.get('/cache/stats')
+def cache_stats():
+    """Hit/miss/eviction counters of the latest-endpoint response cache."""
+    return json_response(_RESPONSE_CACHE.stats())
+
+if HOURLY_ROLLUP_INTERVAL > 0:
+    start_hourly_rollup_thread()
 
 # ---------- Run ----------
 if __name__ == '__main__':
+    with app.app_context():
+        get_topology()  # warm the topology snapshot before serving
     app.run(host='0.0.0.0', port=5000, debug=True)
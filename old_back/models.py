@@ -93,6 +93,8 @@ class ReadingRaw(db.Model):
       - polled_at: raw poll timestamp (DATETIME(6))
       - value_c: temperature
       - poll_run_id: batch/run id (nullable)
+    On MySQL it may be RANGE COLUMNS(polled_at) partitioned, with PRIMARY KEY (id, polled_at)
+    and no FK (see `flask --app app partition-readings-raw`); id stays unique.
     """
     __tablename__ = 'readings_raw'
 
@@ -107,6 +109,83 @@ class ReadingRaw(db.Model):
     )
 
 
+class SensorLatest(db.Model):
+    """
+    Latest raw reading per sensor (one row per sensor), upserted on every
+    readings_raw write (see migrations/sensor_latest.sql):
+      - raw_id: readings_raw.id of the row mirrored here
+      - polled_at / value_c / poll_run_id: copied from that raw row
+    """
+    __tablename__ = 'sensor_latest'
+
+    sensor_id   = db.Column(INTEGER, db.ForeignKey('sensors.id'), primary_key=True, autoincrement=False)
+    raw_id      = db.Column(BIGINT(unsigned=False), nullable=False)
+    value_c     = db.Column(MYSQL_DECIMAL(6, 2), nullable=True)
+    polled_at   = db.Column(MYSQL_DATETIME(fsp=6), nullable=False)
+    poll_run_id = db.Column(BIGINT(unsigned=False), nullable=True)
+
+    # --------- Row-shape compatibility with ReadingRaw ----------
+    @property
+    def id(self):
+        return self.raw_id
+
+
+class ReadingDaily(db.Model):
+    """
+    Per-sensor daily rollup of `readings` (refreshed by `flask refresh-readings-daily`):
+      - min_c / max_c / sum_c / count_c: over non-NULL samples of the day
+      - last_c: value at last_at (latest hour_start of the day)
+      - max_at: hour_start of the max sample (latest on ties); NULL if no sample had a value
+    """
+    __tablename__ = 'readings_daily'
+
+    sensor_id = db.Column(INTEGER, db.ForeignKey('sensors.id'), primary_key=True, autoincrement=False)
+    day       = db.Column(db.Date, primary_key=True)
+    min_c     = db.Column(MYSQL_DECIMAL(6, 2), nullable=True)
+    max_c     = db.Column(MYSQL_DECIMAL(6, 2), nullable=True)
+    sum_c     = db.Column(MYSQL_DECIMAL(12, 2), nullable=True)
+    count_c   = db.Column(INTEGER, nullable=False, default=0)
+    last_c    = db.Column(MYSQL_DECIMAL(6, 2), nullable=True)
+    first_at  = db.Column(MYSQL_DATETIME(fsp=0), nullable=False)
+    last_at   = db.Column(MYSQL_DATETIME(fsp=0), nullable=False)
+    max_at    = db.Column(MYSQL_DATETIME(fsp=0), nullable=True)
+
+    __table_args__ = (
+        Index('ix_readings_daily_day', 'day'),
+    )
+
+
+class ReadingDailyLevel(db.Model):
+    """
+    Per-silo, per-level daily rollup used by /readings/avg/max/*:
+      - max_avg_c: max over the day's hours of the cross-cable level average (NULL if none)
+    """
+    __tablename__ = 'readings_daily_levels'
+
+    silo_id     = db.Column(INTEGER, db.ForeignKey('silos.id'), primary_key=True, autoincrement=False)
+    day         = db.Column(db.Date, primary_key=True)
+    level_index = db.Column(INTEGER, primary_key=True, autoincrement=False)
+    max_avg_c   = db.Column(MYSQL_DECIMAL(6, 2), nullable=True)
+
+    __table_args__ = (
+        Index('ix_readings_daily_levels_day', 'day'),
+    )
+
+
+class RollupState(db.Model):
+    """
+    Watermarks for incremental jobs (one row per job name):
+      - last_ts: highest timestamp already processed
+      - last_id: highest source row id already processed (for id-based checkpoints)
+    """
+    __tablename__ = 'rollup_state'
+
+    name       = db.Column(db.String(64), primary_key=True)
+    last_ts    = db.Column(MYSQL_DATETIME(fsp=6), nullable=True)
+    last_id    = db.Column(BIGINT(unsigned=False), nullable=True)
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
+
+
 # -----------------------------
 # Products & thresholds
 # -----------------------------
@@ -0,0 +1,46 @@
+import os
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.dialects.mysql import BIGINT
+from sqlalchemy.ext.compiler import compiles
+
+# the app binds its engine at import time: point it at an in-memory SQLite database first
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.pop("ARCHIVE_DIR", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as backend  # noqa: E402
+import models  # noqa: E402
+
+
+@compiles(BIGINT, "sqlite")
+def _sqlite_bigint(type_, compiler, **kw):
+    return "INTEGER"  # SQLite only auto-assigns ids to INTEGER PRIMARY KEY columns
+
+
+@pytest.fixture(scope="session")
+def seeded():
+    """One silo, one cable, sensors 1..8 (levels 0..7) and a reading per sensor."""
+    with backend.app.app_context():
+        models.db.create_all()
+        s = models.db.session
+        s.add(models.SiloGroup(id=1, name="G-A"))
+        s.add(models.Silo(id=1, silo_number=100, silo_group_id=1, cable_count=1, group_silo_index=0))
+        s.add(models.Cable(id=1, silo_id=1, cable_index=0))
+        s.add_all([models.Sensor(id=i + 1, cable_id=1, sensor_index=i) for i in range(8)])
+        s.flush()
+        hour = datetime(2026, 9, 1, 10)
+        s.add_all([models.Reading(id=i + 1, sensor_id=i + 1, hour_start=hour, sample_at=hour,
+                                  value_c=Decimal("20.50") + i) for i in range(8)])
+        s.commit()
+        backend.get_topology(force=True)
+    return backend
+
+
+@pytest.fixture
+def ctx(seeded):
+    with backend.app.app_context():
+        yield backend
@@ -0,0 +1,74 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+import app as backend
+import models
+
+US = timedelta(microseconds=1)
+
+
+HORIZON = datetime(2026, 9, 1)
+
+
+@pytest.fixture
+def archived_until(monkeypatch):
+    monkeypatch.setattr(backend, "_archive_horizon", lambda: HORIZON)
+
+
+def test_archive_split_no_archive(monkeypatch):
+    monkeypatch.setattr(backend, "_archive_horizon", lambda: None)
+    assert backend._split_window_by_archive(None, None) == (None, (None, None))
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    (HORIZON, None, (None, (HORIZON, None))),
+    (datetime(2026, 8, 1), datetime(2026, 8, 31), ((datetime(2026, 8, 1), datetime(2026, 8, 31)), None)),
+    (HORIZON - US, HORIZON - US, ((HORIZON - US, HORIZON - US), None)),
+    (datetime(2026, 8, 20), datetime(2026, 9, 5), ((datetime(2026, 8, 20), HORIZON - US), (HORIZON, datetime(2026, 9, 5)))),
+    (None, HORIZON, ((None, HORIZON - US), (HORIZON, HORIZON))),
+    (None, None, ((None, HORIZON - US), (HORIZON, None))),
+])
+def test_archive_split(archived_until, start, end, expected):
+    assert backend._split_window_by_archive(start, end) == expected
+
+
+def test_archive_split_aware_window(archived_until):
+    start = datetime(2026, 8, 20, 6, tzinfo=timezone.utc)
+    end = datetime(2026, 9, 1, 12, tzinfo=timezone(timedelta(hours=2)))
+    assert backend._split_window_by_archive(start, end) == (
+        (datetime(2026, 8, 20, 6), HORIZON - US), (HORIZON, datetime(2026, 9, 1, 10)))
+
+
+@pytest.fixture
+def august_archived(ctx, tmp_path, monkeypatch):
+    """August readings for sensors 1 and 2, archived to tmp_path and purged from `readings`."""
+    monkeypatch.setattr(backend, "ARCHIVE_DIR", str(tmp_path))
+    hour = datetime(2026, 8, 20, 6)
+    models.db.session.add_all([
+        models.Reading(id=500 + i, sensor_id=sid, hour_start=hour + timedelta(hours=i), sample_at=hour,
+                       value_c=Decimal("18.25") + i)
+        for i, sid in enumerate([1, 2, 1])])
+    models.db.session.commit()
+    result = backend.archive_readings(date(2026, 9, 1), purge=True)
+    assert result["months"] == ["2026-08"] and result["purged"] == 3
+    assert backend._archive_horizon() == HORIZON
+    return ctx
+
+
+@pytest.mark.parametrize("path", [
+    "/readings/by-silo-id?silo_id=1",
+    "/readings/by-sensor?sensor_id=1&sensor_id=2",
+    "/readings/max/by-sensor?sensor_id=1&sensor_id=2",
+    "/readings/avg/by-silo-id?silo_id=1",
+])
+def test_aware_window_reads_archive(august_archived, path):
+    window = "&start=2026-08-20T00:00:00{tz}&end=2026-09-01T10:00:00{tz}"
+    with august_archived.app.test_client() as client:
+        aware = client.get(path + window.format(tz="Z"))
+        assert aware.status_code == 200
+        body = aware.get_json()
+        assert any(r["timestamp"].startswith("2026-08-20") for r in body)
+        assert any(r["timestamp"].startswith("2026-09-01") for r in body)
+        assert body == client.get(path + window.format(tz="")).get_json()
@@ -0,0 +1,85 @@
+import gzip
+import zlib
+
+import pytest
+
+import app as backend
+
+URL = "/readings/by-sensor?" + "&".join(f"sensor_id={i}" for i in range(1, 9))
+
+
+@pytest.fixture
+def client(ctx, monkeypatch):
+    monkeypatch.setattr(backend, "COMPRESS_MIN_BYTES", 256)
+    with ctx.app.test_client() as client:
+        yield client
+
+
+def test_gzip_when_accepted(client):
+    plain = client.get(URL, headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["Vary"]
+    assert len(plain.get_data()) >= 256
+
+    packed = client.get(URL, headers={"Accept-Encoding": "gzip"})
+    assert packed.status_code == 200
+    assert packed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in packed.headers["Vary"]
+    assert gzip.decompress(packed.get_data()) == plain.get_data()
+    # cached variant: same bytes again, no recompression needed
+    assert client.get(URL, headers={"Accept-Encoding": "gzip"}).get_data() == packed.get_data()
+
+
+def test_brotli_preferred_when_available(client):
+    if backend.brotli is None:
+        pytest.skip("brotli not installed")
+    plain = client.get(URL).get_data()
+    resp = client.get(URL, headers={"Accept-Encoding": "gzip, br"})
+    assert resp.headers["Content-Encoding"] == "br"
+    assert backend.brotli.decompress(resp.get_data()) == plain
+
+
+def test_small_body_goes_out_plain(client, monkeypatch):
+    monkeypatch.setattr(backend, "COMPRESS_MIN_BYTES", 1 << 20)
+    resp = client.get(URL, headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert "Content-Encoding" not in resp.headers
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    resp.get_json()
+
+
+def test_disabled(client, monkeypatch):
+    monkeypatch.setattr(backend, "COMPRESS_ENABLED", False)
+    resp = client.get(URL, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+    resp.get_json()
+
+
+def test_stream_left_alone_without_encoding(client):
+    resp = client.get(URL + "&stream=ndjson", headers={"Accept-Encoding": "identity"})
+    assert resp.is_streamed
+    assert "Content-Encoding" not in resp.headers
+    assert len(resp.get_data().splitlines()) == 8
+
+
+def test_stream_compressed_per_chunk(client, monkeypatch):
+    monkeypatch.setattr(backend, "COMPRESS_MIN_BYTES", 1 << 20)  # the size threshold doesn't apply to streams
+    monkeypatch.setattr(backend, "STREAM_CHUNK_ROWS", 3)
+    plain = client.get(URL + "&stream=ndjson", headers={"Accept-Encoding": "identity"}).get_data()
+
+    resp = client.get(URL + "&stream=ndjson", headers={"Accept-Encoding": "gzip"})
+    assert resp.is_streamed
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    chunks = list(resp.response)
+    # every row chunk is flushed on its own, so the client can decode it before the end
+    d = zlib.decompressobj(31)
+    assert d.decompress(chunks[0]).count(b"\n") == 3
+    assert gzip.decompress(b"".join(chunks)) == plain
+
+
+def test_errors_not_compressed(client):
+    resp = client.get("/readings/by-sensor?sensor_id=1&cursor=bogus", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 400
+    assert "Content-Encoding" not in resp.headers
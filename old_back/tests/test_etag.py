@@ -0,0 +1,60 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import models
+
+URL = "/readings/by-sensor?sensor_id=1&sensor_id=2"
+
+
+def test_if_none_match_answers_304(ctx):
+    with ctx.app.test_client() as client:
+        first = client.get(URL)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+
+        again = client.get(URL, headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.get_data() == b""
+        assert again.headers["ETag"] == etag
+        assert "Accept-Encoding" in again.headers["Vary"]
+
+        assert client.get(URL, headers={"If-None-Match": '"something-else"'}).status_code == 200
+        assert client.get(URL + "&sensor_id=3", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_new_reading_changes_etag(ctx):
+    with ctx.app.test_client() as client:
+        etag = client.get(URL).headers["ETag"]
+        hour = datetime(2026, 9, 1, 11)
+        models.db.session.add(models.Reading(id=100, sensor_id=1, hour_start=hour, sample_at=hour,
+                                             value_c=Decimal("22.25")))
+        models.db.session.commit()
+        try:
+            resp = client.get(URL, headers={"If-None-Match": etag})
+            assert resp.status_code == 200
+            assert resp.headers["ETag"] != etag
+            assert any(r["temperature"] == 22.25 for r in resp.get_json())
+        finally:
+            models.db.session.query(models.Reading).filter_by(id=100).delete()
+            models.db.session.commit()
+
+
+@pytest.mark.parametrize("url", [
+    "/silos/level-estimate",
+    "/silos/level-estimate/history?start=2026-09-01T00:00:00&end=2026-09-01T23:00:00",
+])
+def test_level_estimate_304(ctx, url):
+    with ctx.app.test_client() as client:
+        first = client.get(url)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_if_none_match_list_and_weak(ctx):
+    with ctx.app.test_client() as client:
+        etag = client.get(URL).headers["ETag"]
+        assert client.get(URL, headers={"If-None-Match": f'"stale", {etag}'}).status_code == 304
+        assert client.get(URL, headers={"If-None-Match": f"W/{etag}"}).status_code == 304
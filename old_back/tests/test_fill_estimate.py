@@ -0,0 +1,40 @@
+import random
+
+import app as backend
+
+
+def _profiles():
+    rng = random.Random(11)
+    out = [
+        {},
+        {lvl: None for lvl in range(8)},
+        {0: 21.0},
+        {0: 21.0, 1: -127.0, 2: None},
+        {lvl: 20.0 for lvl in range(8)},
+        {0: 25.0, 1: 25.0, 2: 25.0, 3: 12.0, 4: 12.0, 5: 12.0, 6: 12.0, 7: 12.0},
+        {0: 12.0, 1: 25.0, 2: 12.0, 3: 25.0, 4: None, 5: 12.0, 6: 25.0, 7: 25.0},
+    ]
+    for _ in range(400):
+        prof = {}
+        for lvl in range(8):
+            roll = rng.random()
+            prof[lvl] = None if roll < 0.1 else -127.0 if roll < 0.15 else round(rng.uniform(5, 35), 2)
+        out.append(prof)
+    return out
+
+
+def test_fill_batch_matches_scalar(monkeypatch):
+    monkeypatch.setattr(backend, "NUMPY_MIN_ROWS", 0)
+    profiles = _profiles()
+    assert backend._numpy_enabled(8 * len(profiles))
+    batch = backend._estimate_fill_batch(profiles)
+    scalar = [backend._estimate_fill_from_profile(p) for p in profiles]
+    assert batch == scalar
+    # key order is part of the response
+    assert [list(b["assignments"]) for b in batch] == [list(s["assignments"]) for s in scalar]
+
+
+def test_fill_batch_without_numpy(monkeypatch):
+    monkeypatch.setattr(backend, "USE_NUMPY", False)
+    profiles = _profiles()[:20]
+    assert backend._estimate_fill_batch(profiles) == [backend._estimate_fill_from_profile(p) for p in profiles]
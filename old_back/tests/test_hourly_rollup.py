@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+import models
+
+HOUR = datetime(2026, 7, 1, 5)
+
+
+@pytest.fixture
+def raw(ctx):
+    """Insert readings_raw rows by id; everything the rollup wrote is removed afterwards."""
+    session = models.db.session
+    state = session.get(models.RollupState, ctx.HOURLY_ROLLUP_JOB)
+    checkpoint = (state.last_id, state.last_ts) if state else None
+
+    def add(rid, sensor_id, value, polled_at):
+        session.add(models.ReadingRaw(id=rid, sensor_id=sensor_id, value_c=Decimal(value), polled_at=polled_at))
+        session.commit()
+
+    yield add
+    session.query(models.ReadingRaw).filter(models.ReadingRaw.id >= 1000).delete()
+    session.query(models.Reading).filter(models.Reading.hour_start < datetime(2026, 8, 1)).delete()
+    state = session.get(models.RollupState, ctx.HOURLY_ROLLUP_JOB)
+    state.last_id, state.last_ts = checkpoint or (0, None)
+    session.commit()
+
+
+def _hourly(sensor_id, hour=HOUR):
+    r = models.Reading.query.filter_by(sensor_id=sensor_id, hour_start=hour).one_or_none()
+    return r and (r.value_c, r.sample_at)
+
+
+def test_late_lower_id_is_rolled_up(ctx, raw):
+    raw(1000, 1, "20.00", HOUR + timedelta(minutes=5))
+    raw(1002, 2, "21.00", HOUR + timedelta(minutes=5))
+    assert ctx.refresh_readings_hourly()["checkpoint_id"] == 1002
+
+    raw(1001, 3, "22.00", HOUR + timedelta(minutes=6))  # committed after the checkpoint passed it
+    result = ctx.refresh_readings_hourly()
+    assert (result["rows"], result["inserted"], result["updated"]) == (0, 1, 0)
+    assert _hourly(3) == (Decimal("22.00"), HOUR + timedelta(minutes=6))
+
+    # a replay of the overlap writes nothing
+    result = ctx.refresh_readings_hourly()
+    assert result["rechecked"] >= 3 and (result["inserted"], result["updated"]) == (0, 0)
+
+
+def test_newer_poll_replaces_hour(ctx, raw):
+    raw(1000, 1, "20.00", HOUR + timedelta(minutes=5))
+    ctx.refresh_readings_hourly()
+    raw(1001, 1, "23.50", HOUR + timedelta(minutes=45))
+    raw(1002, 1, "19.00", HOUR + timedelta(minutes=30))
+    result = ctx.refresh_readings_hourly()
+    assert (result["inserted"], result["updated"]) == (0, 1)
+    assert _hourly(1) == (Decimal("23.50"), HOUR + timedelta(minutes=45))
+
+
+def test_lookup_only_loads_batch_cells(ctx, raw, monkeypatch):
+    # one batch spanning four weeks for two sensors: 2 cells, not sensors x 672 hours
+    raw(1000, 1, "20.00", HOUR)
+    raw(1001, 2, "21.00", HOUR + timedelta(weeks=4))
+    for sensor_id in (1, 2):
+        for h in range(0, 24 * 28, 6):
+            models.db.session.add(models.Reading(sensor_id=sensor_id, hour_start=HOUR + timedelta(hours=h),
+                                                 sample_at=HOUR, value_c=Decimal("1.00")))
+    models.db.session.commit()
+
+    lookups = []  # existing-row lookups against `readings` (the only reads of readings.sample_at)
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM readings \n" in statement and "readings.sample_at" in statement:
+            lookups.append((statement, parameters))
+    event.listen(models.db.engine, "before_cursor_execute", record)
+    monkeypatch.setattr(ctx, "HOURLY_ROLLUP_OVERLAP_IDS", 0)
+    try:
+        result = ctx.refresh_readings_hourly()
+    finally:
+        event.remove(models.db.engine, "before_cursor_execute", record)
+    assert (result["rows"], result["inserted"], result["updated"]) == (2, 1, 1)
+    assert _hourly(1) == (Decimal("20.00"), HOUR)
+    assert _hourly(2, HOUR + timedelta(weeks=4)) == (Decimal("21.00"), HOUR + timedelta(weeks=4))
+    assert len(lookups) == 1
+    statement, parameters = lookups[0]
+    assert "(readings.sensor_id, readings.hour_start) IN" in statement
+    assert "readings.hour_start >=" not in statement and len(parameters) == 4  # two (sensor, hour) cells
@@ -0,0 +1,60 @@
+import math
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import models
+
+POLLED_AT = datetime(2026, 9, 1, 10, 5)
+
+
+@pytest.mark.parametrize("sensor_ids, values, message", [
+    ([1, 2], [20.0], "same length"),
+    ([1, 999], [20.0, 21.0], "unknown sensor_id: 999"),
+    ([True], [20.0], "unknown sensor_id: True"),
+    (["1"], [20.0], "unknown sensor_id: '1'"),
+    ([1, 2, 1], [20.0, 21.0, 22.0], "duplicate sensor_id: 1"),
+    ([1], ["20.5"], "invalid value_c for sensor 1"),
+    ([1], [False], "invalid value_c for sensor 1"),
+    ([1, 2], [20.0, 10000.0], "value_c out of range for sensor 2"),
+    ([1], [-10000], "value_c out of range for sensor 1"),
+])
+def test_ingest_rejects_bad_batch(ctx, sensor_ids, values, message):
+    before = models.db.session.query(models.ReadingRaw).count()
+    with pytest.raises(ValueError, match=message):
+        ctx.ingest_raw_batch(7, POLLED_AT, sensor_ids, values)
+    assert models.db.session.query(models.ReadingRaw).count() == before
+
+
+def test_ingest_endpoint_reports_rejection(ctx):
+    with ctx.app.test_client() as client:
+        resp = client.post("/ingest/raw", json={"poll_run_id": 7, "polled_at": POLLED_AT.isoformat(),
+                                                "sensor_id": [1, 1], "value_c": [20.0, 21.0]})
+    assert resp.status_code == 400
+    assert "duplicate sensor_id" in resp.get_json()["error"]
+
+
+def test_ingest_endpoint_inserts_batch(ctx, monkeypatch):
+    monkeypatch.setattr(ctx, "INGEST_CHUNK_ROWS", 2)  # more than one INSERT per batch
+    raw = models.db.session.query(models.ReadingRaw)
+    before = raw.count()
+    body = {"poll_run_id": 8, "polled_at": "2026-09-01T12:05:00.250000+02:00",
+            "sensor_id": [1, 2, 3, 4, 5], "value_c": [21.5, -127, None, math.nan, -9999.99]}
+    try:
+        with ctx.app.test_client() as client:
+            resp = client.post("/ingest/raw", json=body)
+        assert resp.status_code == 201
+        assert resp.get_json() == {"inserted": 5, "poll_run_id": 8, "polled_at": "2026-09-01T10:05:00.250000"}
+        assert raw.count() == before + 5
+
+        rows = raw.filter_by(poll_run_id=8).order_by(models.ReadingRaw.sensor_id).all()
+        assert [r.sensor_id for r in rows] == [1, 2, 3, 4, 5]
+        assert {r.polled_at for r in rows} == {datetime(2026, 9, 1, 10, 5, 0, 250000)}
+        assert all(r.polled_at.tzinfo is None for r in rows)
+        # sentinel kept, NULL kept, NaN stored as the disconnect sentinel
+        assert [r.value_c for r in rows] == [Decimal("21.50"), Decimal("-127.00"), None,
+                                             Decimal("-127.00"), Decimal("-9999.99")]
+    finally:
+        raw.filter_by(poll_run_id=8).delete()
+        models.db.session.commit()
@@ -0,0 +1,25 @@
+import pytest
+
+URL = "/silos/level-estimate/history"
+
+
+@pytest.mark.parametrize("aware, naive", [
+    ("end=2026-09-01T10:00:00Z", "end=2026-09-01T10:00:00"),
+    ("start=2026-09-01T10:00:00Z", "start=2026-09-01T10:00:00"),
+    ("start=2026-09-01T09:00:00Z&end=2026-09-01T11:00:00Z", "start=2026-09-01T09:00:00&end=2026-09-01T11:00:00"),
+    ("start=2026-09-01T12:00:00%2B02:00&end=2026-09-01T12:00:00%2B02:00", "start=2026-09-01T10:00:00&end=2026-09-01T10:00:00"),
+])
+def test_aware_window_is_read_as_utc(ctx, aware, naive):
+    with ctx.app.test_client() as client:
+        resp = client.get(f"{URL}?{aware}")
+        assert resp.status_code == 200
+        rows = resp.get_json()
+        assert [r["timestamp"] for r in rows] == ["2026-09-01T10:00:00"]
+        assert rows == client.get(f"{URL}?{naive}").get_json()
+
+
+def test_window_before_data_is_empty(ctx):
+    with ctx.app.test_client() as client:
+        resp = client.get(f"{URL}?end=2026-09-01T09:00:00Z")
+        assert resp.status_code == 200
+        assert resp.get_json() == []
@@ -0,0 +1,22 @@
+import math
+import random
+
+import numpy as np
+
+import app as backend
+
+
+def test_np_round2_matches_round_on_ties():
+    ties = [0.125, 0.135, 0.145, 1.005, 1.015, 2.675, 2.665, -0.125, -2.675, 20.145, 1234.565, 0.0, -0.005]
+    assert backend._np_round2(np.array(ties)).tolist() == [round(v, 2) for v in ties]
+
+
+def test_np_round2_matches_round_on_hundredths():
+    rng = random.Random(7)
+    values = [rng.randint(-100000, 100000) / 1000 for _ in range(5000)] + [i / 1000 + 0.0005 for i in range(-2000, 2000)]
+    assert backend._np_round2(np.array(values)).tolist() == [round(v, 2) for v in values]
+
+
+def test_np_round2_passes_nan_through():
+    out = backend._np_round2(np.array([math.nan, 1.234]))
+    assert math.isnan(out[0]) and out[1] == 1.23
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import pytest
+
+import app as backend
+
+
+@pytest.mark.parametrize("key", [
+    ("p", datetime(2026, 9, 1, 10), 1),
+    ("live", datetime(2026, 9, 1, 10, 7, 3, 120000), 2 ** 40),
+    (None, datetime(1999, 12, 31, 23, 59, 59, 999999), 0),
+])
+def test_cursor_round_trip(key):
+    token = backend._encode_cursor(key)
+    assert "=" not in token and "/" not in token and "+" not in token
+    assert backend._decode_cursor(token) == key
+
+
+@pytest.mark.parametrize("token", [None, ""])
+def test_cursor_absent(token):
+    assert backend._decode_cursor(token) is None
+
+
+@pytest.mark.parametrize("token", ["not-a-cursor", "W10", backend._encode_cursor(("p", datetime(2026, 9, 1), 1))[:-3]])
+def test_cursor_invalid(token):
+    with pytest.raises(ValueError, match="invalid cursor"):
+        backend._decode_cursor(token)
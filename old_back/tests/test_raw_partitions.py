@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pytest
+
+import app as backend
+
+NOW = datetime(2026, 10, 18, 9, 30)
+
+
+def _layout(first_upper, months, catch_all=True):
+    """[(name, upper)] as _raw_partitions() reports it: p_old, `months` monthly partitions, p_future."""
+    out = [("p_old", first_upper)]
+    lower = first_upper
+    for _ in range(months):
+        upper = backend._next_period(lower, "month")
+        out.append((f"p{lower:%Y%m}", upper))
+        lower = upper
+    if catch_all:
+        out.append(("p_future", None))
+    return out
+
+
+def test_plan_initial_conversion():
+    stmts = backend.plan_raw_partitions([], ["fk_raw_sensor"], NOW, unit="month", ahead=3)
+    assert stmts[0] == "ALTER TABLE readings_raw DROP FOREIGN KEY `fk_raw_sensor`"
+    assert stmts[1] == "ALTER TABLE readings_raw DROP PRIMARY KEY, ADD PRIMARY KEY (id, polled_at)"
+    assert stmts[2] == (
+        "ALTER TABLE readings_raw PARTITION BY RANGE COLUMNS(polled_at) ("
+        "PARTITION p_old VALUES LESS THAN ('2026-10-01 00:00:00'), "
+        "PARTITION p202610 VALUES LESS THAN ('2026-11-01 00:00:00'), "
+        "PARTITION p202611 VALUES LESS THAN ('2026-12-01 00:00:00'), "
+        "PARTITION p202612 VALUES LESS THAN ('2027-01-01 00:00:00'), "
+        "PARTITION p202701 VALUES LESS THAN ('2027-02-01 00:00:00'), "
+        "PARTITION p_future VALUES LESS THAN (MAXVALUE))")
+    assert len(stmts) == 3
+
+
+def test_plan_up_to_date_is_empty():
+    existing = _layout(datetime(2026, 10, 1), 4)
+    assert backend.plan_raw_partitions(existing, [], NOW, unit="month", ahead=3, retention_days=400) == []
+
+
+def test_plan_rolls_forward_and_drops_expired():
+    existing = _layout(datetime(2026, 10, 1), 4)
+    now = datetime(2026, 11, 15)
+    assert backend.plan_raw_partitions(existing, [], now, unit="month", ahead=3,
+                                       retention_days=30, action="drop") == [
+        "ALTER TABLE readings_raw REORGANIZE PARTITION p_future INTO ("
+        "PARTITION p202702 VALUES LESS THAN ('2027-03-01 00:00:00'), "
+        "PARTITION p_future VALUES LESS THAN (MAXVALUE))",
+        "ALTER TABLE readings_raw DROP PARTITION p_old",
+    ]
+
+
+def test_plan_archive_swaps_out_before_drop():
+    existing = _layout(datetime(2026, 10, 1), 4)
+    stmts = backend.plan_raw_partitions(existing, [], datetime(2026, 11, 15), unit="month", ahead=3,
+                                        retention_days=30, action="archive")
+    assert stmts[1:] == [
+        "CREATE TABLE readings_raw_p_old LIKE readings_raw",
+        "ALTER TABLE readings_raw_p_old REMOVE PARTITIONING",
+        "ALTER TABLE readings_raw EXCHANGE PARTITION p_old WITH TABLE readings_raw_p_old",
+        "ALTER TABLE readings_raw DROP PARTITION p_old",
+    ]
+
+
+def test_plan_without_catch_all_adds_and_keeps_one_partition():
+    existing = [("p202601", datetime(2026, 2, 1))]
+    stmts = backend.plan_raw_partitions(existing, [], NOW, unit="month", ahead=0, retention_days=30)
+    # the gap up to the current period is filled too
+    assert stmts[0].startswith("ALTER TABLE readings_raw ADD PARTITION (PARTITION p202602 ")
+    assert stmts[0].endswith("PARTITION p202610 VALUES LESS THAN ('2026-11-01 00:00:00'))")
+    assert "DROP PARTITION p202601" in stmts[-1]
+    # nothing to add and everything expired: the last partition stays
+    existing = [("p202601", datetime(2026, 2, 1)), ("p202602", datetime(2026, 3, 1))]
+    stmts = backend.plan_raw_partitions(existing, [], datetime(2026, 2, 10), unit="month", ahead=0,
+                                        retention_days=0)
+    assert stmts == ["ALTER TABLE readings_raw DROP PARTITION p202601"]
+
+
+@pytest.mark.parametrize("kwargs", [{"unit": "week"}, {"action": "truncate"}])
+def test_plan_rejects_bad_settings(kwargs):
+    with pytest.raises(ValueError):
+        backend.plan_raw_partitions([], [], NOW, **kwargs)
@@ -0,0 +1,109 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import app as backend
+import models
+
+US = timedelta(microseconds=1)
+
+
+@pytest.fixture
+def rollup_through(monkeypatch):
+    def set_watermark(watermark):
+        monkeypatch.setattr(backend, "_rollups_available", lambda: True)
+        monkeypatch.setattr(backend, "_rollup_watermark", lambda: watermark)
+    return set_watermark
+
+
+def test_rollup_split_unavailable(monkeypatch):
+    monkeypatch.setattr(backend, "_rollups_available", lambda: False)
+    start, end = datetime(2026, 9, 1), datetime(2026, 9, 5)
+    assert backend._split_window_by_rollup(start, end) == (None, [(start, end)])
+
+
+def test_rollup_split_whole_days(rollup_through):
+    rollup_through(datetime(2026, 9, 10, 23, 59, 59))
+    start, end = datetime(2026, 9, 1), datetime(2026, 9, 5, 23, 59, 59, 999999)
+    assert backend._split_window_by_rollup(start, end) == ((date(2026, 9, 1), date(2026, 9, 5)), [])
+
+
+def test_rollup_split_partial_edges(rollup_through):
+    rollup_through(datetime(2026, 9, 10, 23, 59, 59))
+    start, end = datetime(2026, 9, 1, 6), datetime(2026, 9, 5, 12)
+    days, segments = backend._split_window_by_rollup(start, end)
+    assert days == (date(2026, 9, 2), date(2026, 9, 4))
+    assert segments == [(start, datetime(2026, 9, 2) - US), (datetime(2026, 9, 5), end)]
+
+
+def test_rollup_split_open_end_stops_at_watermark(rollup_through):
+    rollup_through(datetime(2026, 9, 3, 23, 59, 59))
+    days, segments = backend._split_window_by_rollup(None, None)
+    assert days == (None, date(2026, 9, 3))
+    assert segments == [(datetime(2026, 9, 4), None)]
+
+
+def test_rollup_split_window_inside_one_day(rollup_through):
+    rollup_through(datetime(2026, 9, 10, 23, 59, 59))
+    start, end = datetime(2026, 9, 2, 6), datetime(2026, 9, 2, 18)
+    assert backend._split_window_by_rollup(start, end) == (None, [(start, end)])
+
+
+@pytest.fixture
+def daily(ctx):
+    """2026-09-01 rolled up (a 09-02 reading makes it a whole day); rollup state restored afterwards."""
+    session = models.db.session
+    hourly = session.get(models.RollupState, ctx.HOURLY_ROLLUP_JOB)
+    hourly_checkpoint = (hourly.last_id, hourly.last_ts) if hourly else None
+    session.add(models.Reading(id=300, sensor_id=2, hour_start=datetime(2026, 9, 2, 1),
+                               sample_at=datetime(2026, 9, 2, 1), value_c=Decimal("19.00")))
+    session.commit()
+    assert ctx.refresh_readings_daily()["watermark"] == "2026-09-01T23:59:59.999999"
+    assert ctx._rollups_available()
+    yield ctx
+    session.query(models.ReadingRaw).filter(models.ReadingRaw.id >= 2000).delete()
+    session.query(models.Reading).filter_by(id=300).delete()
+    session.query(models.Reading).filter_by(id=1).update({"value_c": Decimal("20.50"), "sample_at": datetime(2026, 9, 1, 10)})
+    session.query(models.ReadingDaily).delete()
+    session.query(models.ReadingDailyLevel).delete()
+    session.query(models.RollupState).filter_by(name=ctx.ROLLUP_JOB).delete()
+    if hourly_checkpoint:
+        state = session.get(models.RollupState, ctx.HOURLY_ROLLUP_JOB)
+        state.last_id, state.last_ts = hourly_checkpoint
+    session.commit()
+
+
+def test_hourly_rewrite_rewinds_daily_rollup(daily):
+    url = "/readings/max/by-sensor?sensor_id=1&start=2026-09-01T00:00:00&end=2026-09-01T23:59:59.999999"
+    with daily.app.test_client() as client:
+        assert [r["temperature"] for r in client.get(url).get_json()] == [20.5]
+
+        # a later poll for 09-01 10:00 replaces the hour's sample in `readings`
+        session = models.db.session
+        session.add(models.ReadingRaw(id=2000, sensor_id=1, value_c=Decimal("30.00"),
+                                      polled_at=datetime(2026, 9, 1, 10, 40)))
+        session.commit()
+        assert daily.refresh_readings_hourly()["updated"] == 1
+        state = session.get(models.RollupState, daily.ROLLUP_JOB)
+        assert state.last_ts == datetime(2026, 8, 31, 23, 59, 59, 999999)
+        assert daily._split_window_by_rollup(datetime(2026, 9, 1), datetime(2026, 9, 1, 23, 59, 59, 999999))[0] is None
+        assert [r["temperature"] for r in client.get(url).get_json()] == [30.0]
+
+        result = daily.refresh_readings_daily()
+        assert (result["days"], result["watermark"]) == (1, "2026-09-01T23:59:59.999999")
+        day = session.query(models.ReadingDaily).filter_by(sensor_id=1, day=date(2026, 9, 1)).one()
+        assert day.max_c == Decimal("30.00")
+        assert [r["temperature"] for r in client.get(url).get_json()] == [30.0]
+
+
+def test_hourly_write_after_watermark_leaves_it(daily):
+    session = models.db.session
+    session.add(models.ReadingRaw(id=2001, sensor_id=3, value_c=Decimal("25.00"),
+                                  polled_at=datetime(2026, 9, 2, 3, 10)))
+    session.commit()
+    assert daily.refresh_readings_hourly()["inserted"] == 1
+    state = session.get(models.RollupState, daily.ROLLUP_JOB)
+    assert state.last_ts == datetime(2026, 9, 1, 23, 59, 59, 999999)
+    session.query(models.Reading).filter_by(sensor_id=3, hour_start=datetime(2026, 9, 2, 3)).delete()
+    session.commit()